@@ -4,11 +4,17 @@ import pandas as pd
 import os
 
 from core.loaders import load_many
-from core.config import DEFAULT_VAT
-from core.arbitrage import build_pairs, compute_margins, attach_badges_for_pairs
-from core.scoring_v2 import add_opportunity_score, add_detectors
-from ui.layout import sidebar_controls, top_kpis, discover_tab
-from utils import apply_vat_discount_rules
+from core.cache import UploadCache, file_digest
+from core.config import PIPELINE_COLS, COMPACT_SCHEMA, SNAPSHOT_AUTOSAVE
+from core.compact import compact_frame
+from core.scoring_v2 import component_score_matrix, rescore
+from core.arbitrage import add_break_even
+from core.pipeline import PairPartitions, StageCache, ranked_rows, with_scores, within_discount
+from core.profiling import StageProfiler
+from core.snapshots import SnapshotStore, uploads_key
+from ui.components import LEADERBOARD_MAX
+from utils import discount_for_net_array
+from ui.layout import sidebar_controls, pruning_controls, negotiation_controls, top_kpis, discover_tab, cache_panel, pipeline_status, memory_panel, export_panel, diagnostics_toggle, diagnostics_panel, snapshot_panel, deltas_panel, scenario_panel
 
 st.set_page_config(page_title="Amazon Market Analyzer – v2", layout="wide", page_icon="🕵️")
 
@@ -28,7 +34,22 @@ if not files:
     st.info("Suggerimento: puoi caricare IT/DE/FR/ES insieme; verranno unificati automaticamente.")
     st.stop()
 
-df_all = load_many(files)
+upload_cache = UploadCache()
+snapshots = SnapshotStore()
+profiler = StageProfiler(enabled=diagnostics_toggle())
+stages = StageCache(st.session_state.setdefault("pipeline_stages", {}), profiler=profiler)
+file_ids = [(f.name, getattr(f, "file_id", None) or file_digest(f)) for f in files]
+def _load_stage():
+    raw = load_many(files, cache=upload_cache, columns=PIPELINE_COLS)
+    if SNAPSHOT_AUTOSAVE:
+        # storico giornaliero: stesso contenuto caricato due volte nello stesso giorno = nessuna scrittura
+        try:
+            snapshots.append(raw, key=uploads_key(files))
+        except OSError as e:
+            st.warning(f"Snapshot giornaliero non salvato: {e}")
+    return compact_frame(raw, scores=False) if COMPACT_SCHEMA else raw
+
+df_all = stages.run("load", [file_ids, COMPACT_SCHEMA], _load_stage)
 if df_all.empty:
     st.error("Nessun dato caricato.")
     st.stop()
@@ -38,41 +59,57 @@ countries = sorted([c for c in df_all["country"].dropna().unique().tolist() if c
 
 # Sidebar
 buy_sel, sell_sel, ship_mode, weights, discount_map = sidebar_controls(countries)
+min_margin_eur, min_margin_pct = pruning_controls()
+target_margin, max_target_discount = negotiation_controls()
+cache_panel(upload_cache)
+snapshot_panel(snapshots)
 
-# Pairs & margins
-pairs = build_pairs(df_all, buy_sel, sell_sel)
-if pairs.empty:
-    st.warning("Nessuna coppia mercato generata: verifica che gli ASIN coincidano tra i paesi selezionati.")
-    st.stop()
-
+# Pairs, margins & features per (buy, sell) country: only partitions whose inputs changed are recomputed
+partitions = PairPartitions(st.session_state.setdefault("pair_partitions", {}), profiler=profiler)
+features_params = [sorted(buy_sel), sorted(sell_sel), sorted((discount_map or {}).items()), ship_mode,
+                   min_margin_eur, min_margin_pct, COMPACT_SCHEMA]
 with st.spinner("Calcolo margini e punteggi..."):
-    df_marg = compute_margins(
-        pairs=pairs,
-        vat_sell_map=DEFAULT_VAT,
+    df_feat, pairs_info = stages.run("features", features_params, lambda: partitions.run(
+        df_all, buy_sel, sell_sel,
         discount_map=discount_map or {},
         ship_mode=ship_mode,
-        vat_discount_fn=apply_vat_discount_rules,
-    )
+        min_margin_eur=min_margin_eur,
+        min_margin_pct=min_margin_pct,
+    ), upstream="load")
+if pairs_info["pruned"]:
+    st.caption(f"Coppie scartate in pairing (margine massimo sotto soglia): {pairs_info['pruned']:,}")
+if pairs_info["memory"] is not None:
+    memory_panel(pairs_info["memory"])
+if not pairs_info["pairs"]:
+    pipeline_status({**stages.status, **partitions.status})
+    diagnostics_panel(profiler)
+    st.warning("Nessuna coppia mercato generata: verifica che gli ASIN coincidano tra i paesi selezionati.")
+    st.stop()
 
-    # Usa SELL-side per domanda/concorrenza ecc.
-    sell_cols = {c: c.replace("_sell","") for c in df_marg.columns if c.endswith("_sell")}
-    df_sell = df_marg.rename(columns=sell_cols).copy()
+with st.spinner("Calcolo punteggi..."):
+    # sconto di pareggio / per il ROI obiettivo e prezzo minimo di vendita: forma chiusa, una passata
+    # (non dipende dai pesi: si ricalcola solo con il ROI obiettivo o le coppie)
+    df_be = stages.run("break_even", [target_margin], lambda: add_break_even(
+        df_feat, ship_mode, target_margin, discount_for_net_array), upstream="features")
+    score_matrix = stages.run("matrix", [], lambda: component_score_matrix(df_feat), upstream="features")
+    df_scored = stages.run("score", [sorted(weights.items()), stages.keys["break_even"]],
+                           lambda: with_scores(df_be, rescore(score_matrix, weights)), upstream="matrix")
+    eligible = stages.run("eligible", [max_target_discount], lambda: within_discount(df_be, max_target_discount),
+                          upstream="break_even")
+    ranking = stages.run("ranking", [LEADERBOARD_MAX, stages.keys["score"]],
+                         lambda: ranked_rows(df_scored, LEADERBOARD_MAX, eligible), upstream="eligible")
 
-    df_scored = add_opportunity_score(df_sell, weights=weights)
-    df_scored = add_detectors(df_scored)
-    df_scored = attach_badges_for_pairs(df_scored)
+pipeline_status({**stages.status, **partitions.status})
+diagnostics_panel(profiler)
 
 # KPIs
 c1, c2, c3 = st.columns(3)
 top_kpis(c1, c2, c3, df_scored)
+deltas_panel(snapshots)
 
 # Leaderboard
-discover_tab(df_scored)
+discover_tab(df_scored, order=ranking, eligible=eligible)
+scenario_panel(df_scored, score_matrix, weights, discount_map, buy_sel, min_margin_eur, min_margin_pct)
 
 # Download
-st.download_button(
-    "Scarica risultati (CSV)",
-    data=df_scored.to_csv(index=False).encode("utf-8"),
-    file_name="ama_v2_results.csv",
-    mime="text/csv"
-)
+export_panel(df_scored, data_key=stages.keys.get("ranking"))
@@ -0,0 +1,132 @@
+"""Generatore di export Keepa sintetici per benchmark (header da ALIAS_MAP, formati misti).
+
+    python bench/keepa_synth.py out_dir --rows 100000 --locales it de fr es
+"""
+from __future__ import annotations
+import argparse
+import os
+import pathlib
+import sys
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+from core.config import ALIAS_MAP, PRICE_COLS, PCT_COLS, INT_COLS
+
+LOCALES = ["it", "de", "fr", "es", "nl", "pl", "se"]
+PRICE_FORMATS = ["eu", "us", "plain"]
+FLAG_COLS = ["prime_eligible", "map_restriction", "buybox_is_lowest", "amazon_is_lowest"]
+_CHUNK = 100_000
+
+def keepa_headers() -> dict:
+    """Normalized column -> Keepa-style raw header ("buy box 🚚: current" -> "Buy Box 🚚: Current")."""
+    return {target: " ".join(w[:1].upper() + w[1:] for w in raw.split(" ")) for raw, target in ALIAS_MAP.items()}
+
+def _str(a) -> pa.Array:
+    return pc.cast(pa.array(a), pa.string())
+
+def _join(*parts) -> pa.Array:
+    return pc.binary_join_element_wise(*parts, "")
+
+def _fixed2(v: np.ndarray, dec_sep: str = ".", thousands: str = "") -> pa.Array:
+    """Two-decimal strings built from integer cents ("1.234,56" with dec_sep="," and thousands=".")."""
+    cents = np.round(v * 100).astype(np.int64)
+    whole = cents // 100
+    dec = pc.utf8_lpad(_str(cents % 100), 2, "0")
+    whole_s = _str(whole)
+    if thousands:
+        grouped = pa.array(whole >= 1000)
+        split = _join(_str(whole // 1000), thousands, pc.utf8_lpad(_str(whole % 1000), 3, "0"))
+        whole_s = pc.if_else(grouped, split, whole_s)
+    return _join(whole_s, dec_sep, dec)
+
+def _fmt_prices(v: np.ndarray, style: np.ndarray) -> pa.Array:
+    """style 0 -> "1.234,56 €", 1 -> "1,234.56", 2 -> "1234.56" (prices below 1M)."""
+    eu = _join(_fixed2(v, ",", "."), " €")
+    out = pc.if_else(pa.array(style == 1), _fixed2(v, ".", ","), _fixed2(v))
+    return pc.if_else(pa.array(style == 0), eu, out)
+
+def synth_table(rows: int, locale: str, seed: int = 0, asin_offset: int = 0,
+                missing_rate: float = 0.1, price_format: str = "mixed") -> pa.Table:
+    """One Keepa-like export (raw headers, text cells) for `locale`, ASINs B0<asin_offset..+rows>."""
+    rng = np.random.default_rng(seed)
+    headers = keepa_headers()
+    idx = np.arange(asin_offset, asin_offset + rows)
+    asins = _join("B0", pc.utf8_lpad(_str(idx), 8, "0"))
+    cols = {}
+    for target, raw in headers.items():
+        if target == "asin":
+            vals = asins
+        elif target == "locale":
+            vals = pa.array([locale] * rows, pa.string())
+        elif target in PRICE_COLS:
+            v = np.round(rng.lognormal(3.3, 1.0, rows), 2)
+            style = {"eu": 0, "us": 1, "plain": 2}.get(price_format)
+            style = rng.integers(0, 3, rows) if style is None else np.full(rows, style)
+            vals = _fmt_prices(v, style)
+        elif target in PCT_COLS:
+            vals = _join(_fixed2(rng.uniform(0, 60, rows), ","), " %")
+        elif target in INT_COLS:
+            hi = 2_000_000 if target.startswith("sales_rank") else 500
+            vals = _str(rng.integers(0, hi, rows))
+        elif target == "amazon_offer_availability":
+            vals = pa.array(rng.choice(["no amazon offer", "in stock", "back-ordered"], rows).tolist(), pa.string())
+        elif target in FLAG_COLS:
+            vals = pa.array(rng.choice(["yes", "no"], rows, p=[0.3, 0.7]).tolist(), pa.string())
+        elif target == "title":
+            vals = _join("Prodotto sintetico ", _str(idx))
+        elif target in ("brand", "category_root"):
+            vals = _join(f"{target}_", _str(rng.integers(0, 40, rows)))
+        elif target.startswith("url_"):
+            vals = _join(f"https://www.amazon.{locale}/dp/", asins)
+        else:
+            vals = _fixed2(rng.uniform(0, 200, rows))
+        if target not in ("asin", "locale"):
+            vals = pc.if_else(pa.array(rng.random(rows) < missing_rate), pa.scalar(None, pa.string()), vals)
+        cols[raw] = vals
+    return pa.table(cols)
+
+def write_export(path: str, rows: int, locale: str, seed: int = 0,
+                 missing_rate: float = 0.1, price_format: str = "mixed") -> str:
+    """Write a CSV export chunk by chunk (constant memory up to millions of rows)."""
+    opts = pacsv.WriteOptions(quoting_style="needed")
+    writer = None
+    try:
+        for i, start in enumerate(range(0, rows, _CHUNK)):
+            table = synth_table(min(_CHUNK, rows - start), locale, seed=seed * 1_000 + i, asin_offset=start,
+                                missing_rate=missing_rate, price_format=price_format)
+            if writer is None:
+                writer = pacsv.CSVWriter(path, table.schema, write_options=opts)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+    return path
+
+def write_exports(out_dir: str, rows: int, locales: list[str] | None = None, seed: int = 0,
+                  missing_rate: float = 0.1, price_format: str = "mixed") -> list[str]:
+    """One export per locale over the same ASINs, so that every ASIN pairs across countries."""
+    os.makedirs(out_dir, exist_ok=True)
+    return [
+        write_export(os.path.join(out_dir, f"keepa_{loc}_{rows}.csv"), rows, loc, seed=seed + k,
+                     missing_rate=missing_rate, price_format=price_format)
+        for k, loc in enumerate(locales or LOCALES[:4])
+    ]
+
+def main(argv: list[str] | None = None) -> int:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("out_dir")
+    p.add_argument("--rows", type=int, default=10_000, help="righe per file/paese (10k–5M)")
+    p.add_argument("--locales", nargs="+", default=LOCALES[:4])
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--missing-rate", type=float, default=0.1)
+    p.add_argument("--price-format", choices=PRICE_FORMATS + ["mixed"], default="mixed")
+    a = p.parse_args(argv)
+    for path in write_exports(a.out_dir, a.rows, a.locales, a.seed, a.missing_rate, a.price_format):
+        print(path)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+"""Benchmark della pipeline su export Keepa sintetici, stadio per stadio.
+
+    python bench/run_bench.py --rows 100000                       # misura
+    python bench/run_bench.py --rows 100000 --save bench/baseline.json
+    python bench/run_bench.py --rows 100000 --baseline bench/baseline.json --tolerance 0.25
+
+Ogni stadio (load_many, build_pairs, compute_margins, add_opportunity_score, add_detectors,
+attach_badges_for_pairs) è cronometrato da solo (il migliore di `--repeat` giri), con throughput
+in righe/s e picco di memoria Python (tracemalloc, in un giro a parte per non falsare i tempi).
+"""
+from __future__ import annotations
+import argparse
+import gc
+import json
+import os
+import pathlib
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parent))
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+from keepa_synth import write_exports
+from core.arbitrage import attach_badges_for_pairs, build_pairs, compute_margins
+from core.config import DEFAULT_VAT, PIPELINE_COLS
+from core.loaders import load_many
+from core.scoring_v2 import add_detectors, add_opportunity_score
+from utils import apply_vat_discount_rules, apply_vat_discount_rules_array
+
+STAGES = ["load_many", "build_pairs", "compute_margins", "add_opportunity_score", "add_detectors", "attach_badges_for_pairs"]
+
+def measure(fn: Callable[[], object], repeat: int = 3, memory: bool = True) -> tuple[object, Dict[str, float]]:
+    """Best-of-`repeat` wall time of `fn()`, plus its tracemalloc peak from one extra run."""
+    best, out = float("inf"), None
+    for _ in range(max(1, repeat)):
+        gc.collect()
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    peak = float("nan")
+    if memory:
+        gc.collect()
+        tracemalloc.start()
+        fn()
+        peak = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+    return out, {"seconds": best, "peak_mb": peak}
+
+def _sell_side(df_marg: pd.DataFrame) -> pd.DataFrame:
+    return df_marg.rename(columns={c: c.replace("_sell", "") for c in df_marg.columns if c.endswith("_sell")})
+
+def run_suite(files: List[str], buy: List[str], sell: List[str], discount_map: Dict[str, float] | None = None,
+              ship_mode: str = "FBA", workers: int | None = 1, repeat: int = 3, memory: bool = True) -> Dict[str, Dict]:
+    """Time every stage on the output of the previous one; returns {stage: metrics}."""
+    discount_map = discount_map or {}
+    results: Dict[str, Dict] = {}
+
+    def stage(name: str, fn: Callable[[], pd.DataFrame], rows_in: int) -> pd.DataFrame:
+        out, m = measure(fn, repeat, memory)
+        m.update(rows_in=rows_in, rows_out=len(out), rows_per_s=rows_in / m["seconds"] if m["seconds"] else float("inf"))
+        results[name] = m
+        return out
+
+    df_all = stage("load_many", lambda: load_many(files, workers=workers, columns=PIPELINE_COLS), 0)
+    results["load_many"]["rows_in"] = len(df_all)
+    results["load_many"]["rows_per_s"] = len(df_all) / results["load_many"]["seconds"]
+    pairs = stage("build_pairs", lambda: build_pairs(df_all, buy, sell), len(df_all))
+    df_marg = stage("compute_margins", lambda: compute_margins(
+        pairs, DEFAULT_VAT, discount_map, ship_mode, apply_vat_discount_rules,
+        vat_discount_array_fn=apply_vat_discount_rules_array), len(pairs))
+    df_sell = _sell_side(df_marg)
+    df_score = stage("add_opportunity_score", lambda: add_opportunity_score(df_sell), len(df_sell))
+    df_det = stage("add_detectors", lambda: add_detectors(df_score), len(df_score))
+    stage("attach_badges_for_pairs", lambda: attach_badges_for_pairs(df_det), len(df_det))
+    return results
+
+def compare(current: Dict[str, Dict], baseline: Dict[str, Dict], tolerance: float = 0.25) -> pd.DataFrame:
+    """Per-stage time/memory ratios against `baseline`; `regression` when time grows over `tolerance`."""
+    rows = []
+    for name in STAGES:
+        cur, base = current.get(name), baseline.get(name)
+        if cur is None or base is None:
+            continue
+        ratio = cur["seconds"] / base["seconds"] if base["seconds"] else float("nan")
+        rows.append({
+            "stage": name,
+            "seconds": cur["seconds"],
+            "baseline_seconds": base["seconds"],
+            "time_ratio": ratio,
+            "peak_mb": cur.get("peak_mb"),
+            "baseline_peak_mb": base.get("peak_mb"),
+            "regression": bool(ratio > 1 + tolerance),
+        })
+    return pd.DataFrame(rows)
+
+def _meta(args) -> Dict:
+    return {
+        "rows_per_file": args.rows,
+        "locales": args.locales,
+        "buy": args.buy,
+        "sell": args.sell,
+        "repeat": args.repeat,
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+
+def main(argv: List[str] | None = None) -> int:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--rows", type=int, default=10_000, help="righe per file/paese (10k–5M)")
+    p.add_argument("--locales", nargs="+", default=["it", "de", "fr", "es"])
+    p.add_argument("--buy", nargs="+", default=["DE", "FR", "ES"])
+    p.add_argument("--sell", nargs="+", default=["IT"])
+    p.add_argument("--data-dir", help="cartella degli export sintetici (riusati se già presenti)")
+    p.add_argument("--workers", type=int, default=1)
+    p.add_argument("--repeat", type=int, default=3)
+    p.add_argument("--no-memory", action="store_true", help="salta la misura del picco di memoria")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--save", help="scrive i risultati (JSON) come baseline")
+    p.add_argument("--baseline", help="baseline JSON con cui confrontare")
+    p.add_argument("--tolerance", type=float, default=0.25, help="rallentamento tollerato (0.25 = +25%%)")
+    args = p.parse_args(argv)
+
+    data_dir = args.data_dir or os.path.join(tempfile.gettempdir(), f"keepa_synth_{args.rows}_{args.seed}")
+    files = [os.path.join(data_dir, f"keepa_{loc}_{args.rows}.csv") for loc in args.locales]
+    if not all(os.path.exists(f) for f in files):
+        t0 = time.perf_counter()
+        files = write_exports(data_dir, args.rows, args.locales, seed=args.seed)
+        print(f"export sintetici generati in {data_dir} ({time.perf_counter() - t0:.1f}s)")
+
+    results = run_suite(files, args.buy, args.sell, workers=args.workers, repeat=args.repeat, memory=not args.no_memory)
+    table = pd.DataFrame(results).T.reindex(STAGES)
+    table[["rows_in", "rows_out"]] = table[["rows_in", "rows_out"]].astype(int)
+    with pd.option_context("display.float_format", "{:,.3f}".format, "display.width", 120):
+        print(table[["rows_in", "rows_out", "seconds", "rows_per_s", "peak_mb"]])
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as fh:
+            json.dump({"meta": _meta(args), "stages": results}, fh, indent=2)
+        print(f"baseline salvata in {args.save}")
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as fh:
+            base = json.load(fh)
+        if base.get("meta", {}).get("rows_per_file") != args.rows:
+            print(f"attenzione: baseline misurata con {base['meta'].get('rows_per_file')} righe per file")
+        cmp = compare(results, base["stages"], args.tolerance)
+        with pd.option_context("display.float_format", "{:,.3f}".format, "display.width", 120):
+            print(cmp.to_string(index=False))
+        if cmp["regression"].any():
+            print("REGRESSIONE: " + ", ".join(cmp.loc[cmp["regression"], "stage"]))
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,239 @@
+"""Pipeline Score v2 senza Streamlit (batch notturni).
+
+Esempio:
+    python cli.py exports/ --buy DE FR ES --sell IT --discount DE=0.05 --out risultati.parquet
+    python cli.py exports/ --all-pairs --workers 8 --out risultati.csv.gz
+    python cli.py exports/ --config batch.json
+    python cli.py exports/ --all-pairs --stream --out risultati.parquet
+"""
+from __future__ import annotations
+import argparse
+import glob
+import itertools
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from core.arbitrage import build_pairs
+from core.cache import UploadCache
+from core.config import DEFAULT_VAT, WEIGHTS, PIPELINE_COLS
+from core.export import export_frame
+from core.features import merge_norm_stats, score_norm_stats
+from core.loaders import load_many
+from core.pipeline import filtered_margins, score_pairs, sell_side_features, sell_view, with_scores
+from core.scoring_v2 import component_score_matrix, rescore, top_k_indices
+from core.streaming import score_parquet
+from utils import apply_vat_discount_rules_array
+
+_OUT_FORMATS = {".parquet": "parquet", ".gz": "csv.gz", ".xlsx": "xlsx"}
+
+def _key_values(items: list[str] | None, what: str) -> dict:
+    out = {}
+    for item in items or []:
+        k, sep, v = item.partition("=")
+        if not sep:
+            raise SystemExit(f"{what}: atteso CHIAVE=VALORE, trovato '{item}'")
+        out[k.strip()] = float(v)
+    return out
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Amazon Market Analyzer – pipeline Score v2 da riga di comando")
+    p.add_argument("inputs", nargs="*", help="File o cartelle con export Keepa (CSV/XLSX)")
+    p.add_argument("--config", help="File JSON con gli stessi parametri (gli argomenti espliciti hanno precedenza)")
+    p.add_argument("--buy", nargs="+", help="Paesi ACQUISTO (es. DE FR ES)")
+    p.add_argument("--sell", nargs="+", help="Paesi VENDITA (es. IT)")
+    p.add_argument("--all-pairs", action="store_true", help="Ogni coppia paese acquisto→vendita separatamente, in parallelo")
+    p.add_argument("--discount", nargs="*", metavar="PAESE=SCONTO", help="Sconti acquisto per paese (0..1)")
+    p.add_argument("--ship-mode", choices=["FBA", "FBM"], help="Modalità spedizione per VENDITA")
+    p.add_argument("--weights", nargs="*", metavar="NOME=PESO", help=f"Pesi Score v2 ({', '.join(WEIGHTS)})")
+    p.add_argument("--min-margin-eur", type=float, help="Scarta in pairing le coppie sotto questo margine (€)")
+    p.add_argument("--min-margin-pct", type=float, help="Scarta in pairing le coppie sotto questo ROI (0..1)")
+    p.add_argument("--top-n", type=int, help="Scrivi solo le prime N coppie per punteggio")
+    p.add_argument("--workers", type=int, help="Processi per lettura file e --all-pairs")
+    p.add_argument("--no-cache", action="store_true", help="Non usare la cache su disco dei file già letti")
+    p.add_argument("--stream", action="store_true",
+                   help="Margini su disco per coppia di paesi e scoring a blocchi (risultati più grandi della RAM; solo .parquet, non ordinati)")
+    p.add_argument("--batch-rows", type=int, help="Righe per blocco con --stream")
+    p.add_argument("--out", help="File risultati (.parquet, .csv.gz, .xlsx)")
+    args = p.parse_args(argv)
+
+    defaults = {"ship_mode": "FBA", "out": "ama_v2_results.parquet", "discount": [], "weights": []}
+    config = {}
+    if args.config:
+        with open(args.config, "r", encoding="utf-8") as fh:
+            config = json.load(fh)
+        for key in ("discount", "weights"):
+            if isinstance(config.get(key), dict):
+                config[key] = [f"{k}={v}" for k, v in config[key].items()]
+    flags = {"all_pairs", "no_cache", "stream"}
+    for key, value in vars(args).items():
+        # "not given" = None (or [] for positional inputs; False for flags): a real 0 is kept
+        unset = value is False if key in flags else (value is None or (key == "inputs" and value == []))
+        if unset and key in config:
+            setattr(args, key, config[key])
+        elif value is None and key in defaults:
+            setattr(args, key, defaults[key])
+    if not args.inputs:
+        p.error("nessun file/cartella in input")
+    if not args.all_pairs and not (args.buy and args.sell):
+        p.error("servono --buy e --sell (oppure --all-pairs)")
+    if args.stream and not str(args.out).lower().endswith(".parquet"):
+        p.error("--stream scrive solo .parquet")
+    if args.stream and args.top_n is not None:
+        p.error("--top-n non disponibile con --stream")
+    return args
+
+def expand_inputs(inputs: list[str]) -> list[str]:
+    files = []
+    for item in inputs:
+        if os.path.isdir(item):
+            for ext in ("*.csv", "*.xlsx", "*.xls"):
+                files.extend(sorted(glob.glob(os.path.join(item, ext))))
+        else:
+            files.append(item)
+    return files
+
+_SHARED: dict = {}
+
+def _init_worker(df_all: pd.DataFrame, params: dict) -> None:
+    _SHARED["df"] = df_all
+    _SHARED["params"] = params
+
+def _timed(timings: dict, name: str, fn):
+    t0 = time.perf_counter()
+    out = fn()
+    timings[name] = timings.get(name, 0.0) + time.perf_counter() - t0
+    return out
+
+def _margins_pair(pair: tuple[str, str]):
+    """Pairs and margins of one (buy, sell) job, plus the score bounds of its rows."""
+    p, timings = _SHARED["params"], {}
+    pairs = _timed(timings, "pairs", lambda: build_pairs(
+        _SHARED["df"], [pair[0]], [pair[1]],
+        min_margin_eur=p["min_margin_eur"], min_margin_pct=p["min_margin_pct"],
+        vat_sell_map=DEFAULT_VAT, discount_map=p["discount_map"],
+        vat_discount_array_fn=apply_vat_discount_rules_array,
+    ))
+    marg = _timed(timings, "margins", lambda: filtered_margins(
+        pairs, p["discount_map"], p["ship_mode"], p["min_margin_eur"], p["min_margin_pct"]))
+    return marg, score_norm_stats(sell_view(marg)), timings
+
+def _spill_pair(job: tuple[tuple[str, str], str]):
+    """Margins of one (buy, sell) job written to `path`; None when the job has no pairs."""
+    pair, path = job
+    marg, _, timings = _margins_pair(pair)
+    if marg.empty:
+        return None, timings
+    _timed(timings, "spill", lambda: marg.to_parquet(path, index=False))
+    return path, timings
+
+def _features_part(job: tuple[pd.DataFrame, dict]):
+    marg, bounds = job
+    timings: dict = {}
+    df = _timed(timings, "features", lambda: sell_side_features(marg, stats=bounds, workers=1))
+    return df, timings
+
+def run(args: argparse.Namespace) -> int:
+    t_start = time.perf_counter()
+    timings: dict = {}
+    files = expand_inputs(args.inputs)
+    if not files:
+        print("Nessun file trovato.", file=sys.stderr)
+        return 1
+
+    t0 = time.perf_counter()
+    cache = None if args.no_cache else UploadCache()
+    df_all = load_many(files, cache=cache, workers=args.workers, columns=PIPELINE_COLS)
+    timings["load"] = time.perf_counter() - t0
+    if df_all.empty:
+        print("Nessun dato caricato.", file=sys.stderr)
+        return 1
+
+    params = {
+        "discount_map": {k.upper(): v for k, v in _key_values(args.discount, "--discount").items()},
+        "ship_mode": args.ship_mode,
+        "weights": _key_values(args.weights, "--weights"),
+        "min_margin_eur": args.min_margin_eur,
+        "min_margin_pct": args.min_margin_pct,
+    }
+    if args.all_pairs or args.stream:
+        countries = sorted(c for c in df_all["country"].dropna().unique().tolist() if c)
+        buy = args.buy or countries
+        sell = args.sell or countries
+        jobs = [(b, s) for b, s in itertools.product(buy, sell) if b != s]
+        workers = max(1, min(args.workers or os.cpu_count() or 1, len(jobs) or 1))
+    if args.stream:
+        return _run_stream(args, files, df_all, params, jobs, workers, timings, t_start)
+    if args.all_pairs:
+        # Two phases, so every pair is normalized with the bounds of all of them (as the app
+        # does): margins + per-pair bounds, then features with the merged bounds.
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(df_all, params)) as pool:
+            margins = [m for m in pool.map(_margins_pair, jobs) if not m[0].empty]
+            bounds = merge_norm_stats([st for _, st, _ in margins])
+            features = list(pool.map(_features_part, [(m, bounds) for m, _, _ in margins]))
+        for t in [t for _, _, t in margins] + [t for _, t in features]:
+            for k, v in t.items():
+                timings[k] = timings.get(k, 0.0) + v
+        frames = [df for df, _ in features]
+        if frames:
+            df_feat = pd.concat(frames, ignore_index=True)
+            df_scored = _timed(timings, "score", lambda: with_scores(
+                df_feat, rescore(component_score_matrix(df_feat), params["weights"])))
+        else:
+            df_scored = pd.DataFrame()
+    else:
+        df_scored = score_pairs(df_all, args.buy, args.sell, timings=timings, **params)
+
+    if df_scored.empty:
+        print("Nessuna coppia mercato generata.", file=sys.stderr)
+        return 1
+
+    t0 = time.perf_counter()
+    out = args.out
+    fmt = _OUT_FORMATS.get(os.path.splitext(out)[1].lower())
+    if fmt is None:
+        print(f"Estensione di output non supportata: {out} (usa .parquet, .csv.gz, .xlsx)", file=sys.stderr)
+        return 2
+    order = top_k_indices(df_scored["opportunity_score_v2"].to_numpy(dtype=float, na_value=float("nan")),
+                          args.top_n or len(df_scored))
+    export_frame(df_scored, out, fmt, order=order)
+    timings["export"] = time.perf_counter() - t0
+
+    print(f"{len(files)} file, {len(df_all):,} righe, {len(df_scored):,} coppie -> {out}")
+    for name, secs in timings.items():
+        print(f"  {name:<9} {secs:8.3f}s")
+    print(f"  {'totale':<9} {time.perf_counter() - t_start:8.3f}s")
+    return 0
+
+def _run_stream(args, files, df_all, params, jobs, workers, timings, t_start) -> int:
+    """--stream: each job's margins go to a Parquet part, then two-pass scoring of all the parts
+    (global bounds first, then one batch at a time): only one batch of pairs is scored in memory."""
+    with tempfile.TemporaryDirectory(prefix="ama_v2_stream_") as tmp:
+        parts = [(pair, os.path.join(tmp, f"marg_{i:04d}.parquet")) for i, pair in enumerate(jobs)]
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(df_all, params)) as pool:
+            spilled = list(pool.map(_spill_pair, parts))
+        for _, t in spilled:
+            for k, v in t.items():
+                timings[k] = timings.get(k, 0.0) + v
+        paths = [path for path, _ in spilled if path]
+        if not paths:
+            print("Nessuna coppia mercato generata.", file=sys.stderr)
+            return 1
+        info = _timed(timings, "score", lambda: score_parquet(paths, args.out, params["weights"], args.batch_rows))
+
+    print(f"{len(files)} file, {len(df_all):,} righe, {info['rows']:,} coppie -> {args.out}")
+    for name, secs in timings.items():
+        print(f"  {name:<9} {secs:8.3f}s")
+    print(f"  {'totale':<9} {time.perf_counter() - t_start:8.3f}s")
+    return 0
+
+def main(argv: list[str] | None = None) -> int:
+    return run(parse_args(argv))
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,6 +2,7 @@ from __future__ import annotations
 import numpy as np
 import pandas as pd
 from typing import Dict, Callable
+from .badges import pack_flags
 from .config import DEFAULT_VAT, REFERRAL_FEE_DEFAULT, FBM_FLAT_EUR, PRICE_COL_BUY_CANDIDATES, PRICE_COL_SELL
 
 def pick_buy_price(row: pd.Series) -> float | None:
@@ -19,10 +20,118 @@ def estimate_fees(sell_price: float, referral_pct: float | None, fba_pickpack: f
         return referral_fee + float(fba_pickpack or 0.0)
     return referral_fee + FBM_FLAT_EUR
 
-def build_pairs(df: pd.DataFrame, buy_countries: list[str], sell_countries: list[str]) -> pd.DataFrame:
+def fee_terms(referral_pct, fba_pickpack, ship_mode: str) -> tuple[np.ndarray, np.ndarray | float]:
+    """Fees as `sell_price * rate + fixed`: (rate, fixed) per row, NaN referral % -> REFERRAL_FEE_DEFAULT."""
+    ref = np.asarray(referral_pct, dtype=float)
+    rate = np.where(np.isnan(ref), REFERRAL_FEE_DEFAULT, ref)
+    if ship_mode.upper() == "FBA":
+        return rate, np.nan_to_num(np.asarray(fba_pickpack, dtype=float), nan=0.0)
+    return rate, FBM_FLAT_EUR
+
+def estimate_fees_array(sell_price, referral_pct, fba_pickpack, ship_mode: str) -> np.ndarray:
+    """Vectorized `estimate_fees`: NaN referral % falls back to REFERRAL_FEE_DEFAULT."""
+    rate, fixed = fee_terms(referral_pct, fba_pickpack, ship_mode)
+    return np.asarray(sell_price, dtype=float) * rate + fixed
+
+def fee_inputs(res: pd.DataFrame) -> tuple[pd.Series, pd.Series]:
+    """SELL-side referral % (as a fraction) and FBA pick&pack fee of the margins (or their sell view)."""
+    nan_col = pd.Series(np.nan, index=res.index)
+    referral_pct = res.get("referral_fee_pct_sell", res.get("referral_fee_pct", nan_col)).astype(float)
+    fba_pickpack = res.get("fba_pickpack_fee_sell", res.get("fba_pickpack_fee", nan_col)).astype(float).fillna(0)
+    return referral_pct.where(~(referral_pct > 1), referral_pct / 100.0), fba_pickpack
+
+def coalesce_buy_price(pairs: pd.DataFrame) -> pd.Series:
+    """Column-wise `pick_buy_price`: first non-null of PRICE_COL_BUY_CANDIDATES."""
+    buy = pd.Series(np.nan, index=pairs.index, dtype=float)
+    for c in PRICE_COL_BUY_CANDIDATES:
+        col = f"{c}_buy" if f"{c}_buy" in pairs.columns else c
+        if col in pairs.columns:
+            buy = buy.fillna(pairs[col].astype(float))
+    return buy
+
+def map_by_country(countries: pd.Series, fn: Callable[[object], float]) -> np.ndarray:
+    """Evaluate `fn` once per distinct country value and broadcast it back."""
+    codes, uniques = pd.factorize(countries, use_na_sentinel=False)
+    return np.array([fn(c) for c in uniques], dtype=float)[codes]
+
+def vat_lookup(vat_sell_map: Dict[str, float] | None) -> Dict[str, float]:
+    vat_map = DEFAULT_VAT.copy()
+    if vat_sell_map:
+        vat_map.update({k.upper(): v for k, v in vat_sell_map.items()})
+    return vat_map
+
+def margin_upper_bound_inputs(
+    buy_df: pd.DataFrame,
+    sell_df: pd.DataFrame,
+    vat_sell_map: Dict[str, float] | None,
+    discount_map: Dict[str, float] | None,
+    vat_discount_array_fn: Callable[..., np.ndarray],
+) -> tuple[np.ndarray, np.ndarray]:
+    """Per-row buy net (after VAT and discount) and sell net (after VAT, before fees).
+
+    Same formulas as compute_margins, so `sell_net - buy_net` bounds gross_margin_eur from above
+    (fees are never negative).
+    """
+    vat_map = vat_lookup(vat_sell_map)
+    vat_buy = map_by_country(buy_df["country"], lambda c: vat_map.get(str(c).upper(), 0.22))
+    discount_buy = map_by_country(buy_df["country"], lambda c: (discount_map or {}).get(str(c).upper(), 0.0))
+    buy_net = vat_discount_array_fn(coalesce_buy_price(buy_df), vat_buy, discount_buy, buy_df["country"])
+    vat_sell = map_by_country(sell_df["country"], lambda c: vat_map.get(str(c).upper(), 0.22))
+    sell_net = sell_df[PRICE_COL_SELL].astype(float).to_numpy() / (1.0 + vat_sell)
+    return np.asarray(buy_net, dtype=float), sell_net
+
+def _reachable(buy_net, sell_net, min_margin_eur: float | None, min_margin_pct: float | None) -> np.ndarray:
+    bound = sell_net - buy_net
+    ok = np.ones(len(bound), dtype=bool)
+    if min_margin_eur is not None:
+        ok &= bound >= min_margin_eur
+    if min_margin_pct is not None:
+        # with a non-positive buy net the ratio's direction flips: never prune those rows
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ok &= (buy_net <= 0) | (bound / buy_net >= min_margin_pct)
+    return ok
+
+def build_pairs(
+    df: pd.DataFrame,
+    buy_countries: list[str],
+    sell_countries: list[str],
+    min_margin_eur: float | None = None,
+    min_margin_pct: float | None = None,
+    vat_sell_map: Dict[str, float] | None = None,
+    discount_map: Dict[str, float] | None = None,
+    vat_discount_array_fn: Callable[..., np.ndarray] | None = None,
+) -> pd.DataFrame:
+    """Buy×sell pairs per ASIN.
+
+    With `min_margin_eur` / `min_margin_pct`, pairs whose margin upper bound (buy net after
+    discount vs sell net before fees) can't reach the threshold are never materialized: the
+    join runs on narrow key frames first and only surviving rows are gathered. The number of
+    pruned pairs is reported in `pairs.attrs["pruned_pairs"]`.
+    """
     buy_df = df[df["country"].isin(buy_countries)].copy()
     sell_df = df[df["country"].isin(sell_countries)].copy()
-    pairs = buy_df.merge(sell_df, on="asin", how="inner", suffixes=("_buy","_sell"))
+    if min_margin_eur is None and min_margin_pct is None:
+        pairs = buy_df.merge(sell_df, on="asin", how="inner", suffixes=("_buy","_sell"))
+        pairs.attrs["pruned_pairs"] = 0
+        return pairs
+    if vat_discount_array_fn is None:
+        raise ValueError("Pruning per margine minimo: serve vat_discount_array_fn per stimare il netto acquisto.")
+
+    buy_net, sell_net = margin_upper_bound_inputs(buy_df, sell_df, vat_sell_map, discount_map, vat_discount_array_fn)
+    buy_keys = pd.DataFrame({"asin": buy_df["asin"].to_numpy(), "_b": np.arange(len(buy_df)), "_bn": buy_net})
+    sell_keys = pd.DataFrame({"asin": sell_df["asin"].to_numpy(), "_s": np.arange(len(sell_df)), "_sn": sell_net})
+    keys = buy_keys.merge(sell_keys, on="asin", how="inner")
+    keep = _reachable(keys["_bn"].to_numpy(), keys["_sn"].to_numpy(), min_margin_eur, min_margin_pct)
+    b_idx = keys["_b"].to_numpy()[keep]
+    s_idx = keys["_s"].to_numpy()[keep]
+
+    left = buy_df.iloc[b_idx].reset_index(drop=True)
+    right = sell_df.iloc[s_idx].reset_index(drop=True).drop(columns="asin")
+    common = set(left.columns) & set(right.columns)
+    left = left.rename(columns={c: f"{c}_buy" for c in common})
+    right = right.rename(columns={c: f"{c}_sell" for c in common})
+    pairs = pd.concat([left, right], axis=1)
+    pairs.attrs["pruned_pairs"] = int(len(keep) - keep.sum())
     return pairs
 
 def compute_margins(
@@ -31,11 +140,12 @@ def compute_margins(
     discount_map: Dict[str, float] | None,
     ship_mode: str,
     vat_discount_fn: Callable[[float, float, float, str], float],
+    vat_discount_array_fn: Callable[..., np.ndarray] | None = None,
 ) -> pd.DataFrame:
     res = pairs.copy()
 
     # buy price
-    res["buy_price"] = res.apply(lambda r: pick_buy_price(r), axis=1)
+    res["buy_price"] = coalesce_buy_price(res)
 
     # sell price
     sell_col = "buybox_current_sell"
@@ -44,32 +154,28 @@ def compute_margins(
     res["sell_price"] = res[sell_col].astype(float)
 
     # VATs
-    vat_map = DEFAULT_VAT.copy()
-    if vat_sell_map:
-        vat_map.update({k.upper(): v for k, v in vat_sell_map.items()})
-
-    res["vat_buy"] = res["country_buy"].map(lambda c: vat_map.get(str(c).upper(), 0.22))
-    res["vat_sell"] = res["country_sell"].map(lambda c: vat_map.get(str(c).upper(), 0.22))
-    res["discount_buy"] = res["country_buy"].map(lambda c: (discount_map or {}).get(str(c).upper(), 0.0))
-
-    # Net buy using EXISTING rules (kept unchanged)
-    res["buy_net"] = res.apply(
-        lambda r: float(vat_discount_fn(r["buy_price"], r["vat_buy"], r["discount_buy"], str(r["country_buy"])))
-        if pd.notna(r["buy_price"]) else np.nan, axis=1
-    )
+    vat_map = vat_lookup(vat_sell_map)
+
+    res["vat_buy"] = map_by_country(res["country_buy"], lambda c: vat_map.get(str(c).upper(), 0.22))
+    res["vat_sell"] = map_by_country(res["country_sell"], lambda c: vat_map.get(str(c).upper(), 0.22))
+    res["discount_buy"] = map_by_country(res["country_buy"], lambda c: (discount_map or {}).get(str(c).upper(), 0.0))
+
+    # Net buy using EXISTING rules (kept unchanged): array form of the rule when given,
+    # otherwise the scalar rule row by row
+    if vat_discount_array_fn is not None:
+        res["buy_net"] = vat_discount_array_fn(res["buy_price"], res["vat_buy"], res["discount_buy"], res["country_buy"])
+    else:
+        res["buy_net"] = res.apply(
+            lambda r: float(vat_discount_fn(r["buy_price"], r["vat_buy"], r["discount_buy"], str(r["country_buy"])))
+            if pd.notna(r["buy_price"]) else np.nan, axis=1
+        )
 
     # Net sell
     res["sell_net"] = res["sell_price"] / (1.0 + res["vat_sell"].fillna(0.0))
 
     # Fees
-    referral_pct = res.get("referral_fee_pct_sell", res.get("referral_fee_pct", np.nan)).fillna(np.nan)
-    fba_pickpack = res.get("fba_pickpack_fee_sell", res.get("fba_pickpack_fee", 0)).fillna(0)
-    referral_pct = referral_pct.map(lambda v: (v/100.0) if (pd.notna(v) and v>1) else v)
-
-    res["fees"] = [
-        estimate_fees(float(sp or 0), float(rp) if pd.notna(rp) else None, float(pp or 0), ship_mode)
-        for sp, rp, pp in zip(res["sell_price"], referral_pct, fba_pickpack)
-    ]
+    referral_pct, fba_pickpack = fee_inputs(res)
+    res["fees"] = estimate_fees_array(res["sell_price"], referral_pct, fba_pickpack, ship_mode)
 
     # Margins
     res["gross_margin_eur"] = res["sell_net"] - res["fees"] - res["buy_net"]
@@ -77,8 +183,41 @@ def compute_margins(
 
     return res
 
-def attach_badges_for_pairs(df_pairs: pd.DataFrame) -> pd.DataFrame:
-    df = df_pairs.copy()
+def add_break_even(df_marg: pd.DataFrame, ship_mode: str, target_margin_pct: float,
+                   discount_for_net_fn: Callable[..., np.ndarray]) -> pd.DataFrame:
+    """The margins plus negotiation columns, in closed form (no search over discounts):
+
+    - break_even_discount: buy discount at which gross_margin_eur is 0
+    - target_discount: buy discount at which margin_pct reaches `target_margin_pct`
+    - min_sell_price: sell price (VAT incl.) reaching `target_margin_pct` at the current buy net
+
+    Fees are linear in the sell price and both discount rules are linear in the discount
+    (`discount_for_net_fn` inverts them). Negative discounts mean the margin is already
+    there without one; NaN where no discount (or price) can reach it.
+    """
+    m = float(target_margin_pct)
+    # sell_net - fees is what's left to cover the buy net: margin_pct = m  <=>  buy_net = left / (1 + m)
+    left = df_marg["sell_net"].to_numpy(dtype=float) - df_marg["fees"].to_numpy(dtype=float)
+    left = np.where(left > 0, left, np.nan)
+    price = df_marg["buy_price"].to_numpy(dtype=float)
+    vat = df_marg["vat_buy"].to_numpy(dtype=float)
+    country = df_marg["country_buy"]
+
+    rate, fixed = fee_terms(*fee_inputs(df_marg), ship_mode)
+    vat_sell = df_marg["vat_sell"] if "vat_sell" in df_marg.columns else df_marg["vat"]  # or its sell view
+    keep = 1.0 / (1.0 + vat_sell.fillna(0.0).to_numpy(dtype=float)) - rate  # net per € of sell price
+    need = (1.0 + m) * df_marg["buy_net"].to_numpy(dtype=float) + fixed
+    with np.errstate(divide="ignore", invalid="ignore"):
+        min_sell = np.where(keep > 0, need / keep, np.nan)
+    return df_marg.assign(
+        break_even_discount=discount_for_net_fn(price, vat, left, country),
+        target_discount=discount_for_net_fn(price, vat, left / (1.0 + m), country),
+        min_sell_price=min_sell,
+    )
+
+def attach_badges_for_pairs(df_pairs: pd.DataFrame, inplace: bool = False, strings: bool = True) -> pd.DataFrame:
+    """`pair_badge_flags` (uint8, bits in PAIR_BADGES order) and, with `strings`, `pair_badges` text."""
+    df = df_pairs if inplace else df_pairs.copy()
     # Safely handle missing columns by providing defaults that preserve existing behaviour
     default_str = pd.Series("", index=df.index)
 
@@ -97,6 +236,9 @@ def attach_badges_for_pairs(df_pairs: pd.DataFrame) -> pd.DataFrame:
     cond_oos90 = numeric_condition("amazon_90d_oos_sell", lambda s: s > 10)
     cond_low_amz_pct = numeric_condition("buybox_pct_amz_90d_sell", lambda s: s < 0.2)
     cond_few_sellers = numeric_condition("total_offer_count_sell", lambda s: s <= 8)
+    df["pair_badge_flags"] = pack_flags([cond_no_amz, cond_oos90, cond_low_amz_pct, cond_few_sellers])
+    if not strings:
+        return df
     df["pair_badges"] = (
         cond_no_amz.map({True:"No Amazon", False:""}).fillna("")
         + cond_oos90.map({True:" OOS90", False:""}).fillna("")
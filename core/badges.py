@@ -0,0 +1,55 @@
+from __future__ import annotations
+from typing import Dict, List, Sequence
+import numpy as np
+import pandas as pd
+
+# Bit i of the flag column = label i. Order is part of the stored format: append, don't reorder.
+DETECTOR_BADGES = ["Window Advantage", "Volatility Flip", "Low Guarded Buybox", "Risk Alert"]
+PAIR_BADGES = ["No Amazon", "OOS90", "Low%AMZ", "FewSellers"]
+
+# text column -> (flag column, labels, separator), as add_detectors / attach_badges_for_pairs wrote them
+BADGE_TEXT_COLS: Dict[str, tuple] = {
+    "badges": ("badge_flags", DETECTOR_BADGES, ", "),
+    "pair_badges": ("pair_badge_flags", PAIR_BADGES, " "),
+}
+
+def pack_flags(conditions: Sequence) -> np.ndarray:
+    """uint8 bit-flags from boolean conditions (Series/arrays), bit i = conditions[i]."""
+    flags = None
+    for i, cond in enumerate(conditions):
+        bits = np.asarray(cond, dtype=bool).astype(np.uint8) << i
+        flags = bits if flags is None else flags | bits
+    return flags
+
+def flag_labels(flags, labels: List[str], sep: str) -> np.ndarray:
+    """Badge text per row: one lookup in a 2**len(labels) table, no per-row string building."""
+    table = np.array(
+        [sep.join(l for i, l in enumerate(labels) if v >> i & 1) for v in range(1 << len(labels))],
+        dtype=object,
+    )
+    return table[np.asarray(flags, dtype=np.intp)]
+
+def with_badge_text(df: pd.DataFrame, columns: List[str] | None = None) -> pd.DataFrame:
+    """`df` plus the badge text columns (all, or those in `columns`) decoded from their flags.
+
+    Meant for the rows actually shown or exported; columns that already hold text are kept.
+    """
+    add = {}
+    for text_col, (flag_col, labels, sep) in BADGE_TEXT_COLS.items():
+        if (columns is None or text_col in columns) and text_col not in df.columns and flag_col in df.columns:
+            add[text_col] = pd.Series(flag_labels(df[flag_col].to_numpy(), labels, sep), index=df.index, dtype="str")
+    return df.assign(**add) if add else df
+
+def badge_mask(df: pd.DataFrame, wanted: List[str], match_all: bool = False) -> np.ndarray:
+    """Rows carrying any (or, with `match_all`, every) badge in `wanted`: bitwise tests on the flags."""
+    mask = np.zeros(len(df), dtype=bool) if not match_all else np.ones(len(df), dtype=bool)
+    for flag_col, labels, _ in BADGE_TEXT_COLS.values():
+        bits = sum(1 << labels.index(b) for b in wanted if b in labels)
+        if not bits:
+            continue
+        if flag_col not in df.columns:
+            flags = np.zeros(len(df), dtype=np.uint8)
+        else:
+            flags = df[flag_col].to_numpy()
+        mask = (mask & ((flags & bits) == bits)) if match_all else (mask | ((flags & bits) != 0))
+    return mask
@@ -0,0 +1,147 @@
+from __future__ import annotations
+import hashlib
+import json
+import os
+import pathlib
+import pandas as pd
+from .config import ALIAS_MAP, PRICE_COLS, PCT_COLS, INT_COLS, CACHE_DIR, CACHE_MAX_BYTES
+
+# Bump when the parsing of uploads changes in a way the config fingerprint can't see
+CACHE_FORMAT_VERSION = 1
+_HASH_CHUNK = 1 << 20
+
+def config_fingerprint() -> str:
+    """Hash of everything (besides the file bytes) that shapes the parsed frame."""
+    payload = json.dumps(
+        {
+            "version": CACHE_FORMAT_VERSION,
+            "alias_map": ALIAS_MAP,
+            "price_cols": PRICE_COLS,
+            "pct_cols": PCT_COLS,
+            "int_cols": INT_COLS,
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def file_digest(path_or_file) -> str:
+    """sha256 of the file content; file-like objects are rewound afterwards."""
+    h = hashlib.sha256()
+    if isinstance(path_or_file, (str, os.PathLike)):
+        with open(path_or_file, "rb") as fh:
+            while chunk := fh.read(_HASH_CHUNK):
+                h.update(chunk)
+        return h.hexdigest()
+    if hasattr(path_or_file, "getbuffer"):
+        h.update(path_or_file.getbuffer())
+        return h.hexdigest()
+    pos = path_or_file.tell()
+    path_or_file.seek(0)
+    while chunk := path_or_file.read(_HASH_CHUNK):
+        h.update(chunk.encode("utf-8") if isinstance(chunk, str) else chunk)
+    path_or_file.seek(pos)
+    return h.hexdigest()
+
+class UploadCache:
+    """On-disk, content-addressed cache of parsed uploads (one Parquet file per upload).
+
+    Entries are keyed by the file digest plus `config_fingerprint()`, so editing
+    ALIAS_MAP or the typed column lists invalidates them. Reads refresh the entry's
+    mtime and writes evict the least recently used entries beyond `max_bytes`.
+    """
+
+    def __init__(self, root: str | os.PathLike | None = None, max_bytes: int | None = None):
+        self.root = pathlib.Path(root or CACHE_DIR).expanduser()
+        self.max_bytes = CACHE_MAX_BYTES if max_bytes is None else int(max_bytes)
+        self._fingerprint = config_fingerprint()
+
+    def key_for(self, path_or_file, columns: list[str] | None = None) -> str:
+        name = getattr(path_or_file, "name", str(path_or_file)).lower()
+        ext = pathlib.PurePath(name).suffix or ".csv"
+        projection = ",".join(columns) if columns is not None else "*"
+        raw = f"{file_digest(path_or_file)}:{ext}:{projection}:{self._fingerprint}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> pathlib.Path:
+        return self.root / f"{key}.parquet"
+
+    def get(self, key: str, columns: list[str] | None = None) -> pd.DataFrame | None:
+        """Cached frame (only `columns` of it, when given), or None."""
+        path = self._path(key)
+        if not path.exists():
+            return None
+        try:
+            df = pd.read_parquet(path, columns=columns)
+        except Exception:
+            path.unlink(missing_ok=True)
+            return None
+        os.utime(path)
+        return df
+
+    def column_names(self, key: str) -> list[str] | None:
+        """Columns of a cached entry, read from the Parquet footer; None when not cached."""
+        path = self._path(key)
+        if not path.exists():
+            return None
+        try:
+            import pyarrow.parquet as pq
+            return list(pq.read_schema(path).names)
+        except Exception:
+            path.unlink(missing_ok=True)
+            return None
+
+    def put(self, key: str, df: pd.DataFrame) -> bool:
+        """Store `df`; returns False when the frame can't be written as Parquet."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+        tmp = path.with_suffix(".tmp")
+        try:
+            df.to_parquet(tmp, index=False)
+            os.replace(tmp, path)
+        except Exception:
+            tmp.unlink(missing_ok=True)
+            return False
+        self.evict()
+        return True
+
+    def entries(self) -> pd.DataFrame:
+        """One row per cached upload, most recently used first."""
+        rows = []
+        if self.root.exists():
+            for p in self.root.glob("*.parquet"):
+                st = p.stat()
+                rows.append({"key": p.stem, "bytes": st.st_size, "last_used": st.st_mtime})
+        df = pd.DataFrame(rows, columns=["key", "bytes", "last_used"])
+        df["last_used"] = pd.to_datetime(df["last_used"], unit="s")
+        return df.sort_values("last_used", ascending=False, ignore_index=True)
+
+    def info(self) -> dict:
+        entries = self.entries()
+        return {
+            "path": str(self.root),
+            "entries": len(entries),
+            "bytes": int(entries["bytes"].sum()),
+            "max_bytes": self.max_bytes,
+        }
+
+    def evict(self) -> int:
+        """Drop least recently used entries until the cache fits in `max_bytes`."""
+        entries = self.entries()
+        total = int(entries["bytes"].sum())
+        removed = 0
+        for row in entries.iloc[::-1].itertuples():
+            if total <= self.max_bytes:
+                break
+            self._path(row.key).unlink(missing_ok=True)
+            total -= row.bytes
+            removed += 1
+        return removed
+
+    def clear(self) -> int:
+        removed = 0
+        if self.root.exists():
+            for p in self.root.glob("*.parquet"):
+                p.unlink(missing_ok=True)
+                removed += 1
+        return removed
@@ -0,0 +1,117 @@
+from __future__ import annotations
+import re
+import numpy as np
+import pandas as pd
+from .config import INT_COLS
+
+# Low-cardinality labels -> categorical; free text / ids -> Arrow-backed strings, or categorical
+# when repeated enough (in `pairs` every ASIN's text is repeated once per buy/sell combination)
+CATEGORY_COLS = ["country", "locale", "brand", "category_root"]
+TEXT_COLS = ["asin", "title", "url_amazon", "url_keepa", "brand_store_url"]
+TEXT_CATEGORY_MAX_RATIO = 0.5
+_SIDE = re.compile(r"_(buy|sell)$")
+_ARROW_STR = pd.StringDtype("pyarrow", na_value=np.nan)
+
+def _base(col: str) -> str:
+    return _SIDE.sub("", col)
+
+def _is_score(col: str) -> bool:
+    return col.startswith("score_") or col == "opportunity_score_v2"
+
+def _downcast_lossless(s: pd.Series) -> pd.Series:
+    """int32 when every value fits (no NaN), else float32 when the round trip is exact."""
+    v = s.to_numpy(dtype=np.float64, na_value=np.nan)
+    finite = v[~np.isnan(v)]
+    if not np.isnan(v).any() and len(v) and np.array_equal(finite, np.trunc(finite)) \
+            and finite.min() >= np.iinfo(np.int32).min and finite.max() <= np.iinfo(np.int32).max:
+        return pd.Series(v.astype(np.int32), index=s.index, name=s.name)
+    v32 = v.astype(np.float32)
+    if np.array_equal(v32.astype(np.float64), v, equal_nan=True):
+        return pd.Series(v32, index=s.index, name=s.name)
+    return s
+
+def compact_frame(df: pd.DataFrame, scores: bool = True) -> pd.DataFrame:
+    """Compact-schema copy of a loaded / paired / scored frame (`_buy`/`_sell` suffixes included).
+
+    - CATEGORY_COLS become categoricals, TEXT_COLS categoricals when at most
+      TEXT_CATEGORY_MAX_RATIO of their values are distinct, Arrow-backed strings otherwise;
+    - INT_COLS (counts, ranks, sizes) are downcast to int32/float32 only when lossless;
+    - with `scores`, score_* and opportunity_score_v2 become float32 (values in [0, 1]).
+    """
+    out = {}
+    for c in df.columns:
+        s = df[c]
+        base = _base(c)
+        if base in CATEGORY_COLS and not isinstance(s.dtype, pd.CategoricalDtype):
+            s = s.astype("category")
+        elif base in TEXT_COLS and pd.api.types.is_string_dtype(s.dtype):
+            if len(s) and s.nunique() <= TEXT_CATEGORY_MAX_RATIO * len(s):
+                s = s.astype("category")
+            elif s.dtype == object:
+                s = s.astype(_ARROW_STR)
+        elif base in INT_COLS and pd.api.types.is_numeric_dtype(s.dtype):
+            s = _downcast_lossless(s)
+        elif scores and _is_score(c) and s.dtype == np.float64:
+            s = s.astype(np.float32)
+        out[c] = s
+    res = pd.DataFrame(out, index=df.index)
+    res.attrs = dict(df.attrs)
+    return res
+
+def memory_report(before: pd.DataFrame, after: pd.DataFrame) -> pd.DataFrame:
+    """Per-column deep memory (bytes) before/after compaction, plus a TOTAL row."""
+    b = before.memory_usage(deep=True, index=False)
+    a = after.memory_usage(deep=True, index=False)
+    rep = pd.DataFrame({
+        "dtype_before": before.dtypes.astype(str),
+        "dtype_after": after.dtypes.astype(str),
+        "bytes_before": b,
+        "bytes_after": a,
+    })
+    rep.loc["TOTAL"] = ["", "", int(b.sum()), int(a.sum())]
+    rep["ratio"] = rep["bytes_before"] / rep["bytes_after"].replace(0, np.nan)
+    return rep
+
+def merge_memory_reports(reports: list) -> pd.DataFrame:
+    """One `memory_report` for frames compacted in parts (bytes summed per column)."""
+    if len(reports) == 1:
+        return reports[0]
+    rep = pd.concat(reports).groupby(level=0, sort=False).agg({
+        "dtype_before": "first", "dtype_after": "first", "bytes_before": "sum", "bytes_after": "sum",
+    })
+    rep = pd.concat([rep.drop(index="TOTAL"), rep.loc[["TOTAL"]]])
+    rep["ratio"] = rep["bytes_before"] / rep["bytes_after"].replace(0, np.nan)
+    return rep
+
+def concat_compact(frames: list) -> pd.DataFrame:
+    """`pd.concat` of compact frames that stays compact.
+
+    Categoricals with different categories would fall back to object: they are recoded
+    onto the union of the categories first (no data copy beyond the codes). A column that
+    `compact_frame` made categorical in some parts and left as strings in others (its
+    choice depends on each part's repetition) becomes categorical in every part.
+    """
+    if len(frames) == 1:
+        return frames[0].reset_index(drop=True)
+    recoded = [{} for _ in frames]
+    for c in frames[0].columns:
+        dtypes = [f[c].dtype if c in f.columns else None for f in frames]
+        cats = [d for d in dtypes if isinstance(d, pd.CategoricalDtype)]
+        if not cats or all(d == dtypes[0] for d in dtypes):
+            continue
+        union = cats[0].categories
+        for f, d in zip(frames, dtypes):
+            if d is None or d == cats[0]:
+                continue
+            values = d.categories if isinstance(d, pd.CategoricalDtype) \
+                else pd.Index(f[c].dropna().unique()).astype(union.dtype)
+            union = union.append(values[~values.isin(union)])
+        for i, f in enumerate(frames):
+            if dtypes[i] is None:
+                continue
+            if isinstance(dtypes[i], pd.CategoricalDtype):
+                recoded[i][c] = f[c].cat.set_categories(union)
+            else:
+                recoded[i][c] = pd.Series(pd.Categorical(f[c], categories=union), index=f.index)
+    frames = [f.assign(**r) if r else f for f, r in zip(frames, recoded)]
+    return pd.concat(frames, ignore_index=True)
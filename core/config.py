@@ -1,4 +1,5 @@
 from __future__ import annotations
+import os
 
 WEIGHTS = {
     "margin": 0.35,
@@ -163,3 +164,44 @@ FBM_FLAT_EUR = 4.00
 
 PRICE_COL_BUY_CANDIDATES = ["new_current","buybox_current"]
 PRICE_COL_SELL = "buybox_current"
+
+# Cache su disco dei file Keepa già normalizzati (vedi core/cache.py)
+CACHE_DIR = os.environ.get("AMA_CACHE_DIR", os.path.join("~", ".cache", "amazon-market-analyzer"))
+CACHE_MAX_BYTES = 2 * 1024**3
+
+# Storico giornaliero dei dati caricati, partizionato per data/paese (vedi core/snapshots.py)
+SNAPSHOT_DIR = os.environ.get("AMA_SNAPSHOT_DIR", os.path.join("~", ".local", "share", "amazon-market-analyzer", "snapshots"))
+SNAPSHOT_AUTOSAVE = True
+
+# Processi usati da load_many per leggere più file in parallelo (1 = seriale)
+def _workers(env: str, cap: int) -> int:
+    """Process count from `env` (default: CPU count), clamped to [1, cap]."""
+    return max(1, min(int(os.environ.get(env, os.cpu_count() or 1)), cap))
+
+LOAD_WORKERS = _workers("AMA_LOAD_WORKERS", 8)
+
+# Scoring multi-processo (core/parallel.py): sotto SCORING_PARALLEL_MIN_ROWS coppie resta seriale
+SCORING_WORKERS = _workers("AMA_SCORING_WORKERS", 16)
+SCORING_PARALLEL_MIN_ROWS = 200_000
+SCORING_CHUNK_ROWS = 250_000
+# Righe per batch dello scoring in streaming a due passate (core/streaming.py)
+STREAM_BATCH_ROWS = 250_000
+
+# Colonne effettivamente usate da pairing, margini, punteggi, badge e UI: il lettore CSV a
+# blocchi (core/loaders.read_csv_streaming) legge solo queste (dopo ALIAS_MAP)
+PIPELINE_COLS = [
+    "locale", "country", "asin", "title", "brand", "category_root", "url_amazon", "url_keepa", "last_update",
+    "sales_rank_current", "sales_rank_drops_30d", "bought_past_month", "reviews_count", "reviews_90d_avg",
+    "buybox_current", "buybox_std_30d", "buybox_std_90d", "buybox_pct_amz_90d", "buybox_winner_cnt_90d",
+    "flipability_90d", "competitive_price_threshold", "suggested_lower_price", "new_current",
+    "amazon_90d_oos", "amazon_oos_cnt_30d", "amazon_offer_availability", "amazon_offer_shipping_delay",
+    "fba_pickpack_fee", "referral_fee_pct", "prime_eligible", "map_restriction", "return_rate",
+    "total_offer_count", "new_offer_count_current", "item_weight_g",
+]
+CSV_CHUNK_ROWS = 100_000
+
+# Schema compatto (categoriali, stringhe Arrow, int32/float32) per dati caricati e coppie
+COMPACT_SCHEMA = True
+
+# Scoring senza copie: gli stadi scrivono solo le nuove colonne nel frame condiviso (False = funzioni pure)
+COPY_FREE_SCORING = True
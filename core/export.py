@@ -0,0 +1,117 @@
+from __future__ import annotations
+import gzip
+import os
+import numpy as np
+import pandas as pd
+from typing import Callable, Iterator, List
+from .badges import BADGE_TEXT_COLS, with_badge_text
+
+EXPORT_FORMATS = {
+    "csv.gz": "application/gzip",
+    "parquet": "application/octet-stream",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+EXPORT_CHUNK_ROWS = 50_000
+XLSX_MAX_ROWS = 1_048_575  # Excel sheet limit, header excluded
+
+def badge_text_columns(df: pd.DataFrame) -> List[str]:
+    """Badge text columns that can be exported from the flag columns of `df`."""
+    return [t for t, (flag, _, _) in BADGE_TEXT_COLS.items() if flag in df.columns and t not in df.columns]
+
+def select_rows(df: pd.DataFrame, columns: List[str] | None = None, top_n: int | None = None,
+                order: np.ndarray | None = None) -> tuple[pd.DataFrame, np.ndarray, Callable | None]:
+    """Column subset of `df`, the row positions to export (best-first `order`, cut at `top_n`) and,
+    when badge text is requested, the per-chunk step that decodes it from the flags."""
+    virtual = badge_text_columns(df)
+    wanted = columns or list(df.columns) + virtual
+    cols = [c for c in wanted if c in df.columns or c in virtual]
+    text = [c for c in cols if c in virtual]
+    decorate = None
+    if text:
+        flags = [BADGE_TEXT_COLS[t][0] for t in text if BADGE_TEXT_COLS[t][0] not in cols]
+        decorate = lambda chunk: with_badge_text(chunk, text)[cols]
+        cols_src = [c for c in cols if c not in text] + flags
+    else:
+        cols_src = cols
+    rows = np.arange(len(df)) if order is None else np.asarray(order)
+    if top_n:
+        rows = rows[:int(top_n)]
+    return df[cols_src], rows, decorate
+
+def iter_chunks(df: pd.DataFrame, rows: np.ndarray, chunk_rows: int = EXPORT_CHUNK_ROWS,
+                decorate: Callable | None = None) -> Iterator[pd.DataFrame]:
+    """Materialize only `chunk_rows` rows of the export at a time."""
+    for start in range(0, len(rows), chunk_rows):
+        chunk = df.iloc[rows[start:start + chunk_rows]]
+        yield decorate(chunk) if decorate else chunk
+
+def _head(df: pd.DataFrame, decorate: Callable | None) -> pd.DataFrame:
+    """Zero-row frame with the exported columns (header / schema)."""
+    return decorate(df.iloc[:0]) if decorate else df.iloc[:0]
+
+def write_csv_gz(df: pd.DataFrame, rows: np.ndarray, path: str, chunk_rows: int = EXPORT_CHUNK_ROWS,
+                 decorate: Callable | None = None) -> None:
+    with gzip.open(path, "wt", encoding="utf-8", newline="") as fh:
+        if len(rows) == 0:
+            _head(df, decorate).to_csv(fh, index=False)
+        for i, chunk in enumerate(iter_chunks(df, rows, chunk_rows, decorate)):
+            chunk.to_csv(fh, index=False, header=(i == 0))
+
+def write_parquet(df: pd.DataFrame, rows: np.ndarray, path: str, chunk_rows: int = EXPORT_CHUNK_ROWS,
+                  decorate: Callable | None = None) -> None:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    # one schema for the whole export, so chunks with all-empty object columns still fit
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    if decorate:
+        # decoded badge text is plain strings; the rest keeps the types inferred from the whole frame
+        fields = {f.name: f for f in schema}
+        schema = pa.schema([fields.get(c) or pa.field(c, pa.string()) for c in _head(df, decorate).columns])
+    with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+        for chunk in iter_chunks(df, rows, chunk_rows, decorate):
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+        if len(rows) == 0:
+            writer.write_table(pa.Table.from_pandas(_head(df, decorate), schema=schema, preserve_index=False))
+
+def _xlsx_value(v):
+    if v is None or (isinstance(v, float) and np.isnan(v)) or v is pd.NA:
+        return None
+    if isinstance(v, np.generic):
+        return v.item()
+    return v
+
+def write_xlsx(df: pd.DataFrame, rows: np.ndarray, path: str, chunk_rows: int = EXPORT_CHUNK_ROWS,
+               decorate: Callable | None = None) -> None:
+    """Constant-memory XLSX (openpyxl write-only mode); capped at the Excel row limit."""
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("risultati")
+    ws.append([str(c) for c in _head(df, decorate).columns])
+    for chunk in iter_chunks(df, rows[:XLSX_MAX_ROWS], chunk_rows, decorate):
+        for rec in chunk.astype(object).itertuples(index=False, name=None):
+            ws.append([_xlsx_value(v) for v in rec])
+    wb.save(path)
+
+_WRITERS = {"csv.gz": write_csv_gz, "parquet": write_parquet, "xlsx": write_xlsx}
+
+def export_frame(df: pd.DataFrame, path: str, fmt: str, columns: List[str] | None = None,
+                 top_n: int | None = None, order: np.ndarray | None = None,
+                 chunk_rows: int = EXPORT_CHUNK_ROWS) -> str:
+    """Write the selected rows/columns of `df` to `path` chunk by chunk; returns `path`.
+
+    Badge text columns (`badges`, `pair_badges`) can be requested even when `df` only holds
+    the flags; they are decoded chunk by chunk for the exported rows.
+    """
+    if fmt not in _WRITERS:
+        raise ValueError(f"Formato export non supportato: {fmt} (usa {', '.join(_WRITERS)})")
+    sel, rows, decorate = select_rows(df, columns, top_n, order)
+    tmp = f"{path}.part"
+    try:
+        _WRITERS[fmt](sel, rows, tmp, chunk_rows, decorate)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return path
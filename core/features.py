@@ -35,8 +35,8 @@ def safe_ratio(a, b):
     r = np.nan_to_num(r, nan=0.0, posinf=1.0, neginf=0.0)
     return r
 
-def add_demand_score(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
+def add_demand_score(df: pd.DataFrame, inplace: bool = False) -> pd.DataFrame:
+    df = df if inplace else df.copy()
     sr = df.get("sales_rank_current")
     sr_term = _norm(-np.log1p(sr.fillna(sr.max() or 1)), -15, 0) if sr is not None else 0
     drops30 = _norm(df.get("sales_rank_drops_30d", 0).fillna(0), 0, 20)
@@ -46,8 +46,8 @@ def add_demand_score(df: pd.DataFrame) -> pd.DataFrame:
     df["score_demand"] = (sr_term + drops30 + bought + rev_term) / 4.0
     return df
 
-def add_priceedge_score(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
+def add_priceedge_score(df: pd.DataFrame, inplace: bool = False) -> pd.DataFrame:
+    df = df if inplace else df.copy()
     bb = df.get("buybox_current", pd.Series([np.nan]*len(df)))
     slp = df.get("suggested_lower_price", pd.Series([np.nan]*len(df)))
     thr = df.get("competitive_price_threshold", pd.Series([np.nan]*len(df)))
@@ -58,8 +58,8 @@ def add_priceedge_score(df: pd.DataFrame) -> pd.DataFrame:
     df["score_priceedge"] = (edge_thr + edge_slp + std30 + flip90) / 4.0
     return df
 
-def add_competition_score(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
+def add_competition_score(df: pd.DataFrame, inplace: bool = False) -> pd.DataFrame:
+    df = df if inplace else df.copy()
     sellers = df.get("total_offer_count", pd.Series([np.nan]*len(df))).fillna(0)
     new_sellers = df.get("new_offer_count_current", pd.Series([np.nan]*len(df))).fillna(0)
     pct_amz_90 = df.get("buybox_pct_amz_90d", pd.Series([np.nan]*len(df))).fillna(0)
@@ -71,8 +71,8 @@ def add_competition_score(df: pd.DataFrame) -> pd.DataFrame:
     df["score_competition"] = (s_term + ns_term + amz_term + win_term) / 4.0
     return df
 
-def add_availability_score(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
+def add_availability_score(df: pd.DataFrame, inplace: bool = False) -> pd.DataFrame:
+    df = df if inplace else df.copy()
     oos90 = _norm(df.get("amazon_90d_oos", 0).fillna(0), 0, 90)
     oosc30 = _norm(df.get("amazon_oos_cnt_30d", 0).fillna(0), 0, 15)
     avail = df.get("amazon_offer_availability", "").astype(str).str.lower()
@@ -81,14 +81,14 @@ def add_availability_score(df: pd.DataFrame) -> pd.DataFrame:
     df["score_availability"] = (oos90 + oosc30 + no_amz + ship_delay) / 4.0
     return df
 
-def add_stability_score(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
+def add_stability_score(df: pd.DataFrame, inplace: bool = False) -> pd.DataFrame:
+    df = df if inplace else df.copy()
     std90 = _norm(df.get("buybox_std_90d", 0).fillna(0), 0, (df.get("buybox_current", 0).fillna(1)*0.3).max() if len(df)>0 else 1)
     df["score_stability"] = (0.6 * (1 - std90)) + 0.4 * std90
     return df
 
-def add_logistics_score(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
+def add_logistics_score(df: pd.DataFrame, inplace: bool = False) -> pd.DataFrame:
+    df = df if inplace else df.copy()
     fee = df.get("fba_pickpack_fee", pd.Series([np.nan]*len(df))).fillna(0)
     weight = df.get("item_weight_g", pd.Series([np.nan]*len(df))).fillna(0)
     prime = df.get("prime_eligible", pd.Series(["no"]*len(df))).astype(str).str.lower().isin(["yes","true","1"]).astype(float)
@@ -97,8 +97,8 @@ def add_logistics_score(df: pd.DataFrame) -> pd.DataFrame:
     df["score_logistics"] = (fee_term + weight_term + prime) / 3.0
     return df
 
-def add_risk_score(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
+def add_risk_score(df: pd.DataFrame, inplace: bool = False) -> pd.DataFrame:
+    df = df if inplace else df.copy()
     rr = df.get("return_rate", pd.Series([np.nan]*len(df))).fillna(0)
     rr_term = 1 - _norm(rr, 0, 0.2)
     map_flag = df.get("map_restriction", pd.Series(["no"]*len(df))).astype(str).str.lower().isin(["yes","true","1"]).astype(float)
@@ -106,12 +106,193 @@ def add_risk_score(df: pd.DataFrame) -> pd.DataFrame:
     df["score_risk"] = (rr_term + map_term) / 2.0
     return df
 
-def add_all_component_scores(df: pd.DataFrame) -> pd.DataFrame:
-    df = add_demand_score(df)
-    df = add_priceedge_score(df)
-    df = add_competition_score(df)
-    df = add_availability_score(df)
-    df = add_stability_score(df)
-    df = add_logistics_score(df)
-    df = add_risk_score(df)
+def add_all_component_scores(df: pd.DataFrame, inplace: bool = False, fused: bool = True,
+                             stats: dict | None = None) -> pd.DataFrame:
+    """Every add_*_score; with `inplace` the score_* columns are written into `df` itself
+    (no copy of the input), otherwise into a single copy of it.
+
+    `fused` computes them with `component_score_block` (one pass); `fused=False` runs the
+    seven functions one after the other. `stats` (fused only) replaces the frame-wide
+    bounds, see `score_norm_stats`.
+    """
+    df = df if inplace else df.copy()
+    if fused:
+        block = component_score_block(df, stats)
+        for j, col in enumerate(FUSED_SCORE_COLS):
+            df[col] = block[:, j]
+        return df
+    if stats is not None:
+        raise ValueError("stats is only supported by the fused kernel")
+    add_demand_score(df, inplace=True)
+    add_priceedge_score(df, inplace=True)
+    add_competition_score(df, inplace=True)
+    add_availability_score(df, inplace=True)
+    add_stability_score(df, inplace=True)
+    add_logistics_score(df, inplace=True)
+    add_risk_score(df, inplace=True)
     return df
+
+# ---- fused kernel: the seven component scores above in one pass over contiguous arrays ----
+FUSED_SCORE_COLS = [
+    "score_demand", "score_priceedge", "score_competition", "score_availability",
+    "score_stability", "score_logistics", "score_risk",
+]
+# every column component_score_block reads
+FUSED_INPUT_COLS = [
+    "sales_rank_current", "sales_rank_drops_30d", "bought_past_month", "reviews_count", "reviews_90d_avg",
+    "buybox_current", "buybox_std_30d", "buybox_std_90d", "flipability_90d", "competitive_price_threshold",
+    "suggested_lower_price", "total_offer_count", "new_offer_count_current", "buybox_pct_amz_90d",
+    "buybox_winner_cnt_90d", "amazon_90d_oos", "amazon_oos_cnt_30d", "amazon_offer_availability",
+    "amazon_offer_shipping_delay", "prime_eligible", "fba_pickpack_fee", "item_weight_g",
+    "return_rate", "map_restriction",
+]
+_TRUE_TOKENS = {"yes", "true", "1"}
+
+def _values(df: pd.DataFrame, col: str) -> np.ndarray:
+    """float64 copy of a column (NaN where missing/unparsable); all-NaN when the column is absent."""
+    s = df.get(col)
+    if s is None:
+        return np.full(len(df), np.nan)
+    if pd.api.types.is_numeric_dtype(s.dtype) and not isinstance(s.dtype, pd.CategoricalDtype):
+        return s.to_numpy(dtype=np.float64, na_value=np.nan, copy=True)
+    if pd.api.types.is_string_dtype(s.dtype) and not isinstance(s.dtype, pd.CategoricalDtype):
+        parsed = _arrow_floats(s)
+        if parsed is not None:
+            return parsed
+    return pd.to_numeric(s.to_numpy(dtype=object), errors="coerce").astype(np.float64)
+
+def _arrow_floats(s: pd.Series) -> np.ndarray | None:
+    """Text column cast to float64 by Arrow; None when some value isn't a plain number."""
+    try:
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        arr = pc.cast(pa.array(s, from_pandas=True), pa.float64())
+    except Exception:
+        return None
+    return np.array(arr.to_numpy(zero_copy_only=False), dtype=np.float64)
+
+def _filled(df: pd.DataFrame, col: str) -> np.ndarray:
+    v = _values(df, col)
+    v[np.isnan(v)] = 0.0
+    return v
+
+def _norm_arr(x: np.ndarray, low: float, high: float) -> np.ndarray:
+    """`_norm` for a NaN-free float array and scalar bounds."""
+    rng = float(np.nanmax([high - low, 1e-9]))
+    v = x - low
+    v /= rng
+    return np.clip(v, 0.0, 1.0, out=v)
+
+def _text_flag(df: pd.DataFrame, col: str, default: str, test) -> np.ndarray:
+    """`test(str(value))` per row, evaluated once per distinct value."""
+    s = df.get(col)
+    if s is None:
+        return np.full(len(df), float(test(default)))
+    codes, uniques = pd.factorize(s.astype(str) if s.dtype == object else s, use_na_sentinel=True)
+    hits = np.array([float(test(str(u))) for u in uniques] + [float(test("nan"))])
+    return hits[codes]
+
+def score_norm_stats(df: pd.DataFrame) -> dict:
+    """The frame-wide bounds of the component scores, so a frame can be scored in parts.
+
+    sr_max fills missing sales ranks (demand), bb_max scales the buy-box std terms
+    (priceedge, stability); sr_missing tells whether sr_max is used at all. Scoring each part
+    with `merge_norm_stats` of all parts equals scoring the concatenated frame.
+    """
+    sr = _values(df, "sales_rank_current") if "sales_rank_current" in df.columns else np.empty(0)
+    return _norm_stats(sr, _values(df, "buybox_current"))
+
+def _norm_stats(sr: np.ndarray, bb: np.ndarray) -> dict:
+    return {
+        "sr_max": float(np.nanmax(sr)) if len(sr) and not np.isnan(sr).all() else np.nan,
+        "sr_missing": bool(np.isnan(sr).any()),
+        "bb_max": float(np.where(np.isnan(bb), 1.0, bb).max()) if len(bb) else np.nan,
+    }
+
+def merge_norm_stats(parts: list) -> dict:
+    """`score_norm_stats` of the concatenation, from the stats of its parts."""
+    def top(key):
+        vals = [p[key] for p in parts if not np.isnan(p[key])]
+        return max(vals) if vals else np.nan
+    return {"sr_max": top("sr_max"), "sr_missing": any(p["sr_missing"] for p in parts), "bb_max": top("bb_max")}
+
+def component_score_block(df: pd.DataFrame, stats: dict | None = None) -> np.ndarray:
+    """N×7 float64 block of FUSED_SCORE_COLS, equal (to float tolerance) to add_all_component_scores.
+
+    Each input column is read once as a NumPy array; the bounds that depend on the whole
+    column (sales-rank fill, buy-box std scales) are computed here exactly as the per-score
+    functions do, or taken from `stats` (`score_norm_stats` of a larger frame) when given.
+    """
+    n = len(df)
+    out = np.empty((n, len(FUSED_SCORE_COLS)), dtype=np.float64)
+    bb = _values(df, "buybox_current")
+    sr = _values(df, "sales_rank_current") if "sales_rank_current" in df.columns else None
+    if stats is None:
+        stats = _norm_stats(np.empty(0) if sr is None else sr, bb)
+    # (x * k).max() == x.max() * k: rounding is monotonic, so the scales are the same bits
+    bb_max = stats["bb_max"]
+
+    # demand
+    if sr is not None:
+        mx = stats["sr_max"]
+        sr = np.where(np.isnan(sr), mx or 1, sr)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            sr_log = -np.log1p(sr)
+        sr_log[np.isnan(sr_log)] = 0.0
+        sr_term = _norm_arr(sr_log, -15, 0)
+    else:
+        sr_term = 0
+    drops30 = _norm_arr(_filled(df, "sales_rank_drops_30d"), 0, 20)
+    bought = _norm_arr(_filled(df, "bought_past_month"), 0, 2000)
+    rev = _filled(df, "reviews_count")
+    avg = df.get("reviews_90d_avg")
+    if avg is None:
+        den = np.ones(n)
+    else:
+        den = _values(df, "reviews_90d_avg")
+        if pd.api.types.is_numeric_dtype(avg.dtype):
+            den[den == 0] = 1.0
+    out[:, 0] = (sr_term + drops30 + bought + _norm_arr(safe_ratio(rev, den), 0.9, 1.5)) / 4.0
+
+    # priceedge
+    std30_hi = bb_max * 0.25 if n > 0 else 1
+    std30 = _norm_arr(_filled(df, "buybox_std_30d"), 0, std30_hi)
+    flip90 = _norm_arr(_filled(df, "flipability_90d"), 0, 200)
+    edge_thr = _values(df, "competitive_price_threshold") - bb
+    edge_thr[np.isnan(edge_thr)] = 0.0
+    edge_slp = _values(df, "suggested_lower_price") - bb
+    edge_slp[np.isnan(edge_slp)] = 0.0
+    out[:, 1] = (_norm_arr(edge_thr, -50, 50) + _norm_arr(edge_slp, -50, 50) + std30 + flip90) / 4.0
+
+    # competition
+    out[:, 2] = (
+        (1 - _norm_arr(_filled(df, "total_offer_count"), 0, 50))
+        + (1 - _norm_arr(_filled(df, "new_offer_count_current"), 0, 30))
+        + (1 - _norm_arr(_filled(df, "buybox_pct_amz_90d"), 0.0, 1.0))
+        + (1 - _norm_arr(_filled(df, "buybox_winner_cnt_90d"), 1, 25))
+    ) / 4.0
+
+    # availability
+    no_amz = _text_flag(df, "amazon_offer_availability", "", lambda v: "no amazon offer" in v.lower())
+    ship_delay = _text_flag(df, "amazon_offer_shipping_delay", "", lambda v: "delay" in v)
+    out[:, 3] = (
+        _norm_arr(_filled(df, "amazon_90d_oos"), 0, 90) + _norm_arr(_filled(df, "amazon_oos_cnt_30d"), 0, 15)
+        + no_amz + ship_delay
+    ) / 4.0
+
+    # stability
+    std90 = _norm_arr(_filled(df, "buybox_std_90d"), 0, bb_max * 0.3 if n > 0 else 1)
+    out[:, 4] = (0.6 * (1 - std90)) + 0.4 * std90
+
+    # logistics
+    prime = _text_flag(df, "prime_eligible", "no", lambda v: v.lower() in _TRUE_TOKENS)
+    out[:, 5] = (
+        (1 - _norm_arr(_filled(df, "fba_pickpack_fee"), 0, 7.0))
+        + (1 - _norm_arr(_filled(df, "item_weight_g"), 0, 3000))
+        + prime
+    ) / 3.0
+
+    # risk
+    map_flag = _text_flag(df, "map_restriction", "no", lambda v: v.lower() in _TRUE_TOKENS)
+    out[:, 6] = ((1 - _norm_arr(_filled(df, "return_rate"), 0, 0.2)) + (1 - map_flag)) / 2.0
+    return out
@@ -1,9 +1,15 @@
 from __future__ import annotations
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 from typing import List
-from .schema import normalize_headers
-from .transforms import parse_price, parse_percent, parse_int, coerce_numeric, ensure_country_column
-from .config import PRICE_COLS, PCT_COLS, INT_COLS
+from .schema import normalize_header, normalize_headers
+from .transforms import parse_price, parse_percent, parse_int, coerce_numeric, ensure_country_column, dedupe_latest
+from functools import partial
+from .config import PRICE_COLS, PCT_COLS, INT_COLS, LOAD_WORKERS, CSV_CHUNK_ROWS
+from .cache import UploadCache
+from .xlsx import read_xlsx
 
 def read_any(path_or_file):
     name = getattr(path_or_file, "name", str(path_or_file)).lower()
@@ -11,19 +17,124 @@ def read_any(path_or_file):
         return pd.read_excel(path_or_file, dtype=str)
     return pd.read_csv(path_or_file, dtype=str)
 
-def load_many(files: List) -> pd.DataFrame:
-    frames = []
-    for f in files:
-        df = read_any(f)
-        df = normalize_headers(df)
-        df = coerce_numeric(df, PRICE_COLS, parse_price)
-        df = coerce_numeric(df, PCT_COLS, parse_percent)
-        df = coerce_numeric(df, INT_COLS, parse_int)
-        df = ensure_country_column(df)
-        frames.append(df)
+def _typed(df: pd.DataFrame) -> pd.DataFrame:
+    """Parse typed columns and tag the country in place (callers pass frames they own)."""
+    coerce_numeric(df, PRICE_COLS, parse_price, inplace=True)
+    coerce_numeric(df, PCT_COLS, parse_percent, inplace=True)
+    coerce_numeric(df, INT_COLS, parse_int, inplace=True)
+    ensure_country_column(df, inplace=True)
+    return df
+
+def _concat_typed(chunks: List[pd.DataFrame]) -> pd.DataFrame:
+    """Concatenate parsed chunks with the dtypes a single whole-file parse would give."""
+    df = pd.concat(chunks, ignore_index=True)
+    for c in PRICE_COLS + PCT_COLS + INT_COLS:
+        # a chunk that is entirely empty parses to object None: only keep that when all are
+        if c in df.columns and df[c].dtype == object and not df[c].isna().all():
+            df[c] = pd.to_numeric(df[c])
+    return df
+
+def read_csv_streaming(path_or_file, columns: List[str], chunksize: int | None = None) -> pd.DataFrame:
+    """Read a Keepa CSV in bounded chunks, keeping only the (normalized) `columns`.
+
+    Headers are mapped through `normalize_header`/ALIAS_MAP first, so only the raw columns
+    that feed the pipeline are ever materialized; each chunk is parsed before the next one
+    is read. The result equals `load_one(...)` restricted to `columns`.
+    """
+    chunksize = chunksize or CSV_CHUNK_ROWS
+    if hasattr(path_or_file, "seek"):
+        path_or_file.seek(0)
+    header = pd.read_csv(path_or_file, dtype=str, nrows=0).columns
+    names = [normalize_header(h) for h in header]
+    wanted = set(columns)
+    keep = [i for i, n in enumerate(names) if n in wanted]
+    if hasattr(path_or_file, "seek"):
+        path_or_file.seek(0)
+    chunks = []
+    for chunk in pd.read_csv(path_or_file, dtype=str, usecols=keep, chunksize=chunksize):
+        chunk.columns = [names[i] for i in keep]
+        chunks.append(_typed(chunk))
+    if not chunks:
+        return _typed(pd.DataFrame(columns=[names[i] for i in keep], dtype=str))
+    return _concat_typed(chunks)
+
+def load_one(path_or_file, columns: List[str] | None = None, sidecar: UploadCache | None = None) -> pd.DataFrame:
+    """Read one Keepa export and return it normalized, typed and country-tagged.
+
+    With `columns`, CSVs go through the chunked reader and only those columns are kept.
+    XLSX workbooks are streamed (`core.xlsx`), through a Parquet sidecar in `sidecar`
+    when given, so the same workbook is parsed from Excel only once.
+    """
+    name = getattr(path_or_file, "name", str(path_or_file)).lower()
+    if name.endswith(".xlsx"):
+        df = read_xlsx(path_or_file, columns, cache=sidecar)
+        normalize_headers(df, inplace=True)
+        return _typed(df)
+    if columns is not None and not name.endswith(".xls"):
+        return read_csv_streaming(path_or_file, columns)
+    df = read_any(path_or_file)
+    normalize_headers(df, inplace=True)
+    if columns is not None:
+        wanted = set(columns)
+        df = df[[c for c in df.columns if c in wanted]]
+    return _typed(df)
+
+def load_cached(path_or_file, cache: UploadCache, columns: List[str] | None = None) -> pd.DataFrame:
+    key = cache.key_for(path_or_file, columns)
+    df = cache.get(key)
+    if df is None:
+        df = load_one(path_or_file, columns, sidecar=cache)
+        cache.put(key, df)
+    return df
+
+def _picklable(path_or_file):
+    """Paths go to the worker as they are, uploads as a named in-memory copy."""
+    if isinstance(path_or_file, (str, os.PathLike)):
+        return path_or_file
+    pos = path_or_file.tell()
+    path_or_file.seek(0)
+    data = path_or_file.read()
+    path_or_file.seek(pos)
+    buf = io.StringIO(data) if isinstance(data, str) else io.BytesIO(data)
+    buf.name = getattr(path_or_file, "name", "upload.csv")
+    return buf
+
+def _load_parallel(files: List, cache: UploadCache | None, workers: int, columns: List[str] | None) -> List[pd.DataFrame]:
+    frames: List[pd.DataFrame | None] = [None] * len(files)
+    keys = [None] * len(files)
+    todo = []
+    for i, f in enumerate(files):
+        if cache is not None:
+            keys[i] = cache.key_for(f, columns)
+            frames[i] = cache.get(keys[i])
+        if frames[i] is None:
+            todo.append(i)
+    if todo:
+        with ProcessPoolExecutor(max_workers=min(workers, len(todo))) as pool:
+            results = pool.map(partial(load_one, columns=columns, sidecar=cache), [_picklable(files[i]) for i in todo])
+            for i, df in zip(todo, results):
+                frames[i] = df
+                if cache is not None:
+                    cache.put(keys[i], df)
+    return frames
+
+def load_many(files: List, cache: UploadCache | None = None, workers: int | None = None,
+              columns: List[str] | None = None) -> pd.DataFrame:
+    """Load and concatenate Keepa exports.
+
+    With `workers` > 1 the files are read and parsed in a process pool (one file per task);
+    the result is the same as the serial path. `workers=None` uses LOAD_WORKERS.
+    `columns` (e.g. PIPELINE_COLS) keeps only those normalized columns, streaming CSVs in chunks.
+    Repeated asin+country rows keep the one with the latest `last_update`.
+    """
+    workers = LOAD_WORKERS if workers is None else int(workers)
+    if workers > 1 and len(files) > 1:
+        frames = _load_parallel(files, cache, workers, columns)
+    else:
+        frames = [load_cached(f, cache, columns) if cache is not None else load_one(f, columns) for f in files]
     if not frames:
         return pd.DataFrame()
     df_all = pd.concat(frames, ignore_index=True)
     if {"asin","country"}.issubset(df_all.columns):
-        df_all = df_all.drop_duplicates(subset=["asin","country"])
+        df_all = dedupe_latest(df_all)
     return df_all
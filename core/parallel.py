@@ -0,0 +1,150 @@
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, List
+import numpy as np
+import pandas as pd
+from .arbitrage import attach_badges_for_pairs
+from .config import SCORING_CHUNK_ROWS
+from .features import FUSED_INPUT_COLS, score_norm_stats
+from .scoring_v2 import DETECTOR_NUMERIC_COLS, add_component_scores, add_detectors, coerce_detector_inputs
+
+# Columns read by score_rows (when present). attach_badges_for_pairs looks for the `_sell` names.
+PAIR_BADGE_INPUTS = ["amazon_offer_availability_sell", "amazon_90d_oos_sell", "buybox_pct_amz_90d_sell",
+                     "total_offer_count_sell"]
+SCORING_INPUTS = list(dict.fromkeys(FUSED_INPUT_COLS + ["margin_pct"] + DETECTOR_NUMERIC_COLS
+                                    + ["map_restriction"] + PAIR_BADGE_INPUTS))
+
+def score_rows(df: pd.DataFrame, stats: dict | None = None) -> pd.DataFrame:
+    """Row-local part of the features stage, in place: component scores (with the frame-wide
+    bounds `stats`), detector flags and pair badge flags."""
+    add_component_scores(df, inplace=True, stats=stats)
+    add_detectors(df, inplace=True, strings=False)
+    attach_badges_for_pairs(df, inplace=True, strings=False)
+    return df
+
+def _is_plain(dtype) -> bool:
+    return isinstance(dtype, np.dtype) and dtype.kind in "biuf"
+
+class _Shared:
+    """Named shared-memory blocks created by the parent; unlinked on close."""
+
+    def __init__(self):
+        self.blocks: List[shared_memory.SharedMemory] = []
+
+    def array(self, values: np.ndarray | None, dtype, n: int):
+        dtype = np.dtype(dtype)
+        shm = shared_memory.SharedMemory(create=True, size=max(dtype.itemsize * n, 1))
+        self.blocks.append(shm)
+        view = np.ndarray((n,), dtype=dtype, buffer=shm.buf)
+        if values is not None:
+            view[:] = values
+        return shm.name, view
+
+    def close(self):
+        for shm in self.blocks:
+            shm.close()
+            shm.unlink()
+        self.blocks = []
+
+_WORKER: Dict = {}
+
+def _attach(spec: dict) -> None:
+    """Pool initializer: map the parent's shared columns (no frame is ever pickled)."""
+    blocks = []
+
+    def view(name, dtype):
+        shm = shared_memory.SharedMemory(name=name)
+        blocks.append(shm)
+        return np.ndarray((spec["n"],), dtype=np.dtype(dtype), buffer=shm.buf)
+
+    _WORKER.update(
+        blocks=blocks,
+        stats=spec["stats"],
+        inputs=[(c, view(name, dtype), uniques) for c, name, dtype, uniques in spec["inputs"]],
+        outputs=[(c, {d: view(name, d) for d, name in names.items()}) for c, names in spec["outputs"]],
+    )
+
+def _score_range(bounds: tuple) -> tuple:
+    start, stop = bounds
+    cols = {}
+    for c, values, uniques in _WORKER["inputs"]:
+        part = values[start:stop]
+        cols[c] = part if uniques is None else uniques.take(part, allow_fill=True)
+    df = pd.DataFrame(cols, index=pd.RangeIndex(stop - start), copy=False)
+    score_rows(df, _WORKER["stats"])
+    parsed = {}
+    for c, views in _WORKER["outputs"]:
+        values = df[c].to_numpy()
+        parsed[c] = values.dtype.str
+        if values.dtype.str in views:
+            views[values.dtype.str][start:stop] = values
+        if "<f8" in views and values.dtype.str != "<f8" and values.dtype.kind in "iu":
+            views["<f8"][start:stop] = values
+    return stop - start, parsed
+
+def score_rows_parallel(df: pd.DataFrame, workers: int, stats: dict | None = None,
+                        chunk_rows: int | None = None) -> pd.DataFrame:
+    """`score_rows` on row ranges in a process pool; same columns, dtypes and bits as serial.
+
+    The inputs go to the workers once, as shared-memory columns: numbers as they are, text
+    as int32 codes plus its distinct values. Workers write the new columns into shared
+    output arrays. Frame-wide bounds (`stats`) are computed here on the whole frame, so
+    every range is normalized exactly as the serial pass does. `df` itself isn't modified.
+    Falls back to the serial pass when a new column isn't a plain NumPy dtype.
+    """
+    n = len(df)
+    stats = score_norm_stats(df) if stats is None else stats
+    probe = score_rows(df.iloc[:1].copy(), stats)  # serial column order and output dtypes
+    added = [c for c in probe.columns if c not in df.columns]
+    if any(not _is_plain(probe[c].dtype) for c in added):
+        return score_rows(df.copy(), stats)
+    # detector inputs stored as text are parsed by the workers too; as in `to_numeric` on the
+    # whole column, the result is int64 only when every range parsed to int64
+    parsed = [c for c in DETECTOR_NUMERIC_COLS if c in df.columns and not _is_plain(df[c].dtype)]
+
+    chunk_rows = chunk_rows or SCORING_CHUNK_ROWS
+    step = max(1, min(chunk_rows, -(-n // workers)))  # rows cost the same: one range per worker
+    ranges = [(i, min(i + step, n)) for i in range(0, n, step)]
+    shared = _Shared()
+    try:
+        inputs = []
+        for c in SCORING_INPUTS:
+            if c not in df.columns:
+                continue
+            s = df[c]
+            if _is_plain(s.dtype):
+                name, _ = shared.array(s.to_numpy(), s.dtype, n)
+                inputs.append((c, name, s.dtype.str, None))
+            else:
+                codes, uniques = pd.factorize(s)
+                name, _ = shared.array(codes, np.int32, n)
+                inputs.append((c, name, np.dtype(np.int32).str, uniques.array))
+        outputs, views = [], {}
+        for c in added + parsed:
+            dtypes = [probe[c].dtype.str] if c in added else ["<f8", "<i8"]
+            names, views[c] = {}, {}
+            for d in dtypes:
+                names[d], views[c][d] = shared.array(None, d, n)
+            outputs.append((c, names))
+        spec = {"n": n, "stats": stats, "inputs": inputs, "outputs": outputs}
+        with ProcessPoolExecutor(max_workers=min(workers, len(ranges)), initializer=_attach, initargs=(spec,)) as pool:
+            results = list(pool.map(_score_range, ranges))
+        assert sum(r for r, _ in results) == n
+        new = {c: views[c][probe[c].dtype.str].copy() for c in added}
+        serial_parse = []
+        for c in parsed:
+            kinds = {r[c] for _, r in results}
+            if kinds == {"<i8"}:
+                new[c] = views[c]["<i8"].copy()
+            elif kinds <= {"<i8", "<f8"}:
+                new[c] = views[c]["<f8"].copy()
+            else:
+                serial_parse.append(c)
+        out = df.assign(**new)
+    finally:
+        shared.close()
+    # plain numeric detector inputs only get their NaN zero-filled: cheap enough to do here
+    plain = [c for c in DETECTOR_NUMERIC_COLS if c in df.columns and c not in parsed]
+    coerce_detector_inputs(out, plain + serial_parse)
+    return out[list(probe.columns)]
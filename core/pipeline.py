@@ -0,0 +1,287 @@
+from __future__ import annotations
+import hashlib
+import json
+import time
+from typing import Callable, Dict, List
+import numpy as np
+import pandas as pd
+from .arbitrage import attach_badges_for_pairs, build_pairs, compute_margins
+from .compact import compact_frame, concat_compact, memory_report, merge_memory_reports
+from .config import DEFAULT_VAT, COPY_FREE_SCORING, COMPACT_SCHEMA, SCORING_PARALLEL_MIN_ROWS, SCORING_WORKERS
+from .features import merge_norm_stats, score_norm_stats
+from .parallel import score_rows_parallel
+from .profiling import StageProfiler
+from .scoring_v2 import add_component_scores, add_detectors, component_score_matrix, rescore, top_k_indices
+from utils import apply_vat_discount_rules, apply_vat_discount_rules_array
+
+# Stages of the app pipeline and the inputs each one depends on (besides its upstream stage):
+#   load     -> uploaded files (content digest)
+#   pairs    -> buy / sell countries
+#   margins  -> discounts, FBA/FBM mode
+#   features   -> nothing new (component scores, detectors and badges don't depend on weights)
+#   break_even -> target ROI (break-even / target discount and minimum sell price of the features frame)
+#   matrix     -> nothing new (N×8 component-score matrix of the features frame)
+#   score      -> weights (one matrix–vector product), break_even key (its columns are attached here)
+#   eligible   -> max target discount (mask over break_even)
+#   ranking    -> leaderboard size, score key (top rows among the eligible ones)
+# In the app, pairs → margins → features run per (buy, sell) country inside PairPartitions;
+# break_even and matrix both hang off features.
+STAGES = ["load", "pairs", "margins", "features", "break_even", "matrix", "score", "eligible", "ranking"]
+
+def stage_key(*parts) -> str:
+    payload = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class StageCache:
+    """Memoizes each pipeline stage on the key of its inputs plus the key of its upstream stage.
+
+    Only the last result of every stage is kept, so moving a slider back and forth recomputes
+    the stage, while unrelated widgets leave it (and everything upstream) untouched. `store`
+    can be any mutable mapping that survives reruns, e.g. `st.session_state[...]`.
+    With a `profiler`, recomputed stages are timed (rows in = rows of the upstream result).
+    """
+
+    def __init__(self, store: Dict | None = None, profiler: StageProfiler | None = None):
+        self.store = store if store is not None else {}
+        self.status: Dict[str, str] = {}
+        self.keys: Dict[str, str] = {}
+        self.profiler = profiler
+
+    def run(self, name: str, parts: List, fn: Callable[[], object], upstream: str | None = None):
+        key = stage_key(name, self.keys.get(upstream) if upstream else None, parts)
+        self.keys[name] = key
+        cached = self.store.get(name)
+        if cached is not None and cached[0] == key:
+            self.status[name] = "hit"
+            if self.profiler is not None:
+                self.profiler.hit(name, cached[1])
+            return cached[1]
+        self.status[name] = "miss"
+        if self.profiler is not None:
+            upstream_value = self.store.get(upstream, (None, None))[1] if upstream else None
+            value = self.profiler.run(name, fn, rows_in=upstream_value)
+        else:
+            value = fn()
+        self.store[name] = (key, value)
+        return value
+
+def sell_view(df_marg: pd.DataFrame) -> pd.DataFrame:
+    # Usa SELL-side per domanda/concorrenza ecc.
+    sell_cols = {c: c.replace("_sell","") for c in df_marg.columns if c.endswith("_sell")}
+    return df_marg.rename(columns=sell_cols)
+
+def sell_side_features(df_marg: pd.DataFrame, profiler: StageProfiler | None = None,
+                       copy_free: bool = COPY_FREE_SCORING, stats: dict | None = None,
+                       workers: int = SCORING_WORKERS) -> pd.DataFrame:
+    """Component scores, detectors and pair badges on the SELL-side view of the margins.
+
+    With `copy_free` the stages add their columns to one shallow (copy-on-write) view of
+    `df_marg` instead of deep-copying the wide frame at every step; `df_marg` is untouched
+    either way and the result is the same. `stats` are the score bounds of the whole frame
+    when `df_marg` is only a part of it (see PairPartitions). From SCORING_PARALLEL_MIN_ROWS
+    rows on, the three steps run on row ranges in `workers` processes (core.parallel).
+    """
+    prof = profiler or StageProfiler(enabled=False)
+    df_sell = sell_view(df_marg)
+    if workers > 1 and len(df_sell) >= SCORING_PARALLEL_MIN_ROWS:
+        return prof.run("features/parallel", lambda: score_rows_parallel(df_sell, workers, stats),
+                        rows_in=len(df_sell))
+    if not copy_free:
+        df_sell = df_sell.copy()
+    df = prof.run("features/components", lambda: add_component_scores(df_sell, inplace=copy_free, stats=stats),
+                  rows_in=len(df_sell))
+    # badges as bit-flags only: text is decoded for the rows shown / exported (core.badges)
+    df = prof.run("features/detectors", lambda: add_detectors(df, inplace=copy_free, strings=False), rows_in=len(df))
+    df = prof.run("features/badges", lambda: attach_badges_for_pairs(df, inplace=copy_free, strings=False),
+                  rows_in=len(df))
+    return df
+
+def filtered_margins(pairs: pd.DataFrame, discount_map: Dict[str, float] | None, ship_mode: str,
+                     min_margin_eur: float | None = None, min_margin_pct: float | None = None) -> pd.DataFrame:
+    """compute_margins, then the real-margin thresholds (pairs kept by pruning may still miss them)."""
+    df = compute_margins(pairs, DEFAULT_VAT, discount_map or {}, ship_mode,
+                         apply_vat_discount_rules, vat_discount_array_fn=apply_vat_discount_rules_array)
+    if min_margin_eur is not None:
+        df = df[df["gross_margin_eur"] >= min_margin_eur]
+    if min_margin_pct is not None:
+        df = df[df["margin_pct"] >= min_margin_pct]
+    return df.reset_index(drop=True)
+
+def _column_buffers(s: pd.Series):
+    """Raw memory of a column (codes + categories, Arrow buffers, NumPy data); None for object."""
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        yield s.cat.codes.to_numpy()
+        yield from _column_buffers(pd.Series(s.cat.categories))
+    elif isinstance(s.dtype, np.dtype) and s.dtype != object:
+        yield np.ascontiguousarray(s.to_numpy())
+    elif hasattr(s.array, "__arrow_array__"):
+        import pyarrow as pa
+        arr = pa.array(s.array)
+        for chunk in getattr(arr, "chunks", [arr]):
+            yield str(chunk.offset).encode()
+            for buf in chunk.buffers():
+                if buf is not None:
+                    yield buf
+    else:
+        yield pd.util.hash_pandas_object(s, index=False).to_numpy()
+
+def frame_key(df: pd.DataFrame) -> str:
+    """Content hash of a frame (column names, dtypes and values, not the index).
+
+    Hashes the column memory as it is instead of hashing value by value; equal frames laid
+    out differently (e.g. sliced Arrow buffers) may get different keys, never the reverse.
+    """
+    h = hashlib.sha256(json.dumps([[str(c), str(t)] for c, t in df.dtypes.items()], ensure_ascii=False).encode("utf-8"))
+    h.update(str(len(df)).encode())
+    for c in df.columns:
+        for buf in _column_buffers(df[c]):
+            h.update(buf)
+    return h.hexdigest()
+
+class PairPartitions:
+    """Pairs → margins → features kept per (buy country, sell country).
+
+    A partition is recomputed only when the rows of one of its two countries, its buy
+    discount, the shipping mode or the margin thresholds change, so replacing the DE export
+    leaves e.g. FR→IT alone. Features are the exception: demand, priceedge and stability
+    normalize by maxima over *all* pairs (`features.score_norm_stats`). Those are merged
+    from per-partition stats, and a partition whose inputs are unchanged is re-scored
+    ("refresh") only when the global bounds it actually uses moved. The concatenated
+    result equals scoring all pairs in one frame.
+
+    `store` is any mutable mapping surviving reruns; partitions no longer selected are dropped.
+    """
+
+    def __init__(self, store: Dict | None = None, profiler: StageProfiler | None = None):
+        self.store = store if store is not None else {}
+        self.status: Dict[str, str] = {}
+        self.profiler = profiler
+
+    def run(self, df_all: pd.DataFrame, buy_countries: List[str], sell_countries: List[str],
+            discount_map: Dict[str, float] | None = None, ship_mode: str = "FBA",
+            min_margin_eur: float | None = None, min_margin_pct: float | None = None,
+            compact: bool = COMPACT_SCHEMA) -> tuple[pd.DataFrame, dict]:
+        """Features frame of all selected pairs, plus {pairs, pruned, memory} totals."""
+        prof = self.profiler or StageProfiler(enabled=False)
+        discounts = {str(k).upper(): v for k, v in (discount_map or {}).items()}
+        jobs = [(b, s) for b in sorted(set(buy_countries)) for s in sorted(set(sell_countries))]
+        used = set(buy_countries) | set(sell_countries)
+        groups = {c: g for c, g in df_all.groupby("country", observed=True, sort=True) if c in used}
+        country_keys = {c: frame_key(g) for c, g in groups.items()}
+        self.status = {}
+
+        for b, s in jobs:
+            name = f"{b}→{s}"
+            key = stage_key(country_keys.get(b), country_keys.get(s), discounts.get(str(b).upper(), 0.0),
+                            ship_mode, min_margin_eur, min_margin_pct, compact)
+            entry = self.store.get((b, s))
+            if entry is not None and entry["key"] == key:
+                self.status[name] = "hit"
+                continue
+            self.status[name] = "miss"
+            src = [groups[c] for c in dict.fromkeys((b, s)) if c in groups]
+            src = pd.concat(src, ignore_index=True) if src else df_all.iloc[:0]
+            pairs = prof.run(f"pairs/{name}", lambda: build_pairs(
+                src, [b], [s],
+                min_margin_eur=min_margin_eur, min_margin_pct=min_margin_pct,
+                vat_sell_map=DEFAULT_VAT, discount_map=discount_map or {},
+                vat_discount_array_fn=apply_vat_discount_rules_array,
+            ), rows_in=len(src))
+            report = None
+            if compact:
+                raw = pairs
+                pairs = compact_frame(raw, scores=False)
+                report = memory_report(raw, pairs)
+                del raw
+            marg = prof.run(f"margins/{name}", lambda: filtered_margins(
+                pairs, discount_map, ship_mode, min_margin_eur, min_margin_pct), rows_in=len(pairs))
+            self.store[(b, s)] = {
+                "key": key, "pairs": len(pairs), "pruned": int(pairs.attrs.get("pruned_pairs", 0)),
+                "memory": report, "margins": marg, "stats": score_norm_stats(sell_view(marg)),
+                "features_key": None, "features": None,
+            }
+        for stale in [k for k in self.store if k not in set(jobs)]:
+            del self.store[stale]
+
+        entries = [self.store[j] for j in jobs]
+        bounds = merge_norm_stats([e["stats"] for e in entries if len(e["margins"])])
+        for (b, s), e in zip(jobs, entries):
+            # only the global bounds this partition reads are part of its features key
+            used_bounds = [bounds["bb_max"], bounds["sr_max"] if e["stats"]["sr_missing"] else None]
+            fkey = stage_key(e["key"], used_bounds)
+            if e["features_key"] == fkey:
+                continue
+            if self.status[f"{b}→{s}"] == "hit":
+                self.status[f"{b}→{s}"] = "refresh"
+            e["features"] = prof.run(f"features/{b}→{s}", lambda: sell_side_features(
+                e["margins"], prof, stats=bounds), rows_in=len(e["margins"]))
+            e["features_key"] = fkey
+
+        frames = [e["features"] for e in entries if len(e["features"])] or [e["features"] for e in entries[:1]]
+        reports = [e["memory"] for e in entries if e["memory"] is not None]
+        summary = {
+            "pairs": sum(e["pairs"] for e in entries),
+            "pruned": sum(e["pruned"] for e in entries),
+            "memory": merge_memory_reports(reports) if reports else None,
+        }
+        if not frames:
+            return pd.DataFrame(), summary
+        return concat_compact(frames), summary
+
+def with_scores(df_feat: pd.DataFrame, scores: np.ndarray) -> pd.DataFrame:
+    """The features frame plus `opportunity_score_v2`, without copying the feature columns."""
+    return df_feat.assign(opportunity_score_v2=scores)
+
+def ranked_rows(df_scored: pd.DataFrame, k: int, mask: np.ndarray | None = None) -> np.ndarray:
+    """Best-first positions of the top `k` pairs by opportunity score, among the rows of `mask` when given."""
+    scores = df_scored["opportunity_score_v2"].to_numpy(dtype=float, na_value=np.nan)
+    if mask is None:
+        return top_k_indices(scores, k)
+    order = top_k_indices(np.where(mask, scores, np.nan), k)
+    return order[mask[order]]
+
+def within_discount(df_scored: pd.DataFrame, max_discount: float | None) -> np.ndarray | None:
+    """Pairs whose `target_discount` (see arbitrage.add_break_even) is at most `max_discount`; None = all."""
+    if max_discount is None:
+        return None
+    return df_scored["target_discount"].to_numpy(dtype=float, na_value=np.nan) <= max_discount
+
+def score_pairs(
+    df_all: pd.DataFrame,
+    buy_countries: List[str],
+    sell_countries: List[str],
+    discount_map: Dict[str, float] | None = None,
+    ship_mode: str = "FBA",
+    weights: Dict[str, float] | None = None,
+    min_margin_eur: float | None = None,
+    min_margin_pct: float | None = None,
+    timings: Dict[str, float] | None = None,
+    profiler: StageProfiler | None = None,
+) -> pd.DataFrame:
+    """Whole pipeline after loading (pairs → margins → features → score), as the app runs it.
+
+    Per-stage wall times (seconds) are added to `timings` when given; a `profiler` also
+    records rows in/out and memory deltas, features sub-steps included.
+    """
+    timings = timings if timings is not None else {}
+
+    def timed(name, fn, rows_in=None):
+        t0 = time.perf_counter()
+        out = profiler.run(name, fn, rows_in=rows_in) if profiler is not None else fn()
+        timings[name] = timings.get(name, 0.0) + time.perf_counter() - t0
+        return out
+
+    pairs = timed("pairs", lambda: build_pairs(
+        df_all, buy_countries, sell_countries,
+        min_margin_eur=min_margin_eur, min_margin_pct=min_margin_pct,
+        vat_sell_map=DEFAULT_VAT, discount_map=discount_map or {},
+        vat_discount_array_fn=apply_vat_discount_rules_array,
+    ), rows_in=len(df_all))
+    if pairs.empty:
+        return pairs
+
+    df_marg = timed("margins", lambda: filtered_margins(pairs, discount_map, ship_mode, min_margin_eur, min_margin_pct),
+                    rows_in=len(pairs))
+    df_feat = timed("features", lambda: sell_side_features(df_marg, profiler), rows_in=len(df_marg))
+    return timed("score", lambda: with_scores(df_feat, rescore(component_score_matrix(df_feat), weights)),
+                 rows_in=len(df_feat))
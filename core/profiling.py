@@ -0,0 +1,75 @@
+from __future__ import annotations
+import json
+import os
+import time
+from typing import Callable, Dict, List
+import pandas as pd
+
+_PAGE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+def rss_bytes() -> int | None:
+    """Resident memory of this process (Linux /proc); None where it isn't available."""
+    try:
+        with open("/proc/self/statm", "rb") as fh:
+            return int(fh.read().split()[1]) * _PAGE
+    except (OSError, ValueError, IndexError):
+        return None
+
+def row_count(value) -> int | None:
+    """Rows of a stage result: frames/arrays/lists, or the first item of a (frame, extra) tuple."""
+    if isinstance(value, tuple) and value:
+        value = value[0]
+    if isinstance(value, (pd.DataFrame, pd.Series)) or hasattr(value, "shape"):
+        return int(value.shape[0]) if len(value.shape) else None
+    return None
+
+class StageProfiler:
+    """Wall time, rows in/out and RSS delta of each pipeline stage.
+
+    Disabled profilers just call the stage (one attribute check), so the app can keep the
+    instrumentation in place and only pay for it when the diagnostics panel is on.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.records: List[Dict] = []
+
+    def run(self, name: str, fn: Callable[[], object], rows_in=None, status: str = "run"):
+        if not self.enabled:
+            return fn()
+        mem0 = rss_bytes()
+        t0 = time.perf_counter()
+        out = fn()
+        seconds = time.perf_counter() - t0
+        mem1 = rss_bytes()
+        self.records.append({
+            "stage": name,
+            "status": status,
+            "seconds": seconds,
+            "rows_in": rows_in if rows_in is None or isinstance(rows_in, int) else row_count(rows_in),
+            "rows_out": row_count(out),
+            "mem_delta_mb": (mem1 - mem0) / 2**20 if mem0 is not None and mem1 is not None else None,
+        })
+        return out
+
+    def hit(self, name: str, value) -> None:
+        """Record a stage served from cache (no time spent)."""
+        if self.enabled:
+            rows = row_count(value)
+            self.records.append({"stage": name, "status": "hit", "seconds": 0.0,
+                                 "rows_in": None, "rows_out": rows, "mem_delta_mb": 0.0})
+
+    def frame(self) -> pd.DataFrame:
+        return pd.DataFrame(self.records, columns=["stage", "status", "seconds", "rows_in", "rows_out", "mem_delta_mb"])
+
+    def timings(self) -> Dict[str, float]:
+        out: Dict[str, float] = {}
+        for r in self.records:
+            out[r["stage"]] = out.get(r["stage"], 0.0) + r["seconds"]
+        return out
+
+    def to_json(self) -> str:
+        return json.dumps({"rss_mb": (rss_bytes() or 0) / 2**20, "stages": self.records}, indent=2)
+
+    def reset(self) -> None:
+        self.records = []
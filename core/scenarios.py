@@ -0,0 +1,160 @@
+from __future__ import annotations
+from typing import Dict, List
+import numpy as np
+import pandas as pd
+from .config import WEIGHTS
+from .features import FUSED_SCORE_COLS, component_score_block, score_norm_stats
+from .scoring_v2 import SCORE_COMPONENTS, component_score_matrix, margin_score, top_k_indices, weight_vector
+from utils import apply_vat_discount_rules_array
+
+# weight vectors scored per matrix product (N×8 @ 8×block): bounds the N×block temporary
+SCENARIO_BLOCK = 16
+_MARGIN = SCORE_COMPONENTS.index("margin")
+# components normalized by frame-wide bounds: (matrix column, component_score_block column)
+_BOUNDED = [(SCORE_COMPONENTS.index(c), FUSED_SCORE_COLS.index(f"score_{c}")) for c in ("demand", "priceedge", "stability")]
+_BOUND_COLS = ["sales_rank_current", "buybox_current"]
+
+def weight_grid(base: Dict[str, float] | None, component: str, values) -> List[Dict[str, float]]:
+    """`base` weights with one component set to each of `values`."""
+    base = {**WEIGHTS, **(base or {})}
+    return [{**base, component: float(v)} for v in values]
+
+def discount_grid(base: Dict[str, float] | None, country: str, values) -> List[Dict[str, float]]:
+    """`base` discount map with the discount of `country` set to each of `values`."""
+    base = {str(k).upper(): v for k, v in (base or {}).items()}
+    return [{**base, str(country).upper(): float(v)} for v in values]
+
+def _discount_label(discounts: Dict[str, float] | None) -> str:
+    if discounts is None:
+        return "attuale"
+    shown = [f"{c}={d:.0%}" for c, d in sorted(discounts.items()) if d]
+    return " ".join(shown) or "nessuno"
+
+class _Margins:
+    """Margins of the features frame under other buy discounts, as compute_margins gets them.
+
+    Only the net buy price depends on the discount; it is computed once per distinct
+    (buy country, discount) with the same VAT/discount rule and reused across maps.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.price = df["buy_price"].to_numpy(dtype=np.float64, na_value=np.nan)
+        self.vat = df["vat_buy"].to_numpy(dtype=np.float64, na_value=np.nan)
+        self.rest = (df["sell_net"].to_numpy(dtype=np.float64, na_value=np.nan)
+                     - df["fees"].to_numpy(dtype=np.float64, na_value=np.nan))
+        codes, self.countries = pd.factorize(df["country_buy"], use_na_sentinel=False)
+        self.rows = [np.flatnonzero(codes == i) for i in range(len(self.countries))]
+        self._net: Dict[tuple, np.ndarray] = {}
+
+    def _buy_net(self, i: int, discount: float) -> np.ndarray:
+        key = (i, discount)
+        if key not in self._net:
+            rows = self.rows[i]
+            country = np.array([self.countries[i]], dtype=object)  # one rule lookup, broadcast over the rows
+            self._net[key] = apply_vat_discount_rules_array(self.price[rows], self.vat[rows], discount, country)
+        return self._net[key]
+
+    def margins(self, discounts: Dict[str, float]) -> tuple[np.ndarray, np.ndarray]:
+        """(gross_margin_eur, margin_pct) with `discounts` (missing countries: no discount)."""
+        buy_net = np.empty(len(self.price))
+        for i, c in enumerate(self.countries):
+            buy_net[self.rows[i]] = self._buy_net(i, float(discounts.get(str(c).upper(), 0.0)))
+        gross = self.rest - buy_net
+        with np.errstate(divide="ignore", invalid="ignore"):
+            pct = gross / np.where(buy_net == 0, np.nan, buy_net)
+        return gross, pct
+
+def evaluate_scenarios(df_feat: pd.DataFrame, weight_sets: List[Dict[str, float]],
+                       discount_maps: List[Dict[str, float] | None] | None = None, k: int = 100,
+                       matrix: np.ndarray | None = None, min_margin_eur: float | None = None,
+                       min_margin_pct: float | None = None, min_share: float = 1.0) -> dict:
+    """Top-K of every (discount map × weight vector) scenario over the features frame, in one pass.
+
+    A discount map moves the margin score: it is recomputed per map (None = the frame's
+    own margins) and swapped into the component matrix; each block of weight vectors is
+    then one matrix product. Pairs below the margin thresholds in a scenario are left out
+    of its top-K, and when that changes the frame-wide bounds (`score_norm_stats`) the
+    demand/priceedge/stability columns are rescored with the bounds of the pairs left, as
+    a rerun that prunes them at pairing does. Scores match that rerun to float rounding;
+    pairs pruned when the frame was built (with its own discounts) can't enter any scenario.
+
+    Returns {"scenarios": one row per scenario, "top": row positions of each top-K
+    (best first), "overlap": share of common top-K pairs between scenarios (Jaccard),
+    "robust": pairs in the top-K of at least `min_share` of the scenarios}.
+    """
+    matrix = component_score_matrix(df_feat) if matrix is None else matrix
+    discount_maps = discount_maps or [None]
+    W = np.stack([weight_vector(w) for w in weight_sets])
+    margins = _Margins(df_feat) if any(d is not None for d in discount_maps) else None
+    base_gross = df_feat["gross_margin_eur"].to_numpy(dtype=np.float64, na_value=np.nan)
+    base_pct = df_feat["margin_pct"].to_numpy(dtype=np.float64, na_value=np.nan)
+    bound_frame = df_feat[[c for c in _BOUND_COLS if c in df_feat.columns]]
+    base_stats = score_norm_stats(bound_frame)
+
+    rows, tops = [], []
+    work = matrix.copy()
+    for d_i, discounts in enumerate(discount_maps):
+        if discounts is None:
+            gross, pct = base_gross, base_pct
+            work[:, _MARGIN] = matrix[:, _MARGIN]
+        else:
+            gross, pct = margins.margins({str(c).upper(): v for c, v in discounts.items()})
+            with np.errstate(over="ignore"):
+                work[:, _MARGIN] = margin_score(np.nan_to_num(pct, nan=0.0))
+        excluded = np.zeros(len(work), dtype=bool)
+        if min_margin_eur is not None:
+            excluded |= ~(gross >= min_margin_eur)
+        if min_margin_pct is not None:
+            excluded |= ~(pct >= min_margin_pct)
+        stats = score_norm_stats(bound_frame[~excluded]) if excluded.any() else base_stats
+        if stats == base_stats:
+            for m, _ in _BOUNDED:
+                work[:, m] = matrix[:, m]
+        else:
+            block = component_score_block(df_feat, stats)
+            for m, b in _BOUNDED:
+                work[:, m] = block[:, b]
+        for start in range(0, len(W), SCENARIO_BLOCK):
+            scores = work @ W[start:start + SCENARIO_BLOCK].T
+            scores[excluded] = np.nan
+            for j in range(scores.shape[1]):
+                top = top_k_indices(scores[:, j], k)
+                top = top[~np.isnan(scores[top, j])]
+                tops.append(top)
+                rows.append({
+                    "scenario": len(rows), "sconti": _discount_label(discounts),
+                    **{f"w_{c}": W[start + j, i] for i, c in enumerate(SCORE_COMPONENTS)},
+                    "coppie_valide": int((~excluded).sum()),
+                    "score_medio_top": float(scores[top, j].mean()) if len(top) else np.nan,
+                })
+
+    # membership of each scenario's top-K over the union of all of them
+    union = np.unique(np.concatenate(tops)) if tops else np.empty(0, dtype=np.intp)
+    member = np.zeros((len(tops), len(union)), dtype=np.float64)
+    rank = np.full((len(tops), len(union)), np.nan)
+    for s, top in enumerate(tops):
+        pos = np.searchsorted(union, top)
+        member[s, pos] = 1.0
+        rank[s, pos] = np.arange(1, len(top) + 1)
+    common = member @ member.T
+    sizes = member.sum(axis=1)
+    with np.errstate(invalid="ignore"):
+        jaccard = common / (sizes[:, None] + sizes[None, :] - common)
+    overlap = pd.DataFrame(jaccard, index=range(len(tops)), columns=range(len(tops)))
+
+    scenarios = pd.DataFrame(rows)
+    if len(scenarios):
+        scenarios["overlap_base"] = jaccard[0]
+    hits = member.sum(axis=0)
+    share = hits / max(len(tops), 1)
+    keep = share >= min_share
+    cols = [c for c in ("asin", "country_buy", "country", "margin_pct", "opportunity_score_v2") if c in df_feat.columns]
+    robust = df_feat.iloc[union[keep]][cols].reset_index(drop=True)
+    with np.errstate(invalid="ignore"):
+        robust = robust.assign(
+            scenari_top=hits[keep].astype(int), quota=share[keep],
+            rank_migliore=np.nanmin(rank[:, keep], axis=0) if len(tops) else np.empty(0),
+            rank_medio=np.nanmean(rank[:, keep], axis=0) if len(tops) else np.empty(0),
+        )
+    robust = robust.sort_values(["scenari_top", "rank_medio"], ascending=[False, True], ignore_index=True)
+    return {"scenarios": scenarios, "top": tops, "overlap": overlap, "robust": robust}
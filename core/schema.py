@@ -1,17 +1,25 @@
 from __future__ import annotations
 import re
+from functools import lru_cache
 import pandas as pd
 from .config import ALIAS_MAP
 
+_WS = re.compile(r"\s+")
+
 def normalize_header(h: str) -> str:
     if not isinstance(h, str):
         return h
+    return _normalize_header_text(h)
+
+@lru_cache(maxsize=8192)
+def _normalize_header_text(h: str) -> str:
+    # memoized: every Keepa upload repeats the same ~100 headers
     t = h.strip().lower()
-    t = re.sub(r"\s+", " ", t)
+    t = _WS.sub(" ", t)
     return ALIAS_MAP.get(t, t.replace(" ", "_"))
 
-def normalize_headers(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
+def normalize_headers(df: pd.DataFrame, inplace: bool = False) -> pd.DataFrame:
+    df = df if inplace else df.copy()
     df.columns = [normalize_header(c) for c in df.columns]
     return df
 
@@ -3,19 +3,33 @@ import numpy as np
 import pandas as pd
 from .features import add_all_component_scores
 from .config import WEIGHTS
+from .badges import pack_flags
 
-def add_margin_score(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
+def margin_score(m):
+    """Logistic score of the margin % (NaN counts as 0); works on Series and arrays alike."""
     th = 0.15
     k = 8.0
+    return 1/(1 + np.exp(-k*(m - th)))
+
+def add_margin_score(df: pd.DataFrame, inplace: bool = False) -> pd.DataFrame:
+    df = df if inplace else df.copy()
     m = df.get("margin_pct", pd.Series([0]*len(df))).fillna(0.0)
-    df["score_margin"] = 1/(1 + np.exp(-k*(m - th)))
+    df["score_margin"] = margin_score(m)
+    return df
+
+def add_component_scores(df: pd.DataFrame, inplace: bool = False, stats: dict | None = None) -> pd.DataFrame:
+    """All weight-independent inputs of the opportunity score (score_* columns).
+
+    `stats`: frame-wide bounds of a larger frame this one is part of (`features.score_norm_stats`).
+    """
+    df = add_all_component_scores(df, inplace=inplace, stats=stats)
+    add_margin_score(df, inplace=True)
     return df
 
-def add_opportunity_score(df: pd.DataFrame, weights: dict | None = None) -> pd.DataFrame:
+def add_weighted_score(df: pd.DataFrame, weights: dict | None = None, inplace: bool = False) -> pd.DataFrame:
+    """Weighted sum of the score_* columns already present in `df`."""
     w = {**WEIGHTS, **(weights or {})}
-    df = add_all_component_scores(df)
-    df = add_margin_score(df)
+    df = df if inplace else df.copy()
     df["opportunity_score_v2"] = (
         w["margin"]*df["score_margin"]
       + w["demand"]*df["score_demand"]
@@ -28,26 +42,70 @@ def add_opportunity_score(df: pd.DataFrame, weights: dict | None = None) -> pd.D
     )
     return df
 
-def add_detectors(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
-
-    numeric_cols = [
-        "amazon_90d_oos",
-        "score_demand",
-        "margin_pct",
-        "flipability_90d",
-        "buybox_std_90d",
-        "buybox_current",
-        "buybox_pct_amz_90d",
-        "total_offer_count",
-        "return_rate",
-    ]
-
-    for col in numeric_cols:
+# Order of the columns in the component-score matrix (same keys as WEIGHTS)
+SCORE_COMPONENTS = ["margin", "demand", "competition", "availability", "priceedge", "logistics", "risk", "stability"]
+
+def component_score_matrix(df: pd.DataFrame) -> np.ndarray:
+    """N×8 C-contiguous matrix of the score_* columns, in SCORE_COMPONENTS order."""
+    return np.ascontiguousarray(
+        df[[f"score_{c}" for c in SCORE_COMPONENTS]].to_numpy(dtype=np.float64, na_value=np.nan)
+    )
+
+def weight_vector(weights: dict | None = None) -> np.ndarray:
+    w = {**WEIGHTS, **(weights or {})}
+    return np.array([w[c] for c in SCORE_COMPONENTS], dtype=np.float64)
+
+def rescore(matrix: np.ndarray, weights: dict | None = None) -> np.ndarray:
+    """Opportunity score for new weights: one matrix–vector product over the cached components."""
+    return matrix @ weight_vector(weights)
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Positions of the k highest scores, best first (NaN last), without a full sort."""
+    scores = np.asarray(scores, dtype=np.float64)
+    k = min(int(k), len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    keyed = np.where(np.isnan(scores), -np.inf, scores)
+    if k < len(scores):
+        part = np.argpartition(-keyed, k - 1)[:k]
+    else:
+        part = np.arange(len(scores))
+    return part[np.argsort(-keyed[part], kind="stable")]
+
+def add_opportunity_score(df: pd.DataFrame, weights: dict | None = None, inplace: bool = False) -> pd.DataFrame:
+    df = add_component_scores(df, inplace=inplace)
+    return add_weighted_score(df, weights, inplace=True)
+
+# numeric inputs of the detectors, coerced and zero-filled in the frame by add_detectors
+DETECTOR_NUMERIC_COLS = [
+    "amazon_90d_oos",
+    "score_demand",
+    "margin_pct",
+    "flipability_90d",
+    "buybox_std_90d",
+    "buybox_current",
+    "buybox_pct_amz_90d",
+    "total_offer_count",
+    "return_rate",
+]
+
+def coerce_detector_inputs(df: pd.DataFrame, cols: list | None = None) -> pd.DataFrame:
+    """Write DETECTOR_NUMERIC_COLS (or `cols`) back as numbers, missing ones as 0 (in place)."""
+    for col in DETECTOR_NUMERIC_COLS if cols is None else cols:
         df[col] = pd.to_numeric(
-            df.get(col, pd.Series([0] * len(df), index=df.index)),
+            df.get(col, pd.Series(0, index=df.index)),
             errors="coerce",
         ).fillna(0)
+    return df
+
+def add_detectors(df: pd.DataFrame, inplace: bool = False, strings: bool = True) -> pd.DataFrame:
+    """Badge columns (plus the numeric inputs they read, coerced and zero-filled).
+
+    `badge_flags` (uint8, bits in DETECTOR_BADGES order) is always written; `strings=False`
+    skips the per-row text columns, which `badges.with_badge_text` can decode later.
+    """
+    df = df if inplace else df.copy()
+    coerce_detector_inputs(df)
 
     cond_window = (
         (df["amazon_90d_oos"] > 10)
@@ -66,6 +124,9 @@ def add_detectors(df: pd.DataFrame) -> pd.DataFrame:
         (df.get("map_restriction", "no").astype(str).str.lower().isin(["yes", "true", "1"]))
         | (df["return_rate"] > 0.15)
     )
+    df["badge_flags"] = pack_flags([cond_window, cond_flip, cond_low_guard, cond_risk])
+    if not strings:
+        return df
     df["badge_window"] = cond_window.map({True: "Window Advantage", False: ""})
     df["badge_flip"] = cond_flip.map({True: "Volatility Flip", False: ""})
     df["badge_lowguard"] = cond_low_guard.map({True: "Low Guarded Buybox", False: ""})
@@ -0,0 +1,178 @@
+from __future__ import annotations
+import datetime as dt
+import os
+import pathlib
+import re
+import shutil
+import time
+from typing import List
+import numpy as np
+import pandas as pd
+from .cache import file_digest
+from .config import SNAPSHOT_DIR
+from .transforms import dedupe_latest
+
+_NO_COUNTRY = "__NA__"
+_DAY = re.compile(r"^date=(\d{4}-\d{2}-\d{2})$")
+_PART = re.compile(r"^part-(\d+)-(.+)\.parquet$")
+
+# columns compared day over day (daily_deltas)
+DELTA_COLS = ["buybox_current", "sales_rank_current", "amazon_offer_availability"]
+
+def _day(value=None) -> str:
+    return (pd.Timestamp(value).date() if value is not None else dt.date.today()).isoformat()
+
+def _plain(df: pd.DataFrame) -> pd.DataFrame:
+    """Categoricals back to their values, so parts written on different days concat cleanly."""
+    cats = {c: df[c].cat.categories.dtype for c in df.columns if isinstance(df[c].dtype, pd.CategoricalDtype)}
+    return df.astype(cats) if cats else df
+
+def uploads_key(files) -> str:
+    """Content key of a set of uploads (order-independent), for idempotent appends."""
+    import hashlib
+    digests = sorted(file_digest(f) for f in files)
+    return hashlib.sha256(":".join(digests).encode("utf-8")).hexdigest()[:16]
+
+class SnapshotStore:
+    """Append-only daily snapshots of loaded Keepa data (`load_many` output).
+
+    Layout: ``root/date=YYYY-MM-DD/country=XX/part-<ns>-<key>.parquet``. Each append adds
+    new part files; reads merge the parts of a day and keep, per asin+country, the row
+    with the latest `last_update` (the newest part on ties). Nothing is ever rewritten.
+    """
+
+    def __init__(self, root: str | os.PathLike | None = None):
+        self.root = pathlib.Path(root or SNAPSHOT_DIR).expanduser()
+
+    def _parts(self, day: str, country: str | None = None) -> List[pathlib.Path]:
+        """Part files of `day` (one country, or all), newest first."""
+        base = self.root / f"date={day}"
+        pattern = f"country={country}/part-*.parquet" if country else "country=*/part-*.parquet"
+        parts = [p for p in base.glob(pattern) if _PART.match(p.name)]
+        return sorted(parts, key=lambda p: int(_PART.match(p.name).group(1)), reverse=True)
+
+    def has(self, key: str, day=None) -> bool:
+        return any(_PART.match(p.name).group(2) == key for p in self._parts(_day(day)))
+
+    def append(self, df: pd.DataFrame, day=None, key: str | None = None) -> int:
+        """Store `df` as the snapshot of `day` (default today); returns the rows written.
+
+        With `key` (e.g. a digest of the uploaded files) the append is idempotent:
+        a key already stored for that day writes nothing.
+        """
+        day = _day(day)
+        if df.empty or "asin" not in df.columns or (key is not None and self.has(key, day)):
+            return 0
+        key = key or "upload"
+        df = _plain(dedupe_latest(df, keys=("asin", "country") if "country" in df.columns else ("asin",)))
+        country = df["country"] if "country" in df.columns else pd.Series(np.nan, index=df.index)
+        stamp = time.time_ns()
+        written = 0
+        for value, part in df.groupby(country.fillna(_NO_COUNTRY).astype(str), sort=True):
+            folder = self.root / f"date={day}" / f"country={value}"
+            folder.mkdir(parents=True, exist_ok=True)
+            path = folder / f"part-{stamp}-{key}.parquet"
+            tmp = path.with_suffix(".tmp")
+            part.drop(columns=["country"], errors="ignore").to_parquet(tmp, index=False)
+            os.replace(tmp, path)
+            written += len(part)
+        return written
+
+    def day_key(self, day) -> tuple:
+        """Names of the part files of `day`: changes whenever something is appended to it."""
+        return tuple(p.parent.name + "/" + p.name for p in self._parts(_day(day)))
+
+    def days(self) -> List[str]:
+        if not self.root.exists():
+            return []
+        return sorted(m.group(1) for p in self.root.iterdir() if p.is_dir() and (m := _DAY.match(p.name)))
+
+    def read(self, start=None, end=None, countries: List[str] | None = None,
+             columns: List[str] | None = None) -> pd.DataFrame:
+        """Snapshots with `start` <= date <= `end` (ISO strings or dates), one row per day+asin+country.
+
+        Only the matching partitions are opened and only `columns` are read from them;
+        the result carries `snapshot_date` and `country` from the partition path.
+        """
+        lo = _day(start) if start is not None else None
+        hi = _day(end) if end is not None else None
+        wanted = None if countries is None else {str(c) for c in countries}
+        frames = []
+        for day in self.days():
+            if (lo and day < lo) or (hi and day > hi):
+                continue
+            for path in self._parts(day):
+                country = path.parent.name.split("=", 1)[1]
+                if wanted is not None and country not in wanted:
+                    continue
+                cols = None
+                if columns is not None:
+                    import pyarrow.parquet as pq
+                    names = pq.read_schema(path).names
+                    cols = [c for c in dict.fromkeys(columns + ["asin", "last_update"]) if c in names]
+                part = pd.read_parquet(path, columns=cols)
+                part.insert(0, "country", np.nan if country == _NO_COUNTRY else country)
+                part.insert(0, "snapshot_date", day)
+                frames.append(part)
+        if not frames:
+            return pd.DataFrame(columns=["snapshot_date", "country", "asin"])
+        out = pd.concat(frames, ignore_index=True)
+        out = dedupe_latest(out, keys=("snapshot_date", "asin", "country"))
+        out["snapshot_date"] = pd.to_datetime(out["snapshot_date"])
+        return out.reset_index(drop=True)
+
+    def deltas(self, prev_day, curr_day, countries: List[str] | None = None) -> pd.DataFrame:
+        """`daily_deltas` between two stored days."""
+        cols = list(DELTA_COLS)
+        prev = self.read(prev_day, prev_day, countries, cols)
+        curr = self.read(curr_day, curr_day, countries, cols)
+        return daily_deltas(prev, curr)
+
+    def clear(self) -> int:
+        removed = 0
+        for day in self.days():
+            shutil.rmtree(self.root / f"date={day}", ignore_errors=True)
+            removed += 1
+        return removed
+
+def _no_amazon(s: pd.Series | None, n: int) -> np.ndarray:
+    """Amazon out of stock / not offering (same test as the availability score), per distinct value."""
+    if s is None:
+        return np.zeros(n, dtype=bool)
+    codes, uniques = pd.factorize(s)
+    hit = np.array([isinstance(u, str) and "no amazon offer" in u.lower() for u in uniques] + [False])
+    return hit[codes]
+
+def _num(df: pd.DataFrame, col: str) -> np.ndarray:
+    if col not in df.columns:
+        return np.full(len(df), np.nan)
+    return pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+
+def daily_deltas(prev: pd.DataFrame, curr: pd.DataFrame) -> pd.DataFrame:
+    """Day-over-day changes per asin+country present in both snapshots (one hash join).
+
+    price_delta(_pct) on the Buy Box, rank_delta on the sales rank (negative = better),
+    new_oos when Amazon stopped offering the item since `prev`.
+    """
+    keys = ["asin", "country"]
+    left = prev[[c for c in keys + DELTA_COLS if c in prev.columns]]
+    right = curr[[c for c in keys + DELTA_COLS if c in curr.columns]]
+    m = right.merge(left, on=keys, how="inner", suffixes=("", "_prev"))
+    p0, p1 = _num(m, "buybox_current_prev"), _num(m, "buybox_current")
+    r0, r1 = _num(m, "sales_rank_current_prev"), _num(m, "sales_rank_current")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pct = np.where(p0 > 0, (p1 - p0) / p0, np.nan)
+    oos_now = _no_amazon(m.get("amazon_offer_availability"), len(m))
+    oos_before = _no_amazon(m.get("amazon_offer_availability_prev"), len(m))
+    return pd.DataFrame({
+        "asin": m["asin"].to_numpy(),
+        "country": m["country"].to_numpy(),
+        "price_prev": p0,
+        "price_curr": p1,
+        "price_delta": p1 - p0,
+        "price_delta_pct": pct,
+        "rank_prev": r0,
+        "rank_curr": r1,
+        "rank_delta": r1 - r0,
+        "new_oos": oos_now & ~oos_before,
+    })
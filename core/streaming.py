@@ -0,0 +1,115 @@
+from __future__ import annotations
+import os
+from typing import Callable, Dict, Iterable, Iterator, List
+import pandas as pd
+from .config import STREAM_BATCH_ROWS
+from .features import merge_norm_stats, score_norm_stats
+from .parallel import score_rows
+from .pipeline import sell_view, with_scores
+from .scoring_v2 import DETECTOR_NUMERIC_COLS, component_score_matrix, rescore
+
+# columns (SELL-side names) behind the frame-wide bounds of the component scores
+NORM_STAT_COLS = ["buybox_current", "sales_rank_current"]
+
+# A batch source is called once per pass; `columns` (margins names) is a hint, None = all.
+BatchSource = Callable[[List[str] | None], Iterable[pd.DataFrame]]
+
+def stream_norm_stats(batches: Iterable[pd.DataFrame]) -> dict:
+    """Pass 1: `score_norm_stats` of the concatenated (margins) batches, one batch in memory at a time."""
+    parts = [score_norm_stats(sell_view(b)) for b in batches if len(b)]
+    return merge_norm_stats(parts) if parts else score_norm_stats(pd.DataFrame())
+
+def source_norm_stats(source: BatchSource) -> dict:
+    """Pass 1 over a batch source, reading only the columns behind the bounds."""
+    return stream_norm_stats(source([f"{c}_sell" for c in NORM_STAT_COLS] + NORM_STAT_COLS))
+
+def score_batch(df_marg: pd.DataFrame, stats: dict, weights: Dict[str, float] | None = None) -> pd.DataFrame:
+    """Features and opportunity score of one batch of margins, normalized with the global `stats`."""
+    df = score_rows(sell_view(df_marg), stats)
+    return with_scores(df, rescore(component_score_matrix(df), weights))
+
+def score_stream(source: BatchSource, weights: Dict[str, float] | None = None,
+                 stats: dict | None = None) -> Iterator[pd.DataFrame]:
+    """Two-pass scoring of a margins set too large for memory.
+
+    The first pass reads only the bound columns of every batch and merges their
+    `score_norm_stats`; the second scores each batch with those bounds. Scores, flags and
+    the opportunity score equal those of `score_pairs` on the whole set, row for row.
+    Pass known `stats` to skip the first pass.
+    """
+    if stats is None:
+        stats = source_norm_stats(source)
+    for batch in source(None):
+        yield score_batch(batch, stats, weights)
+
+def _paths(path) -> List[str | os.PathLike]:
+    return [path] if isinstance(path, (str, os.PathLike)) else list(path)
+
+def parquet_source(path, batch_rows: int | None = None) -> BatchSource:
+    """Batch source over one or more Parquet files of margins (row groups streamed by pyarrow)."""
+    import pyarrow.parquet as pq
+
+    def batches(columns=None):
+        for one in _paths(path):
+            with pq.ParquetFile(one) as pf:
+                names = pf.schema_arrow.names
+                cols = None if columns is None else [c for c in columns if c in names]
+                for rb in pf.iter_batches(batch_size=batch_rows or STREAM_BATCH_ROWS, columns=cols):
+                    yield rb.to_pandas()
+    return batches
+
+def parquet_schema(path):
+    """Arrow schema of one or more margins Parquet files (types widened across files)."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schemas = []
+    for one in _paths(path):
+        with pq.ParquetFile(one) as pf:
+            schemas.append(pf.schema_arrow.remove_metadata())
+    return pa.unify_schemas(schemas, promote_options="permissive")
+
+def _out_schema(src_schema, probe: pd.DataFrame):
+    """Arrow schema of the scored file: source types where the column is unchanged, probe types
+    for the new columns; detector inputs parsed from text are written as float64 (a batch of
+    whole numbers parses to int64, the next one may not)."""
+    import pyarrow as pa
+
+    inferred = pa.Schema.from_pandas(probe, preserve_index=False)
+    renamed = sell_view(pd.DataFrame(columns=src_schema.names)).columns  # same renames as the scored frame
+    src = {new: src_schema.field(old) for old, new in zip(src_schema.names, renamed)}
+    fields = []
+    for f in inferred:
+        if f.name in DETECTOR_NUMERIC_COLS and f.name in src and not pa.types.is_floating(src[f.name].type) \
+                and not pa.types.is_integer(src[f.name].type):
+            fields.append(pa.field(f.name, pa.float64()))
+        elif f.name in src and (src[f.name].type == f.type or pa.types.is_null(f.type)):
+            fields.append(pa.field(f.name, src[f.name].type))
+        else:
+            fields.append(f)
+    return pa.schema(fields)
+
+def score_parquet(src, dst: str | os.PathLike, weights: Dict[str, float] | None = None,
+                  batch_rows: int | None = None) -> dict:
+    """`score_stream` from margins Parquet file(s) to a scored Parquet file; returns {rows, stats}."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    source = parquet_source(src, batch_rows)
+    stats = source_norm_stats(source)
+    src_schema = parquet_schema(src)
+    rows, writer, schema = 0, None, None
+    try:
+        for chunk in score_stream(source, weights, stats):
+            if writer is None:
+                schema = _out_schema(src_schema, chunk)
+                writer = pq.ParquetWriter(dst, schema, compression="zstd")
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+            rows += len(chunk)
+        if writer is None:  # no rows: still a file with the scored columns
+            empty = score_batch(src_schema.empty_table().to_pandas(), stats, weights)
+            pq.write_table(pa.Table.from_pandas(empty, schema=_out_schema(src_schema, empty), preserve_index=False), dst)
+    finally:
+        if writer is not None:
+            writer.close()
+    return {"rows": rows, "stats": stats}
@@ -1,5 +1,7 @@
 from __future__ import annotations
 import re
+from functools import lru_cache
+import numpy as np
 import pandas as pd
 
 def to_country_from_locale(val: str) -> str:
@@ -63,18 +65,179 @@ def parse_int(x):
     except:
         return None
 
-def coerce_numeric(df: pd.DataFrame, cols: list[str], fn) -> pd.DataFrame:
-    df = df.copy()
+# Columnar versions of parse_price / parse_percent / parse_int. They return
+# exactly what `Series.map(fn)` returns (values and dtype), but the separator
+# layout of the whole column is resolved with one vectorized mask, well-formed
+# numbers are converted in bulk and only odd cells ("1_000", "inf", non-ASCII
+# digits, ...) go through the scalar parser.
+
+# Same set as `\s` / str.strip() (U+3000 is the last whitespace code point),
+# spelled out so that Python re and the Arrow regex engine agree on it.
+_WS = "".join(ch for ch in map(chr, range(0x3001)) if ch.isspace())
+_STRIP_RE = f"^[{_WS}]+|[{_WS}]+$"
+_PRICE_JUNK_RE = f"[€£${_WS}]"
+_FLOAT_RE = r"[+-]?(?:[0-9]+\.?[0-9]*|\.[0-9]+)(?:[eE][+-]?[0-9]+)?"
+_NULL_TOKENS = ["no", "nan", "none"]
+_INT64_LIMIT = 2.0 ** 63
+
+def _is_text_column(s: pd.Series) -> bool:
+    if len(s) == 0 or not pd.api.types.is_string_dtype(s.dtype):
+        return False
+    if isinstance(s.dtype, pd.StringDtype):
+        return True
+    return pd.api.types.infer_dtype(s, skipna=True) in ("string", "empty")
+
+def _mask(s: pd.Series) -> np.ndarray:
+    return s.fillna(False).to_numpy(dtype=bool)
+
+def _put(values: np.ndarray, none: np.ndarray, where: np.ndarray, results: list) -> None:
+    none[where] = [r is None for r in results]
+    values[where] = [np.nan if r is None else r for r in results]
+
+def _parse_missing(s: pd.Series, miss: np.ndarray, fn, values: np.ndarray, none: np.ndarray) -> None:
+    if not miss.any():
+        return
+    if isinstance(s.dtype, pd.StringDtype):
+        results = [fn(s.dtype.na_value)] * int(miss.sum())
+    else:
+        results = [fn(v) for v in s.to_numpy(dtype=object)[miss]]
+    _put(values, none, miss, results)
+
+def _parse_cells(s: pd.Series, text: pd.Series, todo: np.ndarray, fn, values: np.ndarray, none: np.ndarray) -> np.ndarray:
+    """Convert the `todo` cells of the cleaned `text`; odd shapes fall back to `fn(raw cell)`.
+
+    Returns the mask of cells converted in bulk.
+    """
+    bulk = todo & _mask(text.str.fullmatch(_FLOAT_RE))
+    if bulk.any():
+        values[bulk] = text[bulk].to_numpy(dtype=object).astype(np.float64)
+    odd = todo & ~bulk
+    if odd.any():
+        _put(values, none, odd, [fn(v) for v in s[odd]])
+    return bulk
+
+def _as_mapped(s: pd.Series, values: np.ndarray, none: np.ndarray, integer: bool = False) -> pd.Series:
+    """Rebuild the Series (dtype included) that `s.map(fn)` would have produced."""
+    if none.all():
+        return pd.Series([None] * len(s), index=s.index, name=s.name, dtype=object)
+    if integer and not none.any():
+        return pd.Series(values.astype(np.int64), index=s.index, name=s.name)
+    values[none] = np.nan
+    return pd.Series(values, index=s.index, name=s.name)
+
+def parse_price_series(s: pd.Series) -> pd.Series:
+    """Vectorized `s.map(parse_price)`."""
+    if not _is_text_column(s):
+        return s.map(parse_price)
+    values = np.full(len(s), np.nan)
+    none = np.zeros(len(s), dtype=bool)
+    miss = s.isna().to_numpy()
+    _parse_missing(s, miss, parse_price, values, none)
+    stripped = s.str.replace(_STRIP_RE, "", regex=True).str.lower()
+    tokens = ~miss & _mask(s.str.len().eq(0) | stripped.isin(_NULL_TOKENS))
+    none[tokens] = True
+    text = s.str.replace(_PRICE_JUNK_RE, "", regex=True)
+    # a "," anywhere makes it the decimal separator and any "." a thousands one
+    comma = _mask(text.str.contains(",", regex=False))
+    if comma.any():
+        eu = text[comma].str.replace(".", "", regex=False).str.replace(",", ".", regex=False)
+        text = text.mask(comma, eu)
+    _parse_cells(s, text, ~miss & ~tokens, parse_price, values, none)
+    return _as_mapped(s, values, none)
+
+def parse_percent_series(s: pd.Series) -> pd.Series:
+    """Vectorized `s.map(parse_percent)`."""
+    if not _is_text_column(s):
+        return s.map(parse_percent)
+    values = np.full(len(s), np.nan)
+    none = np.zeros(len(s), dtype=bool)
+    miss = s.isna().to_numpy()
+    _parse_missing(s, miss, parse_percent, values, none)
+    text = (
+        s.str.replace("%", "", regex=False)
+        .str.replace(",", ".", regex=False)
+        .str.replace(_STRIP_RE, "", regex=True)
+    )
+    bulk = _parse_cells(s, text, ~miss, parse_percent, values, none)
+    scale = bulk & (values > 1)
+    values[scale] = values[scale] / 100.0
+    return _as_mapped(s, values, none)
+
+def parse_int_series(s: pd.Series) -> pd.Series:
+    """Vectorized `s.map(parse_int)`."""
+    if not _is_text_column(s):
+        return s.map(parse_int)
+    values = np.full(len(s), np.nan)
+    none = np.zeros(len(s), dtype=bool)
+    miss = s.isna().to_numpy()
+    _parse_missing(s, miss, parse_int, values, none)
+    bulk = _parse_cells(s, s, ~miss, parse_int, values, none)
+    inf = bulk & np.isinf(values)
+    none[inf] = True
+    values[bulk & ~inf] = np.trunc(values[bulk & ~inf])
+    if np.any(np.abs(values[~none]) >= _INT64_LIMIT):
+        # ints beyond int64 change the mapped dtype: keep the scalar result
+        return s.map(parse_int)
+    return _as_mapped(s, values, none, integer=True)
+
+_COLUMNAR = {
+    parse_price: parse_price_series,
+    parse_percent: parse_percent_series,
+    parse_int: parse_int_series,
+}
+
+def coerce_numeric(df: pd.DataFrame, cols: list[str], fn, inplace: bool = False) -> pd.DataFrame:
+    df = df if inplace else df.copy()
+    columnar = _COLUMNAR.get(fn)
     for c in cols:
         if c in df.columns:
-            df[c] = df[c].map(fn)
+            df[c] = columnar(df[c]) if columnar else df[c].map(fn)
     return df
 
-def ensure_country_column(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
+@lru_cache(maxsize=4096)
+def _country_for(val: str) -> str | None:
+    # memoized across chunks and files: an upload has a handful of distinct locales
+    return to_country_from_locale(val)
+
+def countries_from_locales(locales: pd.Series) -> pd.Series:
+    """Vectorized `locales.map(to_country_from_locale)`: each distinct value is resolved once."""
+    if len(locales) == 0 or isinstance(locales.dtype, pd.CategoricalDtype):
+        return locales.map(to_country_from_locale)
+    codes, uniques = pd.factorize(locales)
+    resolved = [_country_for(u) if isinstance(u, str) else to_country_from_locale(u) for u in uniques]
+    if any(r is not None for r in resolved) and all(r is None or isinstance(r, str) for r in resolved):
+        # what `map` infers for strings (+ missing): gather straight into a str array
+        out = pd.array(resolved, dtype="str").take(codes, allow_fill=True)
+        return pd.Series(out, index=locales.index, name=locales.name)
+    values = np.array(resolved + [None], dtype=object)[codes]
+    return pd.Series(values, index=locales.index, name=locales.name).infer_objects()
+
+def ensure_country_column(df: pd.DataFrame, inplace: bool = False) -> pd.DataFrame:
+    df = df if inplace else df.copy()
     if "country" not in df.columns:
         if "locale" in df.columns:
-            df["country"] = df["locale"].map(to_country_from_locale)
+            df["country"] = countries_from_locales(df["locale"])
         else:
             df["country"] = None
     return df
+
+def parse_timestamps(s: pd.Series) -> pd.Series:
+    """`last_update`-style text -> datetime64 (NaT when unparseable); each distinct value parsed once."""
+    codes, uniques = pd.factorize(s)
+    parsed = pd.to_datetime(pd.Series(uniques, dtype=object), errors="coerce", format="mixed")
+    values = parsed.to_numpy(dtype="datetime64[ns]")
+    out = np.append(values, np.datetime64("NaT", "ns"))[codes]
+    return pd.Series(out, index=s.index, name=s.name)
+
+def dedupe_latest(df: pd.DataFrame, keys=("asin", "country"), order_col: str = "last_update") -> pd.DataFrame:
+    """One row per `keys`: the one with the latest `order_col` (first seen on ties / no date).
+
+    Kept rows stay in their original order, like `drop_duplicates`.
+    """
+    keys = list(keys)
+    if order_col not in df.columns:
+        return df.drop_duplicates(subset=keys)
+    ts = parse_timestamps(df[order_col]).to_numpy().view(np.int64)  # NaT = int64 min
+    order = np.argsort(~ts, kind="stable")  # ~ts: latest first, NaT last, ties keep input order
+    dup = df[keys].iloc[order].duplicated().to_numpy()
+    return df.iloc[np.sort(order[~dup])]
@@ -0,0 +1,116 @@
+from __future__ import annotations
+import hashlib
+import math
+from typing import Callable, List
+import pandas as pd
+from .cache import UploadCache, file_digest
+from .schema import normalize_header
+
+# Bump when the raw text produced for a cell changes (sidecars hold raw text, not parsed values)
+XLSX_SIDECAR_VERSION = 1
+
+# Strings that `pd.read_excel(dtype=str)` turns into NaN (pandas' default na_values)
+_NA_TEXT = {
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+}
+_ERRORS = {"#NULL!", "#DIV/0!", "#VALUE!", "#REF!", "#NAME?", "#NUM!", "#N/A"}
+
+def _cell_text(v):
+    """Cell value as `pd.read_excel(dtype=str)` reports it: text, or None when missing."""
+    if v is None:
+        return None
+    if isinstance(v, str):
+        return None if v in _NA_TEXT or v in _ERRORS else v
+    if isinstance(v, bool):
+        return str(v)
+    if isinstance(v, float) and not math.isfinite(v):
+        return None if math.isnan(v) else str(v)
+    if isinstance(v, (int, float)):
+        i = int(v)
+        return str(i) if i == v else str(float(v))
+    return str(v)
+
+def _header_names(cells: list) -> list:
+    """Column names as pandas builds them: "Unnamed: i" for blanks, ".1", ".2" for duplicates."""
+    names, seen = [], {}
+    for i, c in enumerate(cells):
+        name = f"Unnamed: {i}" if c is None or c == "" else c
+        base = name
+        while name in seen:
+            seen[base] += 1
+            name = f"{base}.{seen[base]}"
+        seen.setdefault(name, 0)
+        names.append(name)
+    return names
+
+def _used_width(row) -> int:
+    n = len(row)
+    while n and (row[n - 1] is None or row[n - 1] == ""):
+        n -= 1
+    return n
+
+def read_xlsx_raw(path_or_file, keep: Callable[[object], bool] | None = None) -> pd.DataFrame:
+    """First sheet as text, streamed with openpyxl's read-only reader.
+
+    Same frame as `pd.read_excel(..., dtype=str)` for Keepa-style sheets (one header row),
+    but only the columns whose raw header passes `keep` are converted and kept.
+    """
+    from openpyxl import load_workbook
+
+    if hasattr(path_or_file, "seek"):
+        path_or_file.seek(0)
+    wb = load_workbook(path_or_file, read_only=True, data_only=True, keep_links=False)
+    try:
+        ws = wb.worksheets[0]
+        ws.reset_dimensions()
+        rows = ws.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return pd.DataFrame()
+        width = _used_width(header)
+        body = []
+        for row in rows:
+            used = _used_width(row)
+            body.append(row if used else None)
+            width = max(width, used)
+    finally:
+        wb.close()
+    while body and body[-1] is None:  # trailing empty rows are dropped, inner ones kept
+        body.pop()
+
+    names = _header_names(list(header[:width]) + [None] * (width - len(header)))
+    out = {}
+    for i, name in enumerate(names):
+        if keep is not None and not keep(name):
+            continue
+        values = [_cell_text(row[i]) if row is not None and i < len(row) else None for row in body]
+        out[name] = pd.array(values, dtype="str")
+    return pd.DataFrame(out, index=pd.RangeIndex(len(body)))
+
+def sidecar_key(path_or_file) -> str:
+    """Cache key of a workbook's sidecar: its content only (not ALIAS_MAP or the projection)."""
+    raw = f"{file_digest(path_or_file)}:xlsx-sidecar:{XLSX_SIDECAR_VERSION}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+def read_xlsx(path_or_file, columns: List[str] | None = None, cache: UploadCache | None = None) -> pd.DataFrame:
+    """Raw-header text frame of a workbook, restricted to the (normalized) `columns`.
+
+    With a `cache`, the first sheet is converted once into a Parquet sidecar keyed by the
+    file content; later loads read just the needed columns from it and never parse the
+    workbook again, whatever `columns` or ALIAS_MAP they use.
+    """
+    wanted = None if columns is None else set(columns)
+    keep = None if wanted is None else (lambda h: normalize_header(h) in wanted)
+    if cache is None:
+        return read_xlsx_raw(path_or_file, keep)
+    key = sidecar_key(path_or_file)
+    names = cache.column_names(key)
+    if names is not None:
+        df = cache.get(key, columns=[c for c in names if keep is None or keep(c)])
+        if df is not None:
+            return df
+    raw = read_xlsx_raw(path_or_file)
+    raw.columns = [str(c) for c in raw.columns]
+    cache.put(key, raw)
+    return raw if keep is None else raw[[c for c in raw.columns if keep(c)]]
@@ -1,9 +1,11 @@
+import numpy as np
 import pandas as pd
 import pathlib
 import sys
 
 sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
-from core.arbitrage import attach_badges_for_pairs
+from core.arbitrage import add_break_even, attach_badges_for_pairs, compute_margins, build_pairs
+from utils import apply_vat_discount_rules, apply_vat_discount_rules_array, discount_for_net_array
 
 
 def test_attach_badges_handles_string_inputs():
@@ -46,3 +48,69 @@ def test_attach_badges_handles_missing_columns():
     result = attach_badges_for_pairs(df)
     assert "pair_badges" in result.columns
     assert list(result["pair_badges"]) == ["", ""]
+
+
+def test_compute_margins_array_rule_matches_scalar_rule():
+    pairs = pd.DataFrame({
+        "asin": ["A1", "A2", "A3", "A4"],
+        "country_buy": ["IT", "DE", "FR", "IT"],
+        "country_sell": ["DE", "IT", "IT", "ES"],
+        "new_current_buy": [None, 20.0, None, 15.0],
+        "buybox_current_buy": [10.0, 25.0, None, 16.0],
+        "buybox_current_sell": [30.0, 40.0, 50.0, None],
+        "referral_fee_pct_sell": [15.0, 0.07, None, 8.0],
+        "fba_pickpack_fee_sell": [3.0, None, 2.5, 1.0],
+    })
+    discounts = {"IT": 0.1, "DE": 0.05}
+    for ship_mode in ("FBA", "FBM"):
+        fast = compute_margins(
+            pairs, None, discounts, ship_mode, apply_vat_discount_rules,
+            vat_discount_array_fn=apply_vat_discount_rules_array,
+        )
+        reference = compute_margins(pairs, None, discounts, ship_mode, apply_vat_discount_rules)
+        pd.testing.assert_frame_equal(fast, reference)
+    assert fast["buy_price"].tolist()[:2] == [10.0, 20.0]
+
+
+def test_build_pairs_prunes_pairs_below_margin_bound():
+    df = pd.DataFrame({
+        "asin": ["A1", "A1", "A2", "A2", "A3"],
+        "country": ["DE", "IT", "DE", "IT", "DE"],
+        "buybox_current": [10.0, 40.0, 30.0, 31.0, 5.0],
+    })
+    full = build_pairs(df, ["DE"], ["IT"])
+    pruned = build_pairs(
+        df, ["DE"], ["IT"], min_margin_eur=5.0,
+        vat_discount_array_fn=apply_vat_discount_rules_array,
+    )
+    assert list(pruned.columns) == list(full.columns)
+    assert pruned["asin"].tolist() == ["A1"]
+    assert pruned.attrs["pruned_pairs"] == 1
+    pd.testing.assert_frame_equal(pruned, full[full["asin"] == "A1"].reset_index(drop=True))
+
+
+def test_break_even_discounts_and_sell_price_hit_their_margins():
+    pairs = pd.DataFrame({
+        "asin": ["A1", "A2", "A3", "A4"],
+        "country_buy": ["IT", "DE", "FR", "IT"],
+        "country_sell": ["DE", "IT", "IT", "ES"],
+        "buybox_current_buy": [20.0, 25.0, 30.0, 60.0],
+        "buybox_current_sell": [40.0, 45.0, 50.0, 30.0],
+        "referral_fee_pct_sell": [15.0, 0.07, None, 8.0],
+        "fba_pickpack_fee_sell": [3.0, None, 2.5, 1.0],
+    })
+
+    def margins(p, discounts, ship_mode):
+        return compute_margins(p, None, discounts, ship_mode, apply_vat_discount_rules,
+                               vat_discount_array_fn=apply_vat_discount_rules_array)
+
+    for ship_mode in ("FBA", "FBM"):
+        be = add_break_even(margins(pairs, {}, ship_mode), ship_mode, 0.2, discount_for_net_array)
+        for col, check, target in (("break_even_discount", "gross_margin_eur", 0.0),
+                                   ("target_discount", "margin_pct", 0.2)):
+            got = [margins(pairs.iloc[[i]], {be["country_buy"][i]: be[col][i]}, ship_mode)[check].iloc[0]
+                   for i in range(len(pairs))]
+            np.testing.assert_allclose(got, target, atol=1e-12)
+        repriced = margins(pairs.assign(buybox_current_sell=be["min_sell_price"]), {}, ship_mode)
+        np.testing.assert_allclose(repriced["margin_pct"], 0.2, atol=1e-12)
+    assert be["target_discount"].iloc[0] < 0 < be["target_discount"].iloc[3]
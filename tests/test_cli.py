@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+import pathlib
+import sys
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+from cli import main, parse_args
+from core.config import PIPELINE_COLS
+from core.loaders import load_many
+from core.pipeline import score_pairs
+
+
+def _export(path, locale, prices, asins=("A1", "A2")):
+    pd.DataFrame({
+        "ASIN": list(asins),
+        "Locale": [locale, locale],
+        "Buy Box 🚚: Current": prices,
+        "Sales Rank: Current": ["100", "2000"],
+        "Sales Rank: Drops last 30 days": ["5", "1"],
+        "Bought in past month": ["50", "0"],
+        "Reviews: Rating Count": ["10", "3"],
+        "Reviews: Rating Count - 90 days avg.": ["8", "3"],
+        "Buy Box: Standard Deviation 30 days": ["1", "2"],
+        "Buy Box: Standard Deviation 90 days": ["1", "2"],
+        "Buy Box: Flipability 90 days": ["10", "90"],
+        "Total Offer Count": ["3", "12"],
+        "Amazon: 90 days OOS": ["20", "0"],
+        "Amazon: OOS Count 30 days": ["1", "0"],
+        "Amazon: Availability of the Amazon offer": ["no amazon offer", "in stock"],
+        "Amazon: Amazon offer shipping delay": ["", ""],
+        "MAP restriction": ["no", "no"],
+    }).to_csv(path, index=False)
+
+
+def test_cli_writes_ranked_results(tmp_path, capsys):
+    _export(tmp_path / "de.csv", "de", ["10,00 €", "50,00 €"])
+    _export(tmp_path / "it.csv", "it", ["40,00 €", "45,00 €"])
+    out = tmp_path / "res.parquet"
+    assert main([str(tmp_path), "--buy", "DE", "--sell", "IT", "--no-cache", "--workers", "1", "--out", str(out)]) == 0
+    res = pd.read_parquet(out)
+    assert len(res) == 2
+    assert res["opportunity_score_v2"].is_monotonic_decreasing
+    assert "pairs" in capsys.readouterr().out
+
+
+def test_cli_all_pairs_ranks_with_whole_frame_bounds(tmp_path):
+    _export(tmp_path / "de.csv", "de", ["10,00 €", "20,00 €"], asins=("A1", "A2"))
+    _export(tmp_path / "fr.csv", "fr", ["12,00 €", "15,00 €"], asins=("A2", "A3"))
+    pd.concat([pd.read_csv(tmp_path / "de.csv").assign(ASIN=["A1", "A2"], Locale="it"),
+               pd.read_csv(tmp_path / "fr.csv").assign(ASIN=["A2", "A3"], Locale="it").iloc[1:]]) \
+        .assign(**{"Buy Box 🚚: Current": ["400,00 €", "45,00 €", "30,00 €"]}).to_csv(tmp_path / "it.csv", index=False)
+    out = tmp_path / "res.parquet"
+    assert main([str(tmp_path), "--all-pairs", "--buy", "DE", "FR", "--sell", "IT", "--no-cache",
+                 "--workers", "1", "--out", str(out)]) == 0
+    df_all = load_many(sorted(str(p) for p in tmp_path.glob("*.csv")), columns=PIPELINE_COLS, workers=1)
+    whole = score_pairs(df_all, ["DE", "FR"], ["IT"])
+    key = ["asin", "country_buy"]
+    res = pd.read_parquet(out).sort_values(key, ignore_index=True)
+    whole = whole.sort_values(key, ignore_index=True)
+    assert len(res) == 4
+    for col in ("score_priceedge", "score_stability", "opportunity_score_v2"):
+        assert res[col].tolist() == whole[col].tolist()
+
+
+def test_cli_explicit_zero_beats_config(tmp_path):
+    cfg = tmp_path / "batch.json"
+    cfg.write_text('{"top_n": 5, "min_margin_eur": 2.0, "all_pairs": true}')
+    args = parse_args(["x.csv", "--config", str(cfg), "--top-n", "0", "--min-margin-eur", "0"])
+    assert args.top_n == 0 and args.min_margin_eur == 0 and args.all_pairs is True
+    assert parse_args(["x.csv", "--config", str(cfg)]).top_n == 5
+
+
+def test_cli_stream_matches_in_memory_run(tmp_path):
+    _export(tmp_path / "de.csv", "de", ["10,00 €", "20,00 €"])
+    _export(tmp_path / "fr.csv", "fr", ["12,00 €", "15,00 €"])
+    _export(tmp_path / "it.csv", "it", ["400,00 €", "45,00 €"])
+    base = ["--buy", "DE", "FR", "--sell", "IT", "--no-cache", "--workers", "1"]
+    assert main([str(tmp_path), *base, "--out", str(tmp_path / "mem.parquet")]) == 0
+    assert main([str(tmp_path), *base, "--stream", "--batch-rows", "1", "--out", str(tmp_path / "st.parquet")]) == 0
+    key = ["asin", "country_buy"]
+    mem = pd.read_parquet(tmp_path / "mem.parquet").sort_values(key, ignore_index=True)
+    st = pd.read_parquet(tmp_path / "st.parquet").sort_values(key, ignore_index=True)
+    assert len(st) == 4
+    for col in ("score_priceedge", "score_stability"):
+        assert st[col].tolist() == mem[col].tolist()
+    # matrix product over batches of another size: equal to float rounding
+    np.testing.assert_allclose(st["opportunity_score_v2"], mem["opportunity_score_v2"], rtol=1e-12)
@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+import pathlib
+import sys
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+from core.compact import compact_frame, concat_compact, memory_report
+
+
+def test_compact_frame_dtypes_and_values():
+    df = pd.DataFrame({
+        "asin": ["A1", "A2", "A3", "A4"],
+        "country_buy": ["DE", "DE", "FR", "FR"],
+        "title_sell": ["t", "t", "t", "u"],
+        "sales_rank_current_sell": [10, 20, 30, 40],
+        "bought_past_month_sell": [1.0, np.nan, 3.0, 4.0],
+        "buybox_current_sell": [19.99, 20.01, 5.5, 7.25],
+        "score_demand": [0.1, 0.2, 0.3, 0.4],
+    })
+    out = compact_frame(df)
+    assert isinstance(out["country_buy"].dtype, pd.CategoricalDtype)
+    assert isinstance(out["title_sell"].dtype, pd.CategoricalDtype)
+    assert out["sales_rank_current_sell"].dtype == np.int32
+    assert out["bought_past_month_sell"].dtype == np.float32
+    assert out["buybox_current_sell"].dtype == np.float64
+    assert out["score_demand"].dtype == np.float32
+    assert out["country_buy"].astype(str).tolist() == df["country_buy"].tolist()
+    assert compact_frame(df, scores=False)["score_demand"].dtype == np.float64
+
+    report = memory_report(df, out)
+    assert report.loc["TOTAL", "bytes_after"] < report.loc["TOTAL", "bytes_before"]
+
+
+def test_concat_compact_keeps_columns_categorical_across_parts():
+    repeated = compact_frame(pd.DataFrame({"url_keepa_buy": ["k1", "k1", "k1", None], "country_buy": ["DE"] * 4}))
+    distinct = compact_frame(pd.DataFrame({"url_keepa_buy": ["k2", "k3", "k4", "k1"], "country_buy": ["FR"] * 4}))
+    assert isinstance(repeated["url_keepa_buy"].dtype, pd.CategoricalDtype)
+    assert not isinstance(distinct["url_keepa_buy"].dtype, pd.CategoricalDtype)
+    out = concat_compact([repeated, distinct])
+    assert isinstance(out["url_keepa_buy"].dtype, pd.CategoricalDtype)
+    assert isinstance(out["country_buy"].dtype, pd.CategoricalDtype)
+    assert out["url_keepa_buy"].astype(object).where(out["url_keepa_buy"].notna(), None).tolist() == \
+        ["k1", "k1", "k1", None, "k2", "k3", "k4", "k1"]
@@ -0,0 +1,49 @@
+import numpy as np
+from io import StringIO
+import pandas as pd
+import pathlib
+import sys
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+from core.export import export_frame
+
+
+def _results():
+    return pd.DataFrame({
+        "asin": [f"A{i}" for i in range(7)],
+        "country_buy": pd.Categorical(["DE", "FR"] * 3 + ["DE"]),
+        "margin_pct": [0.1, np.nan, 0.3, 0.05, 0.2, 0.15, 0.4],
+        "opportunity_score_v2": [0.5, 0.1, 0.9, 0.3, 0.7, 0.2, 0.8],
+        "note": [None, None, None, None, None, "x", None],
+    })
+
+
+def test_export_csv_gz_matches_to_csv(tmp_path):
+    df = _results()
+    path = export_frame(df, str(tmp_path / "out.csv.gz"), "csv.gz", chunk_rows=3)
+    pd.testing.assert_frame_equal(pd.read_csv(path), pd.read_csv(StringIO(df.to_csv(index=False))))
+
+
+def test_export_parquet_and_xlsx_top_n_subset(tmp_path):
+    df = _results()
+    order = np.argsort(-df["opportunity_score_v2"].to_numpy())
+    cols = ["asin", "opportunity_score_v2", "note"]
+    pq = pd.read_parquet(export_frame(df, str(tmp_path / "out.parquet"), "parquet",
+                                      columns=cols, top_n=3, order=order, chunk_rows=2))
+    assert pq["asin"].tolist() == ["A2", "A6", "A4"]
+    assert list(pq.columns) == cols
+    xl = pd.read_excel(export_frame(df, str(tmp_path / "out.xlsx"), "xlsx", columns=cols, top_n=3, order=order))
+    assert xl["asin"].tolist() == ["A2", "A6", "A4"]
+
+
+def test_export_decodes_badge_flags_for_exported_rows(tmp_path):
+    df = _results().assign(pair_badge_flags=np.array([1, 0, 3, 0, 8, 0, 6], dtype=np.uint8))
+    order = np.argsort(-df["opportunity_score_v2"].to_numpy())
+    cols = ["asin", "pair_badges"]
+    for fmt in ("csv.gz", "parquet"):
+        path = export_frame(df, str(tmp_path / f"out.{fmt}"), fmt, columns=cols, top_n=3, order=order, chunk_rows=2)
+        out = pd.read_csv(path, keep_default_na=False) if fmt == "csv.gz" else pd.read_parquet(path)
+        assert list(out.columns) == cols
+        assert out["pair_badges"].tolist() == ["No Amazon OOS90", "OOS90 Low%AMZ", "FewSellers"]
+    full = pd.read_parquet(export_frame(df, str(tmp_path / "all.parquet"), "parquet"))
+    assert full.columns[-1] == "pair_badges" and full["note"].tolist()[5] == "x"
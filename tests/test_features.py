@@ -1,9 +1,10 @@
+import numpy as np
 import pandas as pd
 import pathlib
 import sys
 
 sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
-from core.features import _norm
+from core.features import _norm, add_all_component_scores, FUSED_SCORE_COLS
 
 
 def test_norm_coerces_strings_and_invalid():
@@ -26,3 +27,30 @@ def test_norm_handles_nan_bounds():
 
     assert _norm(5, 0, float("nan")) == 1.0
     assert _norm(5, float("nan"), 10) == 0.5
+
+
+def test_fused_component_scores_match_per_function_scores():
+    df = pd.DataFrame({
+        "sales_rank_current": [1000.0, None, 50.0],
+        "sales_rank_drops_30d": [5, 12, 0],
+        "bought_past_month": [100, None, 3000],
+        "reviews_count": ["50", "10", None],
+        "reviews_90d_avg": [40, 0, 7],
+        "buybox_current": [20.0, None, 40.0],
+        "suggested_lower_price": [18.0, 30.0, None],
+        "buybox_std_30d": ["1.5", None, "bad"],
+        "buybox_std_90d": [2.0, 3.0, None],
+        "flipability_90d": [90, 10, None],
+        "total_offer_count": [3, 20, None],
+        "buybox_pct_amz_90d": [0.1, None, 0.9],
+        "amazon_90d_oos": [20, 0, 95],
+        "amazon_oos_cnt_30d": [2, 0, None],
+        "amazon_offer_availability": ["No Amazon offer", None, "in stock"],
+        "amazon_offer_shipping_delay": ["", "delay", None],
+        "prime_eligible": ["yes", "no", None],
+        "map_restriction": ["no", "YES", None],
+    })
+    expected = add_all_component_scores(df, fused=False)
+    result = add_all_component_scores(df, fused=True)
+    for col in FUSED_SCORE_COLS:
+        np.testing.assert_allclose(result[col].to_numpy(), expected[col].to_numpy(), rtol=1e-12, atol=0)
@@ -0,0 +1,28 @@
+import numpy as np
+import pathlib
+import sys
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1] / "bench"))
+from keepa_synth import write_exports, _fmt_prices
+from core.arbitrage import build_pairs
+from core.config import PIPELINE_COLS
+from core.loaders import load_many
+from core.transforms import parse_price
+
+
+def test_price_formats():
+    v = np.array([1234.56, 5.0, 12345.6])
+    assert _fmt_prices(v, np.zeros(3)).to_pylist() == ["1.234,56 €", "5,00 €", "12.345,60 €"]
+    assert _fmt_prices(v, np.ones(3)).to_pylist() == ["1,234.56", "5.00", "12,345.60"]
+    assert [parse_price(x) for x in _fmt_prices(v, np.zeros(3)).to_pylist()] == [1234.56, 5.0, 12345.6]
+
+
+def test_exports_load_and_pair(tmp_path):
+    files = write_exports(str(tmp_path), 500, ["it", "de"], missing_rate=0.2)
+    df = load_many(files, workers=1, columns=PIPELINE_COLS)
+    assert len(df) == 1000
+    assert sorted(df["country"].unique()) == ["DE", "IT"]
+    assert df["buybox_current"].dtype == np.float64
+    assert 0.1 < df["buybox_current"].isna().mean() < 0.3
+    assert len(build_pairs(df, ["DE"], ["IT"])) == 500
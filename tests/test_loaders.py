@@ -1,11 +1,15 @@
+import os
 import pandas as pd
 import numpy as np
+import pytest
 from io import StringIO
 import pathlib
 import sys
 
 sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
-from core.loaders import load_many
+from core.loaders import _typed, load_many, load_one, read_csv_streaming
+from core.schema import normalize_headers
+from core.cache import UploadCache
 
 
 def test_load_many_handles_invalid_ints():
@@ -20,3 +24,89 @@ def test_load_many_handles_invalid_ints():
 
     result = load_many([buf])
     assert result["sales_rank_current"].tolist() == [None, None]
+
+
+def _csv_upload(df, name="test.csv"):
+    buf = StringIO()
+    df.to_csv(buf, index=False)
+    buf.seek(0)
+    buf.name = name
+    return buf
+
+
+def test_load_many_cache_roundtrip(tmp_path):
+    data = pd.DataFrame({
+        "ASIN": ["A", "B"],
+        "Locale": ["de", "it"],
+        "Buy Box 🚚: Current": ["1.234,56 €", "no"],
+        "Sales Rank: Current": ["10", "20"],
+    })
+    cache = UploadCache(tmp_path)
+    first = load_many([_csv_upload(data)], cache=cache)
+    assert cache.info()["entries"] == 1
+    second = load_many([_csv_upload(data)], cache=cache)
+    pd.testing.assert_frame_equal(first, second)
+    assert cache.info()["entries"] == 1
+    assert cache.clear() == 1
+
+
+def test_upload_cache_evicts_least_recently_used(tmp_path):
+    cache = UploadCache(tmp_path, max_bytes=10**9)
+    frame = pd.DataFrame({"asin": ["A"] * 100, "buybox_current": range(100)})
+    cache.put("old", frame)
+    cache.put("new", frame)
+    os.utime(tmp_path / "old.parquet", (0, 0))
+    cache.max_bytes = int(cache.entries()["bytes"].max())
+    assert cache.evict() == 1
+    assert cache.entries()["key"].tolist() == ["new"]
+
+
+def test_load_many_parallel_matches_serial():
+    files = [
+        pd.DataFrame({"ASIN": ["A", "B"], "Locale": ["de", "de"], "Buy Box 🚚: Current": ["1.234,56 €", "9,99 €"]}),
+        pd.DataFrame({"ASIN": ["A", "C"], "Locale": ["it", "it"], "Buy Box 🚚: Current": ["12.5", "no"]}),
+    ]
+    serial = load_many([_csv_upload(df, f"f{i}.csv") for i, df in enumerate(files)], workers=1)
+    parallel = load_many([_csv_upload(df, f"f{i}.csv") for i, df in enumerate(files)], workers=2)
+    pd.testing.assert_frame_equal(parallel, serial)
+
+
+def test_read_csv_streaming_matches_whole_file_parse():
+    data = pd.DataFrame({
+        "ASIN": [f"A{i}" for i in range(10)],
+        "Locale": ["de"] * 10,
+        "Unused Column": ["x"] * 10,
+        "Buy Box 🚚: Current": ["1.234,56 €", "no"] * 5,
+        "Sales Rank: Current": [None] * 5 + ["10", "20", "30", "40", "50"],
+    })
+    columns = ["asin", "locale", "buybox_current", "sales_rank_current"]
+    full = load_one(_csv_upload(data))
+    expected = full[[c for c in full.columns if c in columns + ["country"]]]
+    result = read_csv_streaming(_csv_upload(data), columns, chunksize=3)
+    assert "unused_column" not in result.columns
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_load_one_xlsx_matches_read_excel_and_reuses_sidecar(tmp_path, monkeypatch):
+    data = pd.DataFrame({
+        "ASIN": ["A", "B", "C"],
+        "Locale": ["de", "it", "fr"],
+        "Unused Column": ["x", None, "z"],
+        "Buy Box 🚚: Current": ["1.234,56 €", "no", None],
+        "Sales Rank: Current": [10, None, 30],
+    })
+    path = tmp_path / "export.xlsx"
+    data.to_excel(path, index=False)
+    expected = pd.read_excel(path, dtype=str)
+    normalize_headers(expected, inplace=True)
+    expected = _typed(expected)
+    pd.testing.assert_frame_equal(load_one(str(path)), expected)
+
+    cache = UploadCache(tmp_path / "cache")
+    columns = ["asin", "locale", "buybox_current"]
+    first = load_one(str(path), columns, sidecar=cache)
+    monkeypatch.setattr("core.xlsx.read_xlsx_raw", lambda *a, **k: pytest.fail("workbook parsed twice"))
+    second = load_one(str(path), columns + ["sales_rank_current"], sidecar=cache)
+    pd.testing.assert_frame_equal(first, expected[first.columns.tolist()])
+    pd.testing.assert_frame_equal(second, expected[second.columns.tolist()])
+    assert "unused_column" not in second.columns
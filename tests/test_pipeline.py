@@ -0,0 +1,189 @@
+import json
+import numpy as np
+import pandas as pd
+import pathlib
+import sys
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+from core.arbitrage import build_pairs
+from core.parallel import score_rows_parallel
+from core.pipeline import PairPartitions, StageCache, filtered_margins, sell_side_features, sell_view
+from core.profiling import StageProfiler
+from core.scoring_v2 import add_opportunity_score, add_component_scores, add_weighted_score
+
+
+def test_stage_cache_only_reruns_changed_stages():
+    store = {}
+    calls = []
+
+    def run(country, weight):
+        stages = StageCache(store)
+        stages.run("pairs", [country], lambda: calls.append("pairs"))
+        stages.run("score", [weight], lambda: calls.append("score"), upstream="pairs")
+        return stages.status
+
+    assert run("IT", 0.3) == {"pairs": "miss", "score": "miss"}
+    assert run("IT", 0.5) == {"pairs": "hit", "score": "miss"}
+    assert run("DE", 0.5) == {"pairs": "miss", "score": "miss"}
+    assert calls == ["pairs", "score", "score", "pairs", "score"]
+
+
+def _features_frame():
+    return pd.DataFrame({
+        "margin_pct": [0.1, 0.3],
+        "sales_rank_current": [1000, None],
+        "sales_rank_drops_30d": [5, 12],
+        "bought_past_month": [100, None],
+        "reviews_count": [50, 10],
+        "reviews_90d_avg": [40, 0],
+        "buybox_current": [20.0, 40.0],
+        "buybox_std_30d": [1.0, 4.0],
+        "buybox_std_90d": [2.0, 3.0],
+        "flipability_90d": [90, 10],
+        "total_offer_count": [3, 20],
+        "amazon_90d_oos": [20, 0],
+        "amazon_oos_cnt_30d": [2, 0],
+        "amazon_offer_availability": ["no amazon offer", ""],
+        "amazon_offer_shipping_delay": ["", "delay"],
+    })
+
+
+def test_weighted_score_matches_opportunity_score():
+    df = _features_frame()
+    weights = {"margin": 0.5, "demand": 0.1}
+    expected = add_opportunity_score(df, weights)["opportunity_score_v2"]
+    result = add_weighted_score(add_component_scores(df), weights)["opportunity_score_v2"]
+    pd.testing.assert_series_equal(result, expected)
+
+
+def test_stage_cache_profiles_misses_and_hits():
+    store = {}
+    prof = StageProfiler()
+    stages = StageCache(store, profiler=prof)
+    stages.run("pairs", ["IT"], lambda: pd.DataFrame({"a": range(5)}))
+    stages.run("score", [1], lambda: pd.DataFrame({"a": range(3)}), upstream="pairs")
+    StageCache(store, profiler=prof).run("pairs", ["IT"], lambda: None)
+    rec = prof.frame()
+    assert rec["stage"].tolist() == ["pairs", "score", "pairs"]
+    assert rec["status"].tolist() == ["run", "run", "hit"]
+    assert rec.loc[1, "rows_in"] == 5 and rec.loc[1, "rows_out"] == 3
+    assert json.loads(prof.to_json())["stages"][0]["stage"] == "pairs"
+
+    off = StageProfiler(enabled=False)
+    assert off.run("x", lambda: 42) == 42 and off.records == []
+
+
+def test_copy_free_features_match_pure_and_keep_input():
+    df = _features_frame()
+    df_marg = df.rename(columns={c: f"{c}_sell" for c in df.columns if c != "margin_pct"})
+    df_marg["map_restriction_sell"] = ["no", "yes"]
+    before = df_marg.copy()
+    pure = sell_side_features(df_marg, copy_free=False)
+    pd.testing.assert_frame_equal(sell_side_features(df_marg, copy_free=True), pure)
+    pd.testing.assert_frame_equal(df_marg, before)
+
+    assert add_component_scores(df, inplace=True) is df
+    assert "score_margin" in df.columns
+
+
+def _countries_frame():
+    rows = []
+    for country, shift in (("IT", 0.0), ("DE", -3.0), ("FR", -2.0)):
+        for i in range(6):
+            rows.append({
+                "asin": f"A{i}", "country": country,
+                "buybox_current": 20.0 + 5 * i + shift, "new_current": 18.0 + 5 * i + shift,
+                "sales_rank_current": None if i == 2 else 1000.0 * (i + 1),
+                "buybox_std_30d": 1.0 + i, "buybox_std_90d": 2.0 + i,
+                "fba_pickpack_fee": 3.0, "map_restriction": "no", "amazon_offer_availability": "no amazon offer" if i % 2 else "",
+            })
+    return pd.DataFrame(rows)
+
+
+def _whole(df_all, buy, sell):
+    pairs = build_pairs(df_all, buy, sell)
+    feat = sell_side_features(filtered_margins(pairs, {}, "FBA"))
+    return feat.sort_values(["asin", "country_buy", "country"], ignore_index=True)
+
+
+def test_pair_partitions_match_whole_frame_and_rescore_only_what_changed():
+    df_all = _countries_frame()
+    parts = PairPartitions({})
+    feat, info = parts.run(df_all, ["DE", "FR"], ["IT"], compact=False)
+    assert info["pairs"] == 12 and parts.status == {"DE→IT": "miss", "FR→IT": "miss"}
+    pd.testing.assert_frame_equal(feat.sort_values(["asin", "country_buy", "country"], ignore_index=True),
+                                  _whole(df_all, ["DE", "FR"], ["IT"]))
+
+    # a new DE export that doesn't move the global bounds: FR→IT is reused as is
+    df_de = df_all.copy()
+    df_de.loc[df_de["country"] == "DE", "new_current"] -= 1.0
+    parts.run(df_de, ["DE", "FR"], ["IT"], compact=False)
+    assert parts.status == {"DE→IT": "miss", "FR→IT": "hit"}
+
+    # a DE buy box above every other one moves the std scales: FR→IT is re-scored, not re-paired
+    df_max = df_de.copy()
+    df_max.loc[(df_max["country"] == "DE") & (df_max["asin"] == "A5"), "buybox_current"] = 500.0
+    feat, _ = parts.run(df_max, ["DE", "DE", "FR"], ["IT", "DE"], compact=False)
+    assert parts.status["FR→IT"] == "refresh" and parts.status["DE→DE"] == "miss"
+    expected = _whole(df_max, ["DE", "FR"], ["IT", "DE"])
+    result = feat.sort_values(["asin", "country_buy", "country"], ignore_index=True)
+    np.testing.assert_array_equal(result["score_priceedge"], expected["score_priceedge"])
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_parallel_scoring_matches_serial_features():
+    df_all = _countries_frame()
+    df_all["amazon_90d_oos"] = pd.array(["1", None, "0", "2", "x", "0"] * 3, dtype="str")
+    marg = filtered_margins(build_pairs(df_all, ["DE", "FR"], ["IT", "DE"]), {}, "FBA")
+    serial = sell_side_features(marg, workers=1)
+    before = sell_view(marg).copy()
+    parallel = score_rows_parallel(sell_view(marg), workers=2, chunk_rows=5)
+    pd.testing.assert_frame_equal(parallel, serial, check_exact=True)
+    pd.testing.assert_frame_equal(sell_view(marg), before)
+
+
+def test_streaming_scorer_matches_in_memory_scores(tmp_path):
+    from core.scoring_v2 import component_score_matrix, rescore
+    from core.streaming import score_parquet
+
+    df_all = _countries_frame()
+    df_all.loc[(df_all["country"] == "DE") & (df_all["asin"] == "A5"), "buybox_current"] = 500.0
+    marg = filtered_margins(build_pairs(df_all, ["DE", "FR"], ["IT", "DE"]), {}, "FBA")
+    marg.to_parquet(tmp_path / "marg.parquet", index=False)
+    src = pd.read_parquet(tmp_path / "marg.parquet")
+    feat = sell_side_features(src, workers=1)
+    expected = feat.assign(opportunity_score_v2=rescore(component_score_matrix(feat)))
+
+    info = score_parquet(tmp_path / "marg.parquet", tmp_path / "scored.parquet", batch_rows=5)
+    assert info["rows"] == len(marg) and info["stats"]["bb_max"] == 500.0
+    pd.testing.assert_frame_equal(pd.read_parquet(tmp_path / "scored.parquet"), expected, check_exact=True)
+
+
+
+def test_streaming_scorer_reads_several_parts(tmp_path):
+    from core.scoring_v2 import component_score_matrix, rescore
+    from core.streaming import score_parquet
+
+    marg = filtered_margins(build_pairs(_countries_frame(), ["DE", "FR"], ["IT"]), {}, "FBA")
+    # "_sell" inside the name is not a SELL-side column; all-null in the first part only
+    marg["note_sell_src"] = [None] * 3 + ["x"] * (len(marg) - 3)
+    parts = [tmp_path / "p0.parquet", tmp_path / "p1.parquet"]
+    marg.iloc[:3].to_parquet(parts[0], index=False)
+    marg.iloc[3:].to_parquet(parts[1], index=False)
+    src = pd.concat([pd.read_parquet(p) for p in parts], ignore_index=True)
+    feat = sell_side_features(src, workers=1)
+    expected = feat.assign(opportunity_score_v2=rescore(component_score_matrix(feat)))
+
+    info = score_parquet(parts, tmp_path / "scored.parquet", batch_rows=2)
+    out = pd.read_parquet(tmp_path / "scored.parquet")
+    assert info["rows"] == len(marg) and "note_sell_src" in out.columns
+    pd.testing.assert_frame_equal(out, expected, check_exact=False, rtol=1e-12)
+
+def test_ranked_rows_filters_the_whole_frame_not_the_top_k():
+    from core.pipeline import ranked_rows
+
+    df = pd.DataFrame({"opportunity_score_v2": np.arange(10, dtype=float)[::-1]})
+    mask = np.zeros(10, dtype=bool)
+    mask[[7, 9]] = True
+    assert ranked_rows(df, 3).tolist() == [0, 1, 2]
+    assert ranked_rows(df, 3, mask).tolist() == [7, 9]
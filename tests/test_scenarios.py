@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pathlib
+import sys
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+from core.pipeline import PairPartitions
+from core.scenarios import discount_grid, evaluate_scenarios, weight_grid
+from core.scoring_v2 import component_score_matrix, rescore, top_k_indices
+
+
+def _frame():
+    rows = []
+    for country, shift in (("IT", 0.0), ("DE", -14.0), ("FR", -12.0)):
+        for i in range(12):
+            rows.append({
+                "asin": f"A{i}", "country": country,
+                "buybox_current": 20.0 + 3 * i + shift + (i % 4), "new_current": 18.0 + 3 * i + shift,
+                "sales_rank_current": 500.0 * (i + 1), "total_offer_count": i % 5,
+                "buybox_std_30d": 1.0 + i % 3, "buybox_std_90d": 2.0, "fba_pickpack_fee": 3.0,
+                "map_restriction": "no", "amazon_offer_availability": "",
+            })
+    return pd.DataFrame(rows)
+
+
+def _keys(df, rows):
+    return list(zip(df["asin"].iloc[rows], df["country_buy"].iloc[rows]))
+
+
+def test_scenarios_match_full_reruns():
+    df_all = _frame()
+    # A11 has the top sell buy box: unprofitable from DE, from FR only with the 20% discount
+    a11 = df_all["asin"] == "A11"
+    df_all.loc[a11 & (df_all["country"] == "DE"), ["new_current", "buybox_current"]] = 90.0
+    df_all.loc[a11 & (df_all["country"] == "FR"), ["new_current", "buybox_current"]] = 44.0
+    base = {"DE": 0.05}
+    feat, _ = PairPartitions({}).run(df_all, ["DE", "FR"], ["IT"], base, compact=False)
+    weights = weight_grid(None, "competition", [0.0, 0.4])
+    discounts = discount_grid(base, "FR", [0.0, 0.2])
+    res = evaluate_scenarios(feat, weights, discounts, k=5, min_margin_pct=0.0)
+    assert len(res["scenarios"]) == 4 and np.allclose(np.diag(res["overlap"]), 1.0)
+
+    bb_max = []
+    for s, (d, w) in enumerate((d, w) for d in discounts for w in weights):
+        # the app prunes at pairing, so the bounds are those of the pairs left
+        rerun, _ = PairPartitions({}).run(df_all, ["DE", "FR"], ["IT"], d, min_margin_pct=0.0, compact=False)
+        bb_max.append(rerun["buybox_current"].max())
+        scores = rescore(component_score_matrix(rerun), w)
+        top = res["top"][s]
+        assert _keys(feat, top) == _keys(rerun, top_k_indices(scores, 5))
+        assert res["scenarios"]["coppie_valide"][s] == len(rerun)
+        np.testing.assert_allclose(res["scenarios"]["score_medio_top"][s], np.sort(scores)[-5:].mean(), rtol=1e-12)
+    assert bb_max[0] < bb_max[-1]  # the threshold moved the bounds in the FR=0% scenarios
+
+    robust = res["robust"]
+    assert (robust["scenari_top"] == 4).all() and robust["quota"].eq(1.0).all()
+    in_all = set.intersection(*(set(t) for t in res["top"]))
+    assert len(robust) == len(in_all)
@@ -3,7 +3,9 @@ import pathlib
 import sys
 
 sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
-from core.scoring_v2 import add_detectors
+import numpy as np
+from core.scoring_v2 import add_detectors, add_weighted_score, component_score_matrix, rescore, top_k_indices, SCORE_COMPONENTS
+from core.badges import badge_mask, with_badge_text
 
 def test_add_detectors_handles_string_values():
     df = pd.DataFrame(
@@ -29,3 +31,38 @@ def test_add_detectors_handles_missing_columns():
     df = pd.DataFrame({"map_restriction": ["no"]})
     result = add_detectors(df)
     assert result.loc[0, "badges"] == "Low Guarded Buybox"
+
+
+def test_rescore_matches_weighted_sum():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.random((50, 8)), columns=[f"score_{c}" for c in SCORE_COMPONENTS])
+    weights = {"margin": 0.6, "competition": 0.3}
+    expected = add_weighted_score(df, weights)["opportunity_score_v2"].to_numpy()
+    np.testing.assert_allclose(rescore(component_score_matrix(df), weights), expected, rtol=1e-12)
+
+def test_top_k_indices_orders_best_first():
+    scores = np.array([0.2, np.nan, 0.9, 0.5, 0.9])
+    assert top_k_indices(scores, 3).tolist() == [2, 4, 3]
+    assert top_k_indices(scores, 10).tolist() == [2, 4, 3, 0, 1]
+    assert top_k_indices(scores, 0).tolist() == []
+
+
+def test_detector_flags_decode_to_badge_strings():
+    df = pd.DataFrame({
+        "amazon_90d_oos": [11, 0, 50],
+        "score_demand": [0.6, 0.1, 0.9],
+        "margin_pct": [0.2, 0.0, 0.3],
+        "flipability_90d": [85, 0, 10],
+        "buybox_std_90d": [5, 0, 0],
+        "buybox_current": [10, 10, 10],
+        "buybox_pct_amz_90d": [0.1, 0.5, 0.1],
+        "total_offer_count": [5, 20, 3],
+        "map_restriction": ["yes", "no", "no"],
+        "return_rate": [0.2, 0.0, 0.0],
+    })
+    text = add_detectors(df)
+    flags = add_detectors(df, strings=False)
+    assert "badges" not in flags.columns
+    assert with_badge_text(flags)["badges"].tolist() == text["badges"].tolist()
+    assert badge_mask(flags, ["Risk Alert"]).tolist() == [True, False, False]
+    assert badge_mask(flags, ["Window Advantage", "Low Guarded Buybox"], match_all=True).tolist() == [True, False, True]
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pathlib
+import sys
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+from core.snapshots import SnapshotStore, daily_deltas
+from core.transforms import dedupe_latest
+
+
+def _day(prices, ranks, avail, updated):
+    return pd.DataFrame({
+        "asin": ["A", "B", "C", "A"],
+        "country": ["DE", "DE", "IT", "IT"],
+        "buybox_current": prices,
+        "sales_rank_current": ranks,
+        "amazon_offer_availability": avail,
+        "last_update": updated,
+    })
+
+
+def test_dedupe_latest_keeps_newest_last_update_in_input_order():
+    df = pd.DataFrame({
+        "asin": ["A", "B", "A", "A"],
+        "country": ["DE", "DE", "DE", "DE"],
+        "last_update": ["2024-05-01 10:00", None, "2024-05-02 09:00", None],
+        "v": [1, 2, 3, 4],
+    })
+    assert dedupe_latest(df)["v"].tolist() == [2, 3]
+    assert dedupe_latest(df.drop(columns="last_update"))["v"].tolist() == [1, 2]
+
+
+def test_snapshot_store_append_read_range_and_idempotent_key(tmp_path):
+    store = SnapshotStore(tmp_path)
+    d1 = _day([10.0, 20.0, 5.0, 7.0], [100, 50, 10, 3], ["in stock"] * 4, ["2024-05-01"] * 4)
+    assert store.append(d1, day="2024-05-01", key="k1") == 4
+    assert store.append(d1, day="2024-05-01", key="k1") == 0
+    # a later upload the same day: only the newer A/DE row replaces the stored one
+    fix = _day([11.0, 99.0, 5.0, 7.0], [90, 1, 10, 3], ["in stock"] * 4,
+               ["2024-05-01 12:00", "2024-04-30", "2024-05-01", "2024-05-01"])
+    store.append(fix.iloc[:2], day="2024-05-01", key="k2")
+    d2 = _day([12.0, 20.0, 5.0, 7.0], [80, 60, 10, 3], ["No Amazon offer exists", "in stock", "in stock", "in stock"],
+              ["2024-05-02"] * 4)
+    store.append(d2, day="2024-05-02")
+    assert store.days() == ["2024-05-01", "2024-05-02"]
+
+    day1 = store.read("2024-05-01", "2024-05-01").sort_values(["country", "asin"])
+    assert day1["buybox_current"].tolist() == [11.0, 20.0, 7.0, 5.0]
+    both = store.read(columns=["buybox_current"], countries=["DE"])
+    assert len(both) == 4 and set(both["country"]) == {"DE"}
+    assert "sales_rank_current" not in both.columns
+
+    d = store.deltas("2024-05-01", "2024-05-02").set_index(["asin", "country"]).sort_index()
+    assert d.loc[("A", "DE"), "price_delta"] == 1.0
+    assert d.loc[("A", "DE"), "rank_delta"] == -10
+    assert d["new_oos"].tolist() == [True, False, False, False]
+
+
+def test_daily_deltas_joins_only_common_rows():
+    prev = pd.DataFrame({"asin": ["A", "B"], "country": ["DE", "DE"], "buybox_current": [0.0, 4.0]})
+    curr = pd.DataFrame({"asin": ["B", "A", "C"], "country": ["DE", "DE", "DE"], "buybox_current": [5.0, 2.0, 1.0]})
+    d = daily_deltas(prev, curr)
+    assert d["asin"].tolist() == ["B", "A"]
+    np.testing.assert_allclose(d["price_delta_pct"], [0.25, np.nan])
+    assert not d["new_oos"].any() and d["rank_delta"].isna().all()
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pathlib
+import sys
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+from core.transforms import (
+    parse_price, parse_percent, parse_int,
+    parse_price_series, parse_percent_series, parse_int_series,
+    countries_from_locales, to_country_from_locale,
+)
+from core.schema import normalize_header
+
+CELLS = [
+    "1.234,56 €", "1,234.56", "399,00 €", "£12.5", "$ 7", "1\xa0234,5", "no", " NaN ", "none",
+    "", " ", "abc", "1e3", "inf", "1_000", " 7,5 %", "12%", "0,5", "-3", "99999999999999999999", np.nan,
+]
+
+
+def _assert_same_as_map(s, scalar, columnar):
+    expected = s.map(scalar)
+    result = columnar(s)
+    assert result.dtype == expected.dtype
+    pd.testing.assert_series_equal(result, expected)
+
+
+def test_columnar_parsers_match_scalar_parsers():
+    for dtype in (str, object):
+        s = pd.Series(CELLS, dtype=dtype)
+        _assert_same_as_map(s, parse_price, parse_price_series)
+        _assert_same_as_map(s, parse_percent, parse_percent_series)
+        _assert_same_as_map(s, parse_int, parse_int_series)
+
+
+def test_columnar_parsers_keep_map_dtypes():
+    assert parse_int_series(pd.Series(["1", "2"], dtype=str)).dtype == np.int64
+    assert parse_price_series(pd.Series(["no", "nan"], dtype=str)).tolist() == [None, None]
+    assert parse_int_series(pd.Series([np.nan, "foo"], dtype=str)).tolist() == [None, None]
+
+
+def test_countries_from_locales_matches_map():
+    cases = [
+        pd.Series(["it", "de", None, "amazon.co.uk", " FR ", "it"]),
+        pd.Series(["it", None], dtype=object),
+        pd.Series([None, None], dtype=object),
+        pd.Series(pd.Categorical(["it", "de"])),
+        pd.Series([1.0, float("nan")]),
+        pd.Series([], dtype=str),
+    ]
+    for s in cases:
+        pd.testing.assert_series_equal(countries_from_locales(s), s.map(to_country_from_locale))
+    assert normalize_header("  Buy Box 🚚:  Current ") == normalize_header("buy box 🚚: current")
@@ -1,6 +1,10 @@
 from __future__ import annotations
 import streamlit as st
+import numpy as np
 import pandas as pd
+from core.pipeline import ranked_rows
+from core.scoring_v2 import top_k_indices
+from core.badges import BADGE_TEXT_COLS, DETECTOR_BADGES, PAIR_BADGES, badge_mask, with_badge_text
 
 def metric_card(col, label: str, value, delta=None):
     with col: st.metric(label, value, delta=delta)
@@ -10,24 +14,81 @@ def badges_cell(badges: str):
     if not tags: return ""
     return " ".join([f"<span class='hdg-badge'>{t}</span>" for t in tags])
 
-def render_leaderboard(df: pd.DataFrame, top_n: int = 200):
-    if df.empty:
-        st.info("Carica i dataset e seleziona i mercati per vedere i risultati.")
-        return
-    view_cols = [
-        "opportunity_score_v2","gross_margin_eur","margin_pct",
-        "score_demand","total_offer_count_sell","buybox_pct_amz_90d_sell",
-        "amazon_90d_oos_sell","flipability_90d_sell",
-        "country_buy","country_sell","asin","title_sell","pair_badges","url_amazon_sell","url_keepa_sell"
-    ]
-    present = [c for c in view_cols if c in df.columns]
-    show = df.sort_values("opportunity_score_v2", ascending=False).head(top_n)[present].copy()
+LEADERBOARD_COLS = [
+    "opportunity_score_v2","gross_margin_eur","margin_pct","target_discount","min_sell_price",
+    "score_demand","total_offer_count_sell","buybox_pct_amz_90d_sell",
+    "amazon_90d_oos_sell","flipability_90d_sell",
+    "country_buy","country_sell","asin","title_sell","pair_badges","url_amazon_sell","url_keepa_sell"
+]
+LEADERBOARD_MAX = 10_000
+PAGE_SIZES = [25, 50, 100, 200]
+
+def _eur(values: pd.Series) -> pd.Series:
+    s = values.map("€ {:,.2f}".format)
+    return s.str.replace(",", "X", regex=False).str.replace(".", ",", regex=False).str.replace("X", ".", regex=False)
+
+def format_leaderboard_page(show: pd.DataFrame) -> pd.DataFrame:
+    """Display formatting, applied only to the rows of the current page."""
+    show = show.copy()
     if "margin_pct" in show.columns:
-        show["margin_pct"] = (show["margin_pct"]*100).map(lambda v: f"{v:.1f}%")
+        show["margin_pct"] = (show["margin_pct"]*100).map("{:.1f}%".format)
     if "gross_margin_eur" in show.columns:
-        show["gross_margin_eur"] = show["gross_margin_eur"].map(lambda v: f"€ {v:,.2f}".replace(",", "X").replace(".", ",").replace("X","."))
+        show["gross_margin_eur"] = _eur(show["gross_margin_eur"])
+    if "target_discount" in show.columns:
+        show["target_discount"] = (show["target_discount"]*100).map("{:.1f}%".format).replace("nan%", "—")
+    if "min_sell_price" in show.columns:
+        show["min_sell_price"] = _eur(show["min_sell_price"]).replace("€ nan", "—")
     if "opportunity_score_v2" in show.columns:
-        show["opportunity_score_v2"] = show["opportunity_score_v2"].map(lambda v: f"{v:.3f}")
+        show["opportunity_score_v2"] = show["opportunity_score_v2"].map("{:.3f}".format)
     if "pair_badges" in show.columns:
         show["pair_badges"] = show["pair_badges"].apply(lambda s: badges_cell(s))
+    return show
+
+def _page_columns(df: pd.DataFrame) -> tuple[list[str], list[str]]:
+    """Leaderboard columns to show, and the source columns to slice (flags instead of badge text)."""
+    shown, source = [], []
+    for c in LEADERBOARD_COLS:
+        if c in df.columns:
+            shown.append(c)
+            source.append(c)
+        elif c in BADGE_TEXT_COLS and BADGE_TEXT_COLS[c][0] in df.columns:
+            shown.append(c)
+            source.append(BADGE_TEXT_COLS[c][0])
+    return shown, source
+
+def render_leaderboard(df: pd.DataFrame, top_n: int = LEADERBOARD_MAX, order=None, eligible=None):
+    """Paginated view over the top `top_n` pairs.
+
+    `order` holds row positions best-first (e.g. `top_k_indices` computed once per scoring);
+    when missing it is computed here with a partial selection instead of a full sort. Only
+    the current page is sliced, formatted and rendered; badge text is decoded for it alone.
+    `eligible` (bool per row) is the filter `order` was ranked with: a badge filter re-ranks
+    the whole frame within it, so matching pairs below the first `top_n` are not lost.
+    """
+    if df.empty:
+        st.info("Carica i dataset e seleziona i mercati per vedere i risultati.")
+        return
+    if order is None:
+        order = top_k_indices(df["opportunity_score_v2"].to_numpy(dtype=float, na_value=np.nan), top_n)
+    order = order[:top_n]
+    shown, source = _page_columns(df)
+
+    wanted = st.multiselect("Filtra per badge", PAIR_BADGES + DETECTOR_BADGES, key="lb_badges")
+    if wanted:
+        mask = badge_mask(df, wanted)
+        order = ranked_rows(df, top_n, mask if eligible is None else mask & eligible)
+        if len(order) == 0:
+            st.info("Nessuna coppia con i badge selezionati.")
+            return
+
+    c1, c2 = st.columns([1, 3])
+    page_size = c1.selectbox("Righe per pagina", PAGE_SIZES, index=1, key="lb_page_size")
+    n_pages = max(1, -(-len(order) // page_size))
+    page = c2.number_input(f"Pagina (1–{n_pages})", 1, n_pages, 1, 1, key="lb_page")
+    start = (int(page) - 1) * page_size
+    rows = order[start:start + page_size]
+    st.caption(f"Posizioni {start + 1}–{start + len(rows)} di {len(order):,} (su {len(df):,} coppie)")
+
+    show = format_leaderboard_page(with_badge_text(df.iloc[rows][source], shown)[shown])
+    show.insert(0, "#", np.arange(start + 1, start + len(rows) + 1))
     st.write(show.to_html(escape=False, index=False), unsafe_allow_html=True)
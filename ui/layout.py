@@ -1,7 +1,18 @@
 from __future__ import annotations
 import streamlit as st
+import numpy as np
 import pandas as pd
-from .components import metric_card, render_leaderboard
+import os
+import tempfile
+from .components import metric_card, render_leaderboard, LEADERBOARD_COLS
+from core.export import EXPORT_FORMATS, export_frame, badge_text_columns
+from core.scenarios import discount_grid, evaluate_scenarios, weight_grid
+from core.scoring_v2 import top_k_indices
+
+WEIGHT_LABELS = {
+    "margin": "Margine", "demand": "Domanda", "competition": "Concorrenza", "availability": "Disponibilità",
+    "priceedge": "Vantaggio Prezzo", "logistics": "Logistica", "risk": "Rischio", "stability": "Stabilità",
+}
 
 def sidebar_controls(countries: list[str]):
     st.sidebar.header("Dataset & Parametri")
@@ -30,6 +41,21 @@ def sidebar_controls(countries: list[str]):
         "priceedge": w_price, "logistics": w_log, "risk": w_risk, "stability": w_stab
     }, discount_map
 
+def pruning_controls():
+    st.sidebar.write("---")
+    st.sidebar.subheader("Soglie di profittabilità (pruning coppie)")
+    min_eur = st.sidebar.number_input("Margine minimo (€)", 0.0, 1000.0, 0.0, 0.5, key="min_margin_eur")
+    min_pct = st.sidebar.number_input("ROI minimo (%)", 0.0, 500.0, 0.0, 1.0, key="min_margin_pct")
+    return (min_eur or None), (min_pct / 100.0 if min_pct else None)
+
+def negotiation_controls():
+    st.sidebar.write("---")
+    st.sidebar.subheader("Trattativa fornitori")
+    target = st.sidebar.number_input("ROI obiettivo (%)", 0.0, 500.0, 15.0, 1.0, key="target_margin_pct")
+    max_disc = st.sidebar.number_input("Sconto massimo ottenibile (%) – 0 = nessun filtro", 0.0, 90.0, 0.0, 0.5,
+                                       key="max_target_discount")
+    return target / 100.0, (max_disc / 100.0 if max_disc else None)
+
 def top_kpis(col1, col2, col3, df_pairs):
     if df_pairs is None or df_pairs.empty:
         metric_card(col1, "#ASIN", 0)
@@ -43,6 +69,166 @@ def top_kpis(col1, col2, col3, df_pairs):
     except Exception:
         metric_card(col3, "Margine medio", "—")
 
-def discover_tab(df_ranked: pd.DataFrame):
+def discover_tab(df_ranked: pd.DataFrame, order=None, eligible=None):
     st.subheader("Classifica Opportunità (Score v2)")
-    render_leaderboard(df_ranked)
+    render_leaderboard(df_ranked, order=order, eligible=eligible)
+
+def cache_panel(cache):
+    info = cache.info()
+    with st.sidebar.expander("Cache file caricati"):
+        st.caption(info["path"])
+        st.write(f"{info['entries']} file · {info['bytes']/1024**2:,.1f} / {info['max_bytes']/1024**2:,.0f} MB")
+        entries = cache.entries()
+        if not entries.empty:
+            st.dataframe(entries, hide_index=True, use_container_width=True)
+        if st.button("Svuota cache", key="cache_clear"):
+            cache.clear()
+            st.rerun()
+
+def snapshot_panel(store):
+    days = store.days()
+    with st.sidebar.expander("Storico snapshot"):
+        st.caption(str(store.root))
+        st.write(f"{len(days)} giorni salvati" + (f" · {days[0]} → {days[-1]}" if days else ""))
+
+def deltas_panel(store):
+    """Day-over-day moves between two stored snapshots (price, rank, new Amazon OOS)."""
+    days = store.days()
+    if len(days) < 2:
+        return
+    with st.expander("Variazioni giorno su giorno"):
+        c1, c2 = st.columns(2)
+        curr = c2.selectbox("Giorno", days[:0:-1], index=0, key="delta_curr")
+        prev = c1.selectbox("Confronta con", [d for d in days if d < curr][::-1], index=0, key="delta_prev")
+        # reading two days of Parquet only when the pair of days (or their parts) changes
+        key = (str(store.root), prev, curr, store.day_key(prev), store.day_key(curr))
+        cached = st.session_state.get("snapshot_deltas")
+        if cached is None or cached[0] != key:
+            cached = (key, store.deltas(prev, curr))
+            st.session_state["snapshot_deltas"] = cached
+        d = cached[1]
+        moved = (d["price_delta"].fillna(0) != 0) | (d["rank_delta"].fillna(0) != 0) | d["new_oos"]
+        m1, m2, m3 = st.columns(3)
+        m1.metric("Prezzi Buy Box cambiati", f"{int((d['price_delta'].fillna(0) != 0).sum()):,}")
+        m2.metric("Sales rank migliorati", f"{int((d['rank_delta'] < 0).sum()):,}")
+        m3.metric("Nuovi OOS Amazon", f"{int(d['new_oos'].sum()):,}")
+        d = d[moved].sort_values("price_delta_pct", key=lambda s: s.abs(), ascending=False, na_position="last")
+        st.dataframe(d.head(500), hide_index=True, use_container_width=True, column_config={
+            "price_delta_pct": st.column_config.NumberColumn("Δ prezzo %", format="percent"),
+        })
+
+def pipeline_status(status: dict):
+    with st.sidebar.expander("Stato pipeline"):
+        for name, state in status.items():
+            icon, label = {"hit": ("🟢", "cache"), "refresh": ("🟡", "rinormalizzato")}.get(state, ("🔄", "ricalcolato"))
+            st.write(f"{icon} **{name}** – {label}")
+
+def diagnostics_toggle() -> bool:
+    return st.sidebar.checkbox("Diagnostica pipeline (profiling stadi)", value=False, key="diagnostics")
+
+def diagnostics_panel(profiler):
+    """Per-stage time / rows / memory of this rerun, downloadable as JSON."""
+    if not profiler.enabled:
+        return
+    rec = profiler.frame()
+    with st.expander("Diagnostica pipeline", expanded=False):
+        top = rec[~rec["stage"].str.contains("/", regex=False)]  # "features/..." are sub-steps
+        ran = top[top["status"] != "hit"]
+        st.caption(f"{len(ran)} stadi eseguiti · {ran['seconds'].sum():,.2f}s · {len(top) - len(ran)} dalla cache")
+        st.dataframe(rec, hide_index=True, use_container_width=True, column_config={
+            "seconds": st.column_config.NumberColumn("secondi", format="%.3f"),
+            "mem_delta_mb": st.column_config.NumberColumn("Δ memoria (MB)", format="%.1f"),
+        })
+        st.download_button("Scarica diagnostica (JSON)", data=profiler.to_json(),
+                           file_name="ama_v2_diagnostica.json", mime="application/json")
+
+def memory_panel(report: pd.DataFrame):
+    total = report.loc["TOTAL"]
+    with st.sidebar.expander("Memoria coppie (schema compatto)"):
+        st.write(f"{total['bytes_before']/1024**2:,.1f} MB → {total['bytes_after']/1024**2:,.1f} MB (×{total['ratio']:.1f})")
+        st.dataframe(report, use_container_width=True)
+
+def _drop_export():
+    old = st.session_state.pop("export_file", None)
+    if old and os.path.exists(old[0]):
+        os.remove(old[0])
+
+def export_panel(df: pd.DataFrame, data_key: str | None = None):
+    """Export built only when requested (rows best-first), streamed to a temp file in chunks.
+
+    The file is private to the session and dropped as soon as `data_key` (the key of the
+    scored / ranked results) changes, so a stale export is never offered.
+    """
+    ready = st.session_state.get("export_file")
+    if ready and ready[2] != data_key:
+        _drop_export()
+    with st.expander("Esporta risultati"):
+        with st.form("export_form"):
+            fmt = st.selectbox("Formato", list(EXPORT_FORMATS), index=0)
+            options = list(df.columns) + badge_text_columns(df)
+            default_cols = [c for c in LEADERBOARD_COLS + ["badges"] if c in options]
+            cols = st.multiselect("Colonne", options, default=default_cols)
+            top_n = st.number_input("Prime N coppie per punteggio (0 = tutte)", 0, len(df), min(len(df), 10_000), 100)
+            go = st.form_submit_button("Prepara export")
+        if go:
+            _drop_export()
+            fd, path = tempfile.mkstemp(prefix="ama_v2_results_", suffix=f".{fmt}")
+            os.close(fd)
+            with st.spinner("Scrittura export..."):
+                order = top_k_indices(df["opportunity_score_v2"].to_numpy(dtype=float, na_value=np.nan), int(top_n) or len(df))
+                export_frame(df, path, fmt, columns=cols or None, order=order)
+            st.session_state["export_file"] = (path, fmt, data_key)
+        ready = st.session_state.get("export_file")
+        if ready and os.path.exists(ready[0]):
+            path, fmt, _ = ready
+            with open(path, "rb") as fh:
+                st.download_button(f"Scarica risultati ({fmt})", data=fh, file_name=f"ama_v2_results.{fmt}",
+                                   mime=EXPORT_FORMATS[fmt])
+
+def _float_list(text: str) -> list[float]:
+    out = []
+    for item in text.replace(";", ",").split(","):
+        item = item.strip().replace("%", "")
+        if item:
+            out.append(float(item.replace(",", ".")))
+    return out
+
+def scenario_panel(df: pd.DataFrame, matrix, weights: dict, discount_map: dict, buy_countries: list[str],
+                   min_margin_eur=None, min_margin_pct=None):
+    """What-if: one weight and one buy discount varied over a grid, all scenarios scored at once."""
+    if not buy_countries:
+        return
+    with st.expander("Scenari what-if (pesi × sconti)"):
+        with st.form("scenario_form"):
+            c1, c2 = st.columns(2)
+            comp = c1.selectbox("Peso da variare", list(WEIGHT_LABELS), format_func=WEIGHT_LABELS.get, index=2)
+            w_text = c1.text_input("Valori del peso", "0.05, 0.12, 0.2, 0.3")
+            country = c2.selectbox("Sconto acquisto di", sorted(set(buy_countries)))
+            d_text = c2.text_input("Sconti (%)", "0, 5, 10")
+            k = st.number_input("Top-K per scenario", 10, 5000, 100, 10)
+            go = st.form_submit_button("Calcola scenari")
+        if not go:
+            return
+        try:
+            w_values, d_values = _float_list(w_text), [v / 100.0 for v in _float_list(d_text)]
+        except ValueError:
+            st.error("Valori non validi: usa numeri separati da virgola.")
+            return
+        with st.spinner("Calcolo scenari..."):
+            res = evaluate_scenarios(
+                df, weight_grid(weights, comp, w_values or [weights[comp]]),
+                discount_grid(discount_map, country, d_values) if d_values else None,
+                k=int(k), matrix=matrix, min_margin_eur=min_margin_eur, min_margin_pct=min_margin_pct,
+                min_share=0.0,
+            )
+        sc = res["scenarios"]
+        st.caption(f"{len(sc)} scenari · overlap = quota di coppie in comune con lo scenario 0 nella top-{int(k)}")
+        st.dataframe(sc[["scenario", "sconti", f"w_{comp}", "coppie_valide", "score_medio_top", "overlap_base"]],
+                     hide_index=True, use_container_width=True, column_config={
+                         "overlap_base": st.column_config.NumberColumn("overlap", format="percent"),
+                     })
+        robust = res["robust"]
+        st.write(f"**Coppie stabili**: {int((robust['quota'] >= 1.0).sum()):,} nella top-{int(k)} di tutti gli scenari")
+        st.dataframe(robust.head(500), hide_index=True, use_container_width=True, column_config={
+            "quota": st.column_config.NumberColumn("quota scenari", format="percent"),
+        })
@@ -1,4 +1,6 @@
 from __future__ import annotations
+import numpy as np
+import pandas as pd
 
 def apply_vat_discount_rules(price: float, vat: float, discount: float, country: str) -> float:
     """
@@ -23,3 +25,37 @@ def apply_vat_discount_rules(price: float, vat: float, discount: float, country:
         return (price / (1.0 + vat)) - (price * disc)
     # estero
     return (price / (1.0 + vat)) * (1.0 - disc)
+
+def apply_vat_discount_rules_array(price, vat, discount, country) -> np.ndarray:
+    """
+    Versione vettoriale di `apply_vat_discount_rules` (stesse regole, stessi risultati).
+
+    Accetta array/Series allineati; `country` viene confrontato con "IT" una sola
+    volta per valore distinto. `apply_vat_discount_rules` resta l'implementazione
+    di riferimento.
+    """
+    price = np.asarray(price, dtype=float)
+    vat = np.asarray(vat, dtype=float)
+    disc = np.asarray(discount, dtype=float)
+    codes, uniques = pd.factorize(pd.Series(country, dtype=object), use_na_sentinel=False)
+    is_it = np.array([isinstance(c, str) and c.upper() == "IT" for c in uniques], dtype=bool)[codes]
+    net = price / (1.0 + vat)
+    return np.where(is_it, net - price * disc, net * (1.0 - disc))
+
+def discount_for_net_array(price, vat, net, country) -> np.ndarray:
+    """
+    Inversa di `apply_vat_discount_rules_array`: lo sconto che porta il NET ACQUISTO a `net`.
+
+    Entrambe le regole sono lineari nello sconto:
+      - IT:     Net = Price/(1+VAT) - Price*D      ->  D = (Price/(1+VAT) - Net) / Price
+      - estero: Net = Price/(1+VAT) * (1 - D)      ->  D = 1 - Net / (Price/(1+VAT))
+    Valori negativi = il netto richiesto è già raggiunto senza sconto (margine di rincaro).
+    """
+    price = np.asarray(price, dtype=float)
+    vat = np.asarray(vat, dtype=float)
+    target = np.asarray(net, dtype=float)
+    codes, uniques = pd.factorize(pd.Series(country, dtype=object), use_na_sentinel=False)
+    is_it = np.array([isinstance(c, str) and c.upper() == "IT" for c in uniques], dtype=bool)[codes]
+    base = price / (1.0 + vat)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(is_it, (base - target) / price, 1.0 - target / base)